@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Concurrent-client throughput: sync WSGI stack vs async views under ASGI.
+
+Seeds a fresh SQLite database, then for each stack starts gunicorn with the
+same number of worker processes (sync workers on ipo_project.wsgi, and
+uvicorn workers on ipo_project.asgi with ASYNC_READ_VIEWS=1) and drives it
+with many concurrent clients hitting the read-heavy endpoints. Prints
+requests/s and latency percentiles per stack.
+
+Requires gunicorn and uvicorn.
+
+Usage:
+    python benchmarks/async_throughput.py [--workers 2] [--clients 100] [--seconds 10]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = ['/api/ipo/', '/api/ipo/upcoming/', '/api/ipo/?page=2', '/ipos/', '/ipos/?status=listed']
+
+SEED_SCRIPT = """
+import random
+from datetime import date, timedelta
+from ipo_app.models import IPO
+rng = random.Random(1)
+IPO.objects.bulk_create([
+    IPO(company_name=f'Company {i} Ltd', price_band='100 - 110', issue_size='500 Crores',
+        issue_type='Book Built Issue', status=rng.choice(['upcoming', 'ongoing', 'listed']),
+        open_date=date.today() + timedelta(days=i % 90), close_date=date.today() + timedelta(days=i % 90 + 3))
+    for i in range(500)
+])
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def fetch(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.0\r\nHost: 127.0.0.1\r\n\r\n'.encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return int(data.split(b' ', 2)[1])
+
+
+async def drive(port, clients, seconds):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, rng.choice(PATHS))
+            except OSError:
+                status = 0
+            if status != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return latencies, errors
+
+
+def wait_for_server(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if asyncio.run(fetch(port, '/api/ipo/')) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def run_stack(label, app, worker_class, env, args):
+    port = free_port()
+    cmd = [
+        sys.executable, '-m', 'gunicorn', app, '--bind', f'127.0.0.1:{port}',
+        '--workers', str(args.workers), '--worker-class', worker_class, '--log-level', 'warning',
+    ]
+    server = subprocess.Popen(cmd, cwd=BASE_DIR, env=env)
+    try:
+        wait_for_server(port)
+        latencies, errors = asyncio.run(drive(port, args.clients, args.seconds))
+    finally:
+        server.terminate()
+        server.wait()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{label:<6} {len(latencies) / args.seconds:>8.1f} req/s  "
+        f"p50={quantiles[49] * 1000:>7.1f}ms  p95={quantiles[94] * 1000:>7.1f}ms  "
+        f"p99={quantiles[98] * 1000:>7.1f}ms  errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='ipo_bench_'), 'bench.sqlite3')
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'ipo_project.settings',
+        'DATABASE_URL': f'sqlite:///{db_path}',
+        'DATABASE_REPLICA_URL': '',
+        'SQLITE_PRODUCTION_MODE': '1',
+    }
+    manage = os.path.join(BASE_DIR, 'manage.py')
+    subprocess.run([sys.executable, manage, 'migrate', '-v0'], env=env, check=True)
+    subprocess.run([sys.executable, manage, 'shell', '-c', SEED_SCRIPT], env=env, check=True)
+
+    print(f"{args.workers} workers, {args.clients} concurrent clients, {args.seconds}s")
+    run_stack('wsgi', 'ipo_project.wsgi:application', 'sync', env, args)
+    run_stack('asgi', 'ipo_project.asgi:application', 'uvicorn.workers.UvicornWorker',
+              {**env, 'ASYNC_READ_VIEWS': '1'}, args)
+
+
+if __name__ == '__main__':
+    main()
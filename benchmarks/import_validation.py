@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Bulk import validation benchmark and time budget.
+
+Validates a generated CSV file of IPOs ("Kavira Tech 123 Industries Ltd" and
+the like, with some near-duplicate names) against a fresh database already
+holding --existing IPOs, as the bulk import page does, and prints the time
+taken by reading, validation as a whole and the near-duplicate name check.
+
+Exits non-zero when validation takes longer than --budget-seconds, so a
+change that makes the name index grow superlinearly again shows up in CI.
+
+Usage:
+    python benchmarks/import_validation.py [--rows 100000] [--existing 5000] [--budget-seconds 120]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ipo_bench_'), 'bench.sqlite3')}"
+os.environ['DATABASE_REPLICA_URL'] = ''
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ipo_project.settings')
+
+import django
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from ipo_app import imports
+from ipo_app.models import IPO
+from ipo_app.names import normalize_name
+
+SECTORS = ['Tech', 'Pharma', 'Infra', 'Energy', 'Foods', 'Metals', 'Finance', 'Auto', 'Retail', 'Steel',
+           'Textiles', 'Logistics', 'Power', 'Realty', 'Chemicals']
+SUFFIXES = ['Ltd', 'Industries Ltd', 'Solutions Pvt Ltd', 'Enterprises Limited', 'Technologies Ltd', 'Holdings Ltd']
+
+
+def company_names(count, rng):
+    # Letters about as often as in English text, so trigrams are too
+    letters = 'e' * 12 + 't' * 9 + 'a' * 8 + 'o' * 8 + 'i' * 7 + 'n' * 7 + 's' * 6 + 'r' * 6 + 'h' * 5 + 'dlu' * 4
+    letters += 'cmfywgpb' * 2 + 'vkxqjz'
+    words = [''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))).title() for _ in range(50000)]
+    names = []
+    for _ in range(count):
+        if names and rng.random() < 0.01:
+            # A near-duplicate: an earlier name with a typo
+            name = rng.choice(names)
+            at = rng.randrange(len(name))
+            names.append(name[:at] + rng.choice(letters) + name[at + 1:])
+            continue
+        words_in_name = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 2)))
+        names.append(f'{words_in_name} {rng.choice(SECTORS)} {rng.randint(1, 999)} {rng.choice(SUFFIXES)}')
+    return names
+
+
+def seed(names):
+    IPO.objects.bulk_create([
+        IPO(
+            company_name=name, normalized_name=normalize_name(name), price_band='₹100 - ₹110',
+            open_date=date(2026, 1, 1), close_date=date(2026, 1, 3), issue_size='₹500 Crores',
+            issue_type='Book Built Issue', status='listed',
+        )
+        for name in names
+    ], batch_size=1000)
+
+
+def upload(names):
+    open_date = date(2027, 1, 4)
+    lines = ['company_name,issue_type,status,open_date,close_date']
+    for n, name in enumerate(names):
+        opens = open_date + timedelta(days=n % 300)
+        lines.append(f'{name},Book Built Issue,upcoming,{opens},{opens + timedelta(days=2)}')
+    return SimpleUploadedFile('ipos.csv', '\n'.join(lines).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--existing', type=int, default=5000)
+    parser.add_argument('--budget-seconds', type=float, default=120)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    names = company_names(args.existing + args.rows, random.Random(42))
+    seed(names[:args.existing])
+    file = upload(names[args.existing:])
+
+    started = time.perf_counter()
+    frame = imports.read_table(file)
+    read = time.perf_counter()
+    near_duplicates = imports.near_duplicates
+    timings = {}
+
+    def timed_near_duplicates(*args):
+        check_started = time.perf_counter()
+        try:
+            return near_duplicates(*args)
+        finally:
+            timings['near_duplicates'] = time.perf_counter() - check_started
+
+    imports.near_duplicates = timed_near_duplicates
+    try:
+        validation = imports.validate(frame)
+    finally:
+        imports.near_duplicates = near_duplicates
+    validated = time.perf_counter()
+
+    print(f"{args.rows} rows against {args.existing} IPOs")
+    print(f"read file          {read - started:>8.2f} s")
+    print(f"validate           {validated - read:>8.2f} s")
+    print(f"  near_duplicates  {timings['near_duplicates']:>8.2f} s  ({len(validation.warnings)} warnings)")
+    print(f"{validation.invalid} rows with errors, {validation.skipped} duplicates skipped")
+    if validated - read > args.budget_seconds:
+        print(f"over budget: validation took more than {args.budget_seconds:.0f} s")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
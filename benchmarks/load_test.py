@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+"""
+Concurrent HTTP load runner for a running server.
+
+Many clients each log in as one of the users made by
+`manage.py generate_synthetic_data` (and, optionally, a staff account) and
+replay a weighted mix of routes for a fixed time. It reports requests/s,
+p50/p95/p99 latency and error rate per URL name, and can write them as JSON
+to diff between releases with --compare.
+
+The API routes are rate limited (REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']).
+A run at this concurrency will use up the per-account budgets (the staff
+clients all share one account), and anything not logged in shares the
+60/min anonymous ipo_list budget of the load generator's address. Throttled
+requests get 429s, which count as errors. To measure the views rather than
+the throttle, start the server under test with the rates scaled up, or with
+the throttles off:
+
+    API_THROTTLE_MULTIPLIER=100 gunicorn ipo_project.wsgi:application ...
+    API_THROTTLE_MULTIPLIER=0 gunicorn ipo_project.wsgi:application ...
+
+Only needs the standard library. Example:
+
+    python manage.py generate_synthetic_data --scale 20
+    gunicorn ipo_project.wsgi:application --workers 4 &
+    python benchmarks/load_test.py --clients 50 --duration 30 \\
+        --staff-username admin --staff-password admin123 --output run.json
+    python benchmarks/load_test.py ... --compare run.json
+"""
+
+import argparse
+import http.client
+import json
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+# (URL name, weight, method, path template, accepted statuses). {ipo} and
+# {listed_ipo} are filled with random IPO ids, {page} with a page number.
+USER_MIX = [
+    ('ipo_list', 20, 'GET', '/ipos/?page={page}', (200,)),
+    ('ipo_detail', 20, 'GET', '/ipo/{ipo}/', (200,)),
+    ('user_dashboard', 15, 'GET', '/user-dashboard/', (200,)),
+    ('ipo-list', 12, 'GET', '/api/ipo/?page={page}', (200,)),
+    ('ipo-detail', 8, 'GET', '/api/ipo/{ipo}/', (200,)),
+    ('ipo-upcoming', 5, 'GET', '/api/ipo/upcoming/', (200,)),
+    ('all_notifications', 5, 'GET', '/all-notifications/', (200,)),
+    ('my_applications', 5, 'GET', '/my-applications/', (200,)),
+    ('track_ipo', 5, 'POST', '/track-ipo/{ipo}/', (302,)),
+    ('apply_ipo', 5, 'POST', '/apply-ipo/{listed_ipo}/', (302,)),
+]
+STAFF_MIX = [
+    ('admin_dashboard', 20, 'GET', '/admin-dashboard/', (200,)),
+    ('admin_panel_counters', 25, 'GET', '/admin-dashboard/panels/counters/', (200,)),
+    ('admin_panel_recent_ipos', 20, 'GET', '/admin-dashboard/panels/recent-ipos/?page={page}', (200,)),
+    ('admin_panel_users', 15, 'GET', '/admin-dashboard/panels/users/?page={page}', (200,)),
+    ('analytics', 10, 'GET', '/analytics/', (200,)),
+    ('ipo_list', 10, 'GET', '/ipos/?page={page}', (200,)),
+]
+
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class Client:
+    """One keep-alive connection with its own cookie jar."""
+
+    def __init__(self, host, port, timeout):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.cookies = {}
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        headers = {'Host': self.host, 'Accept': 'text/html,application/json'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if method == 'POST':
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+            headers['Referer'] = f'http://{self.host}:{self.port}{path}'
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # The server may close idle keep-alive connections; retry once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status, data
+
+    def login(self, username, password):
+        status, page = self.request('GET', '/login/')
+        match = CSRF_INPUT.search(page)
+        body = urlencode({
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': match.group(1).decode() if match else '',
+        })
+        status, _ = self.request('POST', '/login/', body)
+        return status == 302 and 'sessionid' in self.cookies
+
+
+def fetch_ipos(client):
+    """Collect IPO ids by status through the delta sync endpoint."""
+    ipos = defaultdict(list)
+    token = None
+    while True:
+        query = {'limit': 1000, 'fields': 'id,status', **({'sync_token': token} if token else {})}
+        status, body = client.request('GET', f'/api/ipo/sync/?{urlencode(query)}')
+        if status != 200:
+            raise SystemExit(f'Could not list IPOs: /api/ipo/sync/ returned {status}')
+        page = json.loads(body)
+        for ipo in page['changed']:
+            ipos[ipo['status']].append(ipo['id'])
+        token = page['sync_token']
+        if not page['has_more'] or sum(map(len, ipos.values())) >= 50000:
+            break
+    ipos['any'] = [pk for status in ('upcoming', 'ongoing', 'listed') for pk in ipos[status]]
+    if not ipos['any']:
+        raise SystemExit('No IPOs on the server; run manage.py generate_synthetic_data first.')
+    return ipos
+
+
+def login_client(index, args):
+    rng = random.Random(args.seed * 1000 + index)
+    client = Client(*args.target, args.timeout)
+    if index < args.staff_clients:
+        username, password, mix = args.staff_username, args.staff_password, STAFF_MIX
+    else:
+        username = f'{args.user_prefix}{rng.randrange(args.user_count)}'
+        password, mix = args.password, USER_MIX
+    routes = [route for route in mix if args.routes is None or route[0] in args.routes]
+    try:
+        logged_in = client.login(username, password)
+    except (http.client.HTTPException, OSError):
+        logged_in = False
+    return (client, rng, routes) if logged_in else None
+
+
+def drive_client(client, rng, routes, args, ipos, deadline):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    if not routes:
+        return samples, errors
+    weights = [route[1] for route in routes]
+    while time.perf_counter() < deadline:
+        name, _, method, template, accepted = rng.choices(routes, weights)[0]
+        path = template.format(
+            page=rng.randint(1, args.max_page),
+            ipo=rng.choice(ipos['any']),
+            listed_ipo=rng.choice(ipos['listed'] or ipos['any']),
+        )
+        body = urlencode({'quantity': rng.choice([10, 15, 25]), 'remarks': 'load test'}) if method == 'POST' else None
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, body)
+        except (http.client.HTTPException, OSError):
+            status = 0
+        samples[name].append(time.perf_counter() - started)
+        if status not in accepted:
+            errors[name] += 1
+    return samples, errors
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1] * 1000, 2)
+
+
+def summarize(results, duration):
+    routes = {}
+    for name, result in sorted(results.items()):
+        latencies = result['latencies']
+        if not latencies:
+            continue
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+        routes[name] = {
+            'requests': len(latencies),
+            'rps': round(len(latencies) / duration, 2),
+            'errors': result['errors'],
+            'error_rate': round(result['errors'] / len(latencies), 4),
+            'p50_ms': percentile(quantiles, 50),
+            'p95_ms': percentile(quantiles, 95),
+            'p99_ms': percentile(quantiles, 99),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+        }
+    total = sum(route['requests'] for route in routes.values())
+    errors = sum(route['errors'] for route in routes.values())
+    return routes, {
+        'requests': total,
+        'rps': round(total / duration, 2),
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0,
+    }
+
+
+def print_report(report, baseline=None):
+    header = f"{'route':<26}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, route in report['routes'].items():
+        line = (
+            f"{name:<26}{route['rps']:>9.1f}{route['p50_ms']:>10.1f}{route['p95_ms']:>10.1f}"
+            f"{route['p99_ms']:>10.1f}{route['error_rate']:>8.1%} "
+        )
+        old = (baseline or {}).get('routes', {}).get(name)
+        if old:
+            line += f"  p95 {route['p95_ms'] - old['p95_ms']:+.1f}ms  req/s {route['rps'] - old['rps']:+.1f}"
+        print(line)
+    total = report['total']
+    print('-' * len(header))
+    print(f"{'total':<26}{total['rps']:>9.1f}{'':>30}{total['error_rate']:>8.1%}")
+    if report['login_failures']:
+        print(f"{report['login_failures']} clients failed to log in")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--clients', type=int, default=50, help='Concurrent clients')
+    parser.add_argument('--staff-clients', type=int, default=0, help='How many of the clients log in as staff')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run after all clients logged in')
+    parser.add_argument('--user-prefix', default='synthetic_42_', help='Username prefix from generate_synthetic_data')
+    parser.add_argument('--user-count', type=int, default=1000, help='Pick users from prefix0 .. prefix(N-1)')
+    parser.add_argument('--password', default='synthetic-password')
+    parser.add_argument('--staff-username')
+    parser.add_argument('--staff-password')
+    parser.add_argument('--routes', help='Comma-separated URL names to restrict the mix to')
+    parser.add_argument('--max-page', type=int, default=5, help='Highest page number requested on paginated routes')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    parser.add_argument('--compare', help='Show p95 and req/s deltas against an earlier --output file')
+    args = parser.parse_args()
+
+    url = urlsplit(args.base_url)
+    args.target = (url.hostname, url.port or 80)
+    args.routes = set(args.routes.split(',')) if args.routes else None
+    if args.staff_clients and not (args.staff_username and args.staff_password):
+        parser.error('--staff-clients needs --staff-username and --staff-password')
+
+    ipos = fetch_ipos(Client(*args.target, args.timeout))
+    results = defaultdict(lambda: {'latencies': [], 'errors': 0})
+    login_failures = 0
+    lock = threading.Lock()
+
+    # Clients log in first; the clock starts once every client is ready
+    ready = threading.Barrier(args.clients + 1)
+    go = threading.Event()
+    shared = {}
+
+    def worker(index):
+        nonlocal login_failures
+        session = login_client(index, args)
+        ready.wait()
+        go.wait()
+        if session is None:
+            with lock:
+                login_failures += 1
+            return
+        samples, errors = drive_client(*session, args, ipos, shared['deadline'])
+        with lock:
+            for name, latencies in samples.items():
+                results[name]['latencies'].extend(latencies)
+                results[name]['errors'] += errors[name]
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    shared['deadline'] = started + args.duration
+    go.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    routes, total = summarize(results, elapsed)
+    report = {
+        'config': {
+            'base_url': args.base_url,
+            'clients': args.clients,
+            'staff_clients': args.staff_clients,
+            'duration': args.duration,
+            'seed': args.seed,
+        },
+        'total': total,
+        'routes': routes,
+        'login_failures': login_failures,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if login_failures == args.clients:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
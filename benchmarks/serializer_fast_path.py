@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+IPO list serialization benchmark.
+
+Compares IPOSerializer + JSONRenderer against the read-only fast path
+(IPOFastListSerializer + FastJSONRenderer) on a fresh database, checks that
+both produce byte-identical JSON and prints the best time of each.
+
+Usage:
+    python benchmarks/serializer_fast_path.py [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ipo_bench_'), 'bench.sqlite3')}"
+os.environ['DATABASE_REPLICA_URL'] = ''
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ipo_project.settings')
+
+import django
+django.setup()
+
+from django.core.management import call_command
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from ipo_app.models import IPO
+from ipo_app.renderers import FastJSONRenderer
+from ipo_app.serializers import IPOSerializer, IPOFastListSerializer
+
+
+def seed(rows):
+    rng = random.Random(42)
+    ipos = []
+    for i in range(rows):
+        status = rng.choice(['upcoming', 'ongoing', 'listed'])
+        open_date = date.today() + timedelta(days=rng.randint(-400, 60))
+        ipo_price = round(rng.uniform(50, 1500), 2) if status == 'listed' else None
+        ipos.append(IPO(
+            company_name=f'Company {i} Ltd',
+            logo=f'logos/company_{i}.png' if i % 3 == 0 else None,
+            price_band='₹450 - ₹500',
+            open_date=open_date,
+            close_date=open_date + timedelta(days=3),
+            listing_date=open_date + timedelta(days=10) if status == 'listed' else None,
+            issue_size='₹1,200 Crores',
+            issue_type=rng.choice(['Book Built Issue', 'Fixed Price Issue', 'SME IPO']),
+            status=status,
+            ipo_price=ipo_price,
+            listing_price=round(ipo_price * rng.uniform(0.7, 1.6), 2) if ipo_price else None,
+            current_market_price=round(ipo_price * rng.uniform(0.5, 2.5), 2) if ipo_price else None,
+        ))
+    IPO.objects.bulk_create(ipos, batch_size=1000)
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    seed(args.rows)
+
+    request = RequestFactory().get('/api/ipo/', SERVER_NAME='localhost')
+    context = {'request': request}
+    queryset = IPO.objects.all()
+
+    def model_serializer():
+        data = IPOSerializer(queryset.all(), many=True, context=context).data
+        return JSONRenderer().render(data)
+
+    def fast_path():
+        rows = queryset.values(*IPOFastListSerializer.columns())
+        data = IPOFastListSerializer(rows, context=context).data
+        return FastJSONRenderer().render(data)
+
+    slow_time, slow_output = best_of(args.repeat, model_serializer)
+    fast_time, fast_output = best_of(args.repeat, fast_path)
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    print(f"IPOSerializer          {slow_time * 1000:>9.1f} ms")
+    print(f"IPOFastListSerializer  {fast_time * 1000:>9.1f} ms  ({slow_time / fast_time:.1f}x)")
+    print(f"byte-identical: {slow_output == fast_output} ({len(fast_output)} bytes)")
+    if slow_output != fast_output:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
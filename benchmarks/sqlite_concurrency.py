@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Multi-process SQLite write/read benchmark.
+
+Runs the same mixed workload (notification inserts and tracking writes in
+write transactions, plus list/count reads) from several processes against a
+fresh database, once with the stock SQLite backend and once with
+SQLITE_PRODUCTION_MODE enabled, and prints throughput and lock errors.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py [--workers 8] [--seconds 10] [--write-ratio 0.3]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _setup_django(env):
+    os.environ.update(env)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ipo_project.settings')
+    sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+
+
+def _seed(env, users):
+    _setup_django(env)
+    from datetime import date, timedelta
+    from django.contrib.auth.models import User
+    from ipo_app.models import IPO
+
+    User.objects.bulk_create([User(username=f'bench_user_{i}') for i in range(users)])
+    IPO.objects.bulk_create([
+        IPO(
+            company_name=f'Bench IPO {i}',
+            price_band='₹100 - ₹110',
+            open_date=date.today() + timedelta(days=i),
+            close_date=date.today() + timedelta(days=i + 3),
+            issue_size='₹500 Crores',
+            issue_type='Book Built Issue',
+            status=random.choice(['upcoming', 'ongoing', 'listed']),
+        )
+        for i in range(50)
+    ])
+
+
+def _worker(env, seconds, write_ratio, seed):
+    _setup_django(env)
+    from django.db import OperationalError, connection, transaction
+    from django.contrib.auth.models import User
+    from ipo_app.models import IPO, IPONotification, IPOTracking
+    from ipo_app.transactions import _immediate
+
+    rng = random.Random(seed)
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    ipo_ids = list(IPO.objects.values_list('pk', flat=True))
+    stats = {'reads': 0, 'writes': 0, 'locked': 0}
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                # Same shape as track_ipo: read-then-write in one transaction
+                token = _immediate.set(True)
+                try:
+                    with transaction.atomic():
+                        user_id = rng.choice(user_ids)
+                        ipo_id = rng.choice(ipo_ids)
+                        IPOTracking.objects.get_or_create(user_id=user_id, ipo_id=ipo_id)
+                        IPONotification.objects.create(user_id=user_id, message='benchmark')
+                finally:
+                    _immediate.reset(token)
+                stats['writes'] += 1
+            else:
+                list(IPO.objects.filter(status='upcoming')[:12])
+                IPONotification.objects.filter(user_id=rng.choice(user_ids)).count()
+                stats['reads'] += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            stats['locked'] += 1
+    connection.close()
+    return stats
+
+
+def run(label, extra_env, args):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='ipo_bench_'), 'bench.sqlite3')
+    env = {'DATABASE_URL': f'sqlite:///{db_path}', 'DATABASE_REPLICA_URL': '', **extra_env}
+    subprocess.run(
+        [sys.executable, os.path.join(BASE_DIR, 'manage.py'), 'migrate', '-v0'],
+        env={**os.environ, **env}, check=True,
+    )
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        pool.apply(_seed, (env, 200))
+
+    with ctx.Pool(args.workers) as pool:
+        results = pool.starmap(
+            _worker,
+            [(env, args.seconds, args.write_ratio, i) for i in range(args.workers)],
+        )
+    # Each worker runs for exactly args.seconds after its own Django setup
+    elapsed = args.seconds
+
+    totals = {key: sum(r[key] for r in results) for key in ('reads', 'writes', 'locked')}
+    print(
+        f"{label:<12} reads/s={totals['reads'] / elapsed:>9.1f} "
+        f"writes/s={totals['writes'] / elapsed:>8.1f} "
+        f"locked={totals['locked']:>6}"
+    )
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, {args.seconds}s, write ratio {args.write_ratio}")
+    run('default', {'SQLITE_PRODUCTION_MODE': '0'}, args)
+    run('production', {'SQLITE_PRODUCTION_MODE': '1'}, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Cold-start benchmark and import-time budget.
+
+Starts fresh interpreters against a seeded temporary database and measures
+what a sleeping Render dyno pays on wake-up:
+
+  * import time per top-level package (python -X importtime) for loading
+    ipo_project.wsgi; its own line is django.setup() and the middleware chain;
+  * time to ready (interpreter start to WSGI app loaded, plus the
+    ipo_app.warmup steps when enabled);
+  * latency of the first and second requests, with and without warmup.
+
+Exits non-zero when time to ready with warmup exceeds --budget-ms, so it can
+run in CI or before a deploy.
+
+Usage:
+    python benchmarks/startup_time.py [--budget-ms 2500] [--repeat 3] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = ['/ipos/', '/api/ipo/', '/login/']
+
+CHILD = """
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+from ipo_project.wsgi import application
+loaded = time.perf_counter()
+timings = {}
+if os.environ.get('WARMUP') == '1':
+    from ipo_app.warmup import warm_up
+    timings = {name: seconds for name, (seconds, _) in warm_up().items()}
+ready_at = time.time()
+ready = time.perf_counter()
+
+def request(path):
+    environ = {'PATH_INFO': path, 'HTTP_HOST': '127.0.0.1', 'SERVER_NAME': '127.0.0.1'}
+    setup_testing_defaults(environ)
+    status = []
+    began = time.perf_counter()
+    body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+    return time.perf_counter() - began, status[0]
+
+requests = {path: [request(path), request(path)] for path in %(paths)r}
+print(json.dumps({
+    'ready_at': ready_at, 'load': loaded - started, 'warmup': ready - loaded, 'steps': timings,
+    'requests': {path: [[t, s] for t, s in pair] for path, pair in requests.items()},
+}))
+"""
+
+IMPORT_CHILD = 'import ipo_project.wsgi'
+
+
+def run_child(env, warmup):
+    spawned = time.time()
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD % {'paths': PATHS}],
+        cwd=BASE_DIR, env={**env, 'WARMUP': '1' if warmup else '0'},
+        capture_output=True, text=True, check=True,
+    )
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    data['ready'] = data['ready_at'] - spawned
+    return data
+
+
+def import_report(env, top):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_CHILD],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # Self time excludes nested imports, so summing it never double counts
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own) / 1000
+    total = sum(packages.values())
+    print(f"Import time of ipo_project.wsgi: {total:.0f} ms")
+    for package, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {package:<28}{ms:>8.1f} ms  {ms / total:>6.1%}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=2500, help='Maximum time to ready with warmup')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help='Packages to list in the import report')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='ipo_bench_')
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'ipo_project.settings',
+        'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}",
+        'DATABASE_REPLICA_URL': '',
+        'CACHE_DIR': os.path.join(tmp, 'cache'),
+    }
+    manage = os.path.join(BASE_DIR, 'manage.py')
+    subprocess.run([sys.executable, manage, 'migrate', '-v0'], env=env, check=True)
+    subprocess.run([sys.executable, manage, 'generate_synthetic_data', '--ipos', '200', '--users', '10'],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+
+    import_report(env, args.top)
+
+    results = {}
+    for warmup in (False, True):
+        runs = [run_child(env, warmup) for _ in range(args.repeat)]
+        label = 'warm' if warmup else 'cold'
+        ready = statistics.median(run['ready'] for run in runs) * 1000
+        results[label] = ready
+        print(f"\n{label}: time to ready {ready:.0f} ms (median of {args.repeat})")
+        if warmup:
+            steps = {name: statistics.median(run['steps'][name] for run in runs) * 1000 for name in runs[0]['steps']}
+            print('  warmup steps: ' + ', '.join(f'{name} {ms:.0f} ms' for name, ms in steps.items()))
+        for path in PATHS:
+            first = statistics.median(run['requests'][path][0][0] for run in runs) * 1000
+            second = statistics.median(run['requests'][path][1][0] for run in runs) * 1000
+            status = runs[0]['requests'][path][0][1]
+            print(f"  {path:<14} first {first:>7.1f} ms  second {second:>7.1f} ms  ({status})")
+
+    print(f"\nbudget: {results['warm']:.0f} ms of {args.budget_ms:.0f} ms")
+    if results['warm'] > args.budget_ms:
+        print('Start-up is over budget.')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 #!/usr/bin/env bash
 pip install -r requirements.txt
 python manage.py collectstatic --noinput
+python manage.py static_size_report
 python manage.py migrate
 nano build.sh
 
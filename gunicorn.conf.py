@@ -0,0 +1,21 @@
+# Picked up automatically by gunicorn when started from the project root
+# (Procfile and render.yaml both do).
+import logging
+import os
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def post_worker_init(worker):
+    # Warm each worker before it accepts traffic; set WARMUP=0 to skip
+    if os.environ.get('WARMUP', '1').lower() in ('0', 'false', 'no'):
+        return
+    from ipo_app.warmup import warm_up
+
+    timings = warm_up()
+    logger.info(
+        'Worker %s warmed up in %.0f ms (%s)',
+        worker.pid,
+        sum(seconds for seconds, _ in timings.values()) * 1000,
+        ', '.join(f'{name} {seconds * 1000:.0f} ms' for name, (seconds, _) in timings.items()),
+    )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class IpoAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ipo_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,176 @@
+"""
+Async ORM versions of the read-heavy views.
+
+Used in place of their sync counterparts when ASYNC_READ_VIEWS is enabled and
+the site is served by an ASGI worker (see ipo_project/asgi.py). Each view
+finishes all database work with the async ORM before rendering, so templates
+never hit the database from the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404, render
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.views import exception_handler
+
+from .models import IPO, IPONotification
+from .renderers import FastJSONRenderer
+from .views import IPOListView, IPOViewSet
+
+
+async def _auser(request):
+    # Resolve the user once and pin it, so the auth context processor
+    # does not lazily query the database while the template renders
+    user = await request.auser()
+    request.user = user
+    return user
+
+
+async def ipo_list(request):
+    user = await _auser(request)
+    queryset = IPO.objects.all()
+    status = request.GET.get('status')
+    search = request.GET.get('search')
+    if status:
+        queryset = queryset.filter(status=status)
+    if search:
+        queryset = queryset.filter(company_name__icontains=search)
+
+    paginator = Paginator(queryset, IPOListView.paginate_by)
+    paginator.count = await queryset.acount()
+    page_number = request.GET.get('page') or 1
+    if page_number == 'last':
+        page_number = paginator.num_pages
+    try:
+        page_obj = paginator.page(page_number)
+    except InvalidPage:
+        raise Http404('Invalid page.')
+    page_obj.object_list = [ipo async for ipo in page_obj.object_list]
+
+    counts = await IPO.objects.aaggregate(
+        total_all=Count('id'),
+        total_upcoming=Count('id', filter=Q(status='upcoming')),
+        total_ongoing=Count('id', filter=Q(status='ongoing')),
+        total_listed=Count('id', filter=Q(status='listed')),
+    )
+    context = {
+        'paginator': paginator,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+        'object_list': page_obj.object_list,
+        'ipos': page_obj.object_list,
+        'is_admin': user.is_authenticated and user.is_staff,
+        **counts,
+    }
+    return render(request, IPOListView.template_name, context)
+
+
+async def ipo_detail(request, pk):
+    user = await _auser(request)
+    ipo = await aget_object_or_404(IPO, pk=pk)
+    context = {
+        'object': ipo,
+        'ipo': ipo,
+        'is_admin': user.is_authenticated and user.is_staff,
+    }
+    return render(request, 'ipo_app/ipo_detail.html', context)
+
+
+async def all_notifications(request):
+    user = await _auser(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    notifications = [
+        notification async for notification in
+        IPONotification.objects.filter(user=user).order_by('-created_at')
+    ]
+    return render(request, 'ipo_app/all_notifications.html', {'notifications': notifications})
+
+
+# API: the JSON GET paths of IPOViewSet.list and its status actions. Other
+# methods, and the browsable API, are handed to the DRF view in a thread.
+_ipo_list_api = IPOViewSet.as_view({'get': 'list', 'post': 'create'})
+_ipo_status_api = {
+    status: IPOViewSet.as_view({'get': status})
+    for status in ('upcoming', 'ongoing', 'listed')
+}
+
+
+def _wants_drf(request):
+    return (
+        request.method != 'GET'
+        or request.GET.get('format') == 'api'
+        or 'text/html' in request.headers.get('Accept', '')
+    )
+
+
+def _api_view(request, action):
+    # Set up the viewset the way DRF would, minus the sync-only dispatch
+    view = IPOViewSet(action=action, action_map={'get': action}, args=(), kwargs={}, format_kwarg=None)
+    view.request = view.initialize_request(request)
+    view.headers = {}
+    return view
+
+
+def _api_response(data, status=200):
+    response = HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+    response['Vary'] = 'Accept'
+    return response
+
+
+def _api_error(view, exc):
+    response = exception_handler(exc, view.get_exception_handler_context())
+    api_response = _api_response(response.data, status=response.status_code)
+    for header in ('Retry-After', 'WWW-Authenticate'):
+        if header in response:
+            api_response[header] = response[header]
+    return api_response
+
+
+async def _check_throttles(view):
+    # Resolving the caller may read the session and user from the database
+    await sync_to_async(view.check_throttles)(view.request)
+
+
+async def ipo_api_list(request):
+    if _wants_drf(request):
+        return await sync_to_async(_ipo_list_api)(request)
+
+    view = _api_view(request, 'list')
+    try:
+        await _check_throttles(view)
+        rows = view.get_fast_rows(view.filter_queryset(view.get_queryset()))
+        pagination = view.paginator
+        paginator = Paginator(rows, pagination.get_page_size(view.request))
+        paginator.count = await rows.acount()
+        page_number = pagination.get_page_number(view.request, paginator)
+        if page_number in pagination.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        page.object_list = [row async for row in page.object_list]
+        pagination.page, pagination.request = page, view.request
+        data = pagination.get_paginated_response(view.get_fast_data(page.object_list)).data
+    except APIException as exc:
+        return _api_error(view, exc)
+    return _api_response(data)
+
+
+def ipo_api_status(status):
+    async def status_view(request):
+        if _wants_drf(request):
+            return await sync_to_async(_ipo_status_api[status])(request)
+
+        view = _api_view(request, status)
+        try:
+            await _check_throttles(view)
+            rows = view.get_fast_rows(view.queryset.filter(status=status))
+            data = view.get_fast_data([row async for row in rows])
+        except APIException as exc:
+            return _api_error(view, exc)
+        return _api_response(data)
+    return status_view
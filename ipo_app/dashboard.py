@@ -0,0 +1,98 @@
+"""
+Cached per-user snapshot of the user dashboard.
+
+Snapshots are stored under a key built from two version tokens: one per user,
+bumped by signals on that user's tracking, application, reminder and
+notification writes, and a global IPO version bumped on any IPO write. A bump
+makes every older snapshot unreachable, so nothing is deleted explicitly.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.contrib.auth.models import User
+
+from .models import IPOApplication, IPONotification, IPOReminder, IPOTracking
+
+IPO_VERSION_KEY = 'dashboard:version:ipo'
+
+
+def user_version_key(user_id):
+    return f'dashboard:version:user:{user_id}'
+
+
+def _bump(key):
+    # Random tokens rather than counters: a version key that was evicted and
+    # recreated can never collide with a snapshot cached under its old value
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, timeout=None))
+
+
+def bump_user_version(user_id):
+    _bump(user_version_key(user_id))
+
+
+def bump_ipo_version():
+    # Also used for writes that touch every user at once (broadcast
+    # notifications), since it invalidates all snapshots
+    _bump(IPO_VERSION_KEY)
+
+
+def ipo_version():
+    """The current IPO version token, for caches of IPO data kept elsewhere."""
+    version = cache.get(IPO_VERSION_KEY)
+    if version is None:
+        cache.add(IPO_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(IPO_VERSION_KEY)
+    return version
+
+
+def _versions(user_id):
+    keys = [IPO_VERSION_KEY, user_version_key(user_id)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if versions.get(key) is None:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _count(model):
+    rows = model.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(total=Count('pk'))
+    return Coalesce(Subquery(rows.values('total'), output_field=IntegerField()), 0)
+
+
+def build_snapshot(user):
+    counts = User.objects.filter(pk=user.pk).values(
+        notifications_count=_count(IPONotification),
+        applications_count=_count(IPOApplication),
+    ).get()
+    tracked_ipos = list(IPOTracking.objects.filter(user=user).select_related('ipo'))
+    active_reminders = list(
+        IPOReminder.objects.filter(user=user, is_active=True).select_related('ipo').order_by('reminder_date')
+    )
+    return {
+        **counts,
+        'notifications': list(IPONotification.objects.filter(user=user).order_by('-created_at')[:5]),
+        'tracked_ipos': tracked_ipos,
+        'tracked_ipos_count': len(tracked_ipos),
+        'active_reminders': active_reminders,
+        'reminders_count': len(active_reminders),
+        'recent_applications': list(
+            IPOApplication.objects.filter(user=user).select_related('ipo').order_by('-application_date')[:5]
+        ),
+    }
+
+
+def dashboard_snapshot(user):
+    # Read the versions before building, so a write that lands mid-build
+    # bumps past the key this snapshot is stored under
+    ipo_version, user_version = _versions(user.pk)
+    key = f'dashboard:snapshot:{user.pk}:{user_version}:{ipo_version}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(user)
+        cache.set(key, snapshot, settings.DASHBOARD_CACHE_TIMEOUT)
+    return snapshot
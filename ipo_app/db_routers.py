@@ -0,0 +1,34 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Set by ReplicaRoutingMiddleware for read-only requests
+_use_replica = ContextVar('use_replica', default=False)
+
+REPLICA_ALIAS = 'replica'
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class PrimaryReplicaRouter:
+    """Send reads of read-only views to the replica, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        # Only the app's own data: sessions, users and messages are read
+        # lazily inside the view and must not lag behind a login or redirect
+        if model._meta.app_label == 'ipo_app' and _use_replica.get() and replica_configured():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so relations across them are fine
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema from the primary
+        return db != REPLICA_ALIAS
@@ -0,0 +1,208 @@
+"""
+Daily digest of tracked IPO events.
+
+Events are computed once per IPO and then fanned out to users with a few
+set-based queries instead of a loop over users:
+
+1. IPO events: IPOs opening or closing within DIGEST_LOOKAHEAD_DAYS, and
+   IPOs whose status or market price changed since the state recorded by the
+   previous run (IPODigestState). One query each; the second also reads the
+   state this run records, so a change made while digests are being sent is
+   reported by the next run rather than recorded unseen.
+2. Recipients: the IPOTracking rows of those IPOs, and IPOApplication rows
+   whose status changed since the previous run. Both are streamed ordered by
+   user and merged, so each user's digest is assembled in a single pass.
+3. Delivery: recipients are resolved DIGEST_BATCH_SIZE users per query. Each
+   batch is rendered from the compiled templates and sent over one SMTP
+   connection that is held open for the whole run.
+
+A run in which any batch failed is saved unfinished and records no state, so
+the next run reports the same changes again (users whose batch did go out
+then get them twice, rather than others not at all).
+"""
+import heapq
+import logging
+import smtplib
+from datetime import timedelta
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Q
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import IPO, DigestRun, IPOApplication, IPODigestState, IPOTracking
+from .transactions import immediate_atomic
+
+logger = logging.getLogger(__name__)
+
+IPO_COLUMNS = ('id', 'company_name', 'status', 'open_date', 'close_date', 'current_market_price')
+
+
+def _ipo(events, row):
+    entry = events.get(row['id'])
+    if entry is None:
+        entry = events[row['id']] = {'ipo': {column: row[column] for column in IPO_COLUMNS}, 'events': []}
+    return entry['events']
+
+
+def ipo_events(today):
+    """
+    Return ({ipo_id: {'ipo': {...}, 'events': [...]}} for every IPO with news,
+    [(ipo_id, status, price)] of every IPO as compared, for record_state()).
+    """
+    horizon = today + timedelta(days=settings.DIGEST_LOOKAHEAD_DAYS)
+    events = {}
+    soon = IPO.objects.filter(Q(open_date__range=(today, horizon)) | Q(close_date__range=(today, horizon)))
+    for row in soon.values(*IPO_COLUMNS):
+        if today <= row['open_date'] <= horizon:
+            _ipo(events, row).append({'kind': 'opening', 'date': row['open_date']})
+        if today <= row['close_date'] <= horizon:
+            _ipo(events, row).append({'kind': 'closing', 'date': row['close_date']})
+
+    # Compared with the state the previous run recorded; IPOs it has not
+    # seen yet have no baseline and report no change
+    move = settings.DIGEST_PRICE_MOVE_PERCENT / 100
+    state = []
+    rows = IPO.objects.annotate(
+        old_status=F('ipodigeststate__status'),
+        old_price=F('ipodigeststate__current_market_price'),
+    ).order_by('pk').values(*IPO_COLUMNS, 'old_status', 'old_price').iterator(chunk_size=2000)
+    for row in rows:
+        state.append((row['id'], row['status'], row['current_market_price']))
+        if row['old_status'] is None:
+            continue
+        if row['status'] != row['old_status']:
+            _ipo(events, row).append({'kind': 'status', 'old': row['old_status'], 'new': row['status']})
+        old, new = row['old_price'], row['current_market_price']
+        if old and old > 0 and new is not None and abs(new - old) >= old * move:
+            _ipo(events, row).append({
+                'kind': 'price', 'old': old, 'new': new, 'percent': round((new - old) / old * 100, 1),
+            })
+    return events, state
+
+
+def user_digests(events, since):
+    """Yield (user_id, tracked, applications) for every user with news, by user id."""
+    tracked = (
+        IPOTracking.objects.filter(ipo_id__in=list(events)).order_by('user_id', 'ipo_id')
+        .values_list('user_id', 'ipo_id').iterator(chunk_size=5000)
+    )
+    applications = (
+        IPOApplication.objects.filter(status_updated_at__gt=since).order_by('user_id', 'ipo_id')
+        .values_list('user_id', 'ipo_id', 'ipo__company_name', 'status').iterator(chunk_size=5000)
+    )
+    status_labels = dict(IPOApplication.APPLICATION_STATUS_CHOICES)
+    merged = heapq.merge(
+        ((user_id, 0, ipo_id) for user_id, ipo_id in tracked),
+        ((user_id, 1, (ipo_id, name, status)) for user_id, ipo_id, name, status in applications),
+    )
+    for user_id, rows in groupby(merged, key=lambda row: row[0]):
+        user_tracked, user_applications = [], []
+        for _, source, value in rows:
+            if source == 0:
+                user_tracked.append(events[value])
+            else:
+                ipo_id, name, status = value
+                user_applications.append({
+                    'ipo_id': ipo_id, 'company_name': name, 'status': status_labels.get(status, status),
+                })
+        yield user_id, user_tracked, user_applications
+
+
+class DigestSender:
+    """Renders digests and sends them in batches over one SMTP connection."""
+
+    def __init__(self, today, dry_run=False):
+        self.today = today
+        self.dry_run = dry_run
+        self.text_template = get_template('ipo_app/emails/daily_digest.txt')
+        self.html_template = get_template('ipo_app/emails/daily_digest.html')
+        self.connection = None if dry_run else get_connection()
+        self.users = self.sent = self.failed = 0
+
+    def message(self, user, tracked, applications):
+        context = {
+            'name': user['first_name'] or user['username'],
+            'tracked': tracked,
+            'applications': applications,
+            'site_url': settings.SITE_URL.rstrip('/'),
+            'today': self.today,
+        }
+        updates = sum(len(entry['events']) for entry in tracked) + len(applications)
+        message = EmailMultiAlternatives(
+            subject=f"Your IPO digest for {self.today:%d %b %Y}: {updates} update{'s' if updates != 1 else ''}",
+            body=self.text_template.render(context),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user['email']],
+            connection=self.connection,
+        )
+        message.attach_alternative(self.html_template.render(context), 'text/html')
+        return message
+
+    def send_batch(self, digests):
+        users = User.objects.filter(pk__in=[user_id for user_id, _, _ in digests], is_active=True).exclude(email='')
+        users = {user['id']: user for user in users.values('id', 'email', 'first_name', 'username')}
+        messages = [
+            self.message(users[user_id], tracked, applications)
+            for user_id, tracked, applications in digests if user_id in users
+        ]
+        self.users += len(messages)
+        if self.dry_run or not messages:
+            return
+        try:
+            # Opened here rather than by send_messages(), which would close it
+            # again after every batch; a no-op while the connection is open
+            self.connection.open()
+            self.sent += self.connection.send_messages(messages) or 0
+        except (smtplib.SMTPException, OSError):
+            logger.exception('Daily digest batch of %d messages failed', len(messages))
+            self.failed += len(messages)
+            # Start the next batch on a fresh connection
+            self.connection.close()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def record_state(state):
+    """Remember the status and price ipo_events() saw for the next run to compare with."""
+    rows = iter(state)
+    while batch := list(islice(rows, 2000)):
+        IPODigestState.objects.bulk_create(
+            [IPODigestState(ipo_id=pk, status=status, current_market_price=price) for pk, status, price in batch],
+            update_conflicts=True, unique_fields=['ipo'], update_fields=['status', 'current_market_price'],
+        )
+
+
+def run(dry_run=False, batch_size=None):
+    """Build and send today's digests; returns the DigestRun (unsaved on dry runs)."""
+    batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+    started = timezone.now()
+    today = timezone.localdate()
+    previous = DigestRun.objects.filter(finished_at__isnull=False).first()
+    since = previous.started_at if previous else started - timedelta(days=1)
+
+    events, state = ipo_events(today)
+    sender = DigestSender(today, dry_run=dry_run)
+    try:
+        digests = user_digests(events, since)
+        while batch := list(islice(digests, batch_size)):
+            sender.send_batch(batch)
+    finally:
+        sender.close()
+
+    # Only a run that reached everyone counts as the baseline for the next
+    digest_run = DigestRun(
+        started_at=started, finished_at=None if sender.failed else timezone.now(),
+        users=sender.users, sent=sender.sent, failed=sender.failed,
+    )
+    if not dry_run:
+        with immediate_atomic():
+            if not sender.failed:
+                record_state(state)
+            digest_run.save()
+    return digest_run
@@ -0,0 +1,220 @@
+"""
+Export jobs: a database-backed queue for exports too large to build inside
+a request.
+
+The export page only inserts an ExportJob row. `manage.py run_export_worker`
+processes (any number of them) poll for queued jobs and claim one with a
+conditional UPDATE from queued to running, so no two workers run the same
+job and no broker or row locking is needed. A running job records the rows
+written so far, and a heartbeat, every EXPORT_BATCH_ROWS rows; the page polls
+the job's status URL. The finished file is saved to the default storage under
+exports/ and downloaded through a staff-only view.
+
+Workers also keep the queue tidy: jobs and their artifacts are deleted
+EXPORT_ARTIFACT_TTL after they finish, and running jobs whose heartbeat is
+older than EXPORT_JOB_STALE_AFTER (their worker died) are queued again, up
+to EXPORT_JOB_MAX_ATTEMPTS attempts. The same housekeeping deletes the bulk
+import error reports past IMPORT_REPORT_TTL.
+
+A requeued job may still be running in a worker that was only slow. Every
+write a worker makes to its job is therefore conditional on the job still
+being running in the attempt it claimed; once that matches no row the
+worker drops its attempt, and deletes any file it has just saved.
+"""
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from . import exports, imports
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+HOUSEKEEPING_INTERVAL = 60
+
+
+class JobLost(Exception):
+    """The job was queued again, or finished, while this worker ran it."""
+
+
+def validate(dataset_name, export_format, params):
+    """Return (dataset, columns, queryset) for a job, or raise ExportError."""
+    dataset = exports.DATASETS.get(dataset_name)
+    if dataset is None or export_format not in exports.FORMATS:
+        raise exports.ExportError('Unknown dataset or export format.')
+    columns = exports.select_columns(dataset, params.get('columns'))
+    queryset = exports.queryset(
+        dataset,
+        status=params.get('status', ''),
+        date_from=params.get('date_from', ''),
+        date_to=params.get('date_to', ''),
+    )
+    return dataset, columns, queryset
+
+
+def submit(user, dataset_name, export_format, params):
+    """Queue an export; checks the parameters but does not touch the data."""
+    validate(dataset_name, export_format, params)
+    return ExportJob.objects.create(user=user, dataset=dataset_name, format=export_format, params=params)
+
+
+def filename(job):
+    return f"{job.dataset}_export_{timezone.localtime(job.created_at):%Y%m%d_%H%M%S}.{exports.FORMATS[job.format][1]}"
+
+
+def status(job):
+    """The JSON payload of the job status endpoint."""
+    progress = None
+    if job.state == 'done':
+        progress = 100
+    elif job.rows_total:
+        progress = min(99, int(job.rows_written * 100 / job.rows_total))
+    return {
+        'id': job.pk,
+        'dataset': job.dataset,
+        'format': job.format,
+        'state': job.state,
+        'rows_total': job.rows_total,
+        'rows_written': job.rows_written,
+        'progress': progress,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+    }
+
+
+def claim():
+    """Take the oldest queued job, or return None when there is none."""
+    for pk in ExportJob.objects.filter(state='queued').order_by('created_at').values_list('pk', flat=True)[:10]:
+        now = timezone.now()
+        claimed = ExportJob.objects.filter(pk=pk, state='queued').update(
+            state='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ExportJob.objects.get(pk=pk)
+        # Another worker got there first; try the next one
+    return None
+
+
+def _finish(jobs, **fields):
+    """Mark jobs (a queryset) finished; returns how many were."""
+    now = timezone.now()
+    return jobs.update(finished_at=now, expires_at=now + timedelta(seconds=settings.EXPORT_ARTIFACT_TTL), **fields)
+
+
+@contextmanager
+def _heartbeats(beat):
+    """Call beat() from a thread every third of EXPORT_JOB_STALE_AFTER until the block ends."""
+    stop = threading.Event()
+
+    def loop():
+        try:
+            while not stop.wait(settings.EXPORT_JOB_STALE_AFTER / 3):
+                beat()
+        except JobLost:
+            pass
+        finally:
+            connection.close()  # This thread's own connection
+
+    thread = threading.Thread(target=loop, name='export-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run(job):
+    # This attempt's job; matches nothing once the job is requeued or finished
+    owned = ExportJob.objects.filter(pk=job.pk, state='running', attempts=job.attempts)
+
+    def beat(**fields):
+        if not owned.update(heartbeat_at=timezone.now(), **fields):
+            raise JobLost
+
+    def progress(rows_written):
+        beat(rows_written=rows_written)
+
+    try:
+        dataset, columns, queryset = validate(job.dataset, job.format, job.params)
+        rows_total = queryset.count()
+        beat(rows_total=rows_total, rows_written=0)
+        if job.format == 'xlsx' and rows_total > exports.XLSX_MAX_ROWS:
+            raise exports.ExportError('Too many rows for an Excel sheet; export Parquet or CSV instead.')
+        with exports.export_to_file(dataset, columns, queryset, job.format, progress) as output:
+            # Saving a large file to remote storage can outlast the stale timeout
+            beat()
+            with _heartbeats(beat):
+                name = default_storage.save(
+                    f'exports/{job.pk}-{uuid.uuid4().hex}.{exports.FORMATS[job.format][1]}', File(output),
+                )
+    except JobLost:
+        logger.warning('Export job %s was taken over while running; dropping this attempt', job.pk)
+    except Exception as error:
+        logger.exception('Export job %s failed', job.pk)
+        message = str(error) if isinstance(error, exports.ExportError) else 'The export failed; see the worker log.'
+        _finish(owned, state='failed', error=message)
+    else:
+        if not _finish(owned, state='done', artifact=name):
+            logger.warning('Export job %s was taken over while saving; deleting %s', job.pk, name)
+            default_storage.delete(name)
+    job.refresh_from_db()
+    return job
+
+
+def expire():
+    """Delete finished jobs, and their files, that are past expires_at."""
+    expired = 0
+    for job in ExportJob.objects.filter(expires_at__lte=timezone.now()).iterator():
+        if job.artifact:
+            job.artifact.delete(save=False)
+        job.delete()
+        expired += 1
+    return expired
+
+
+def requeue_stale():
+    """Queue again the running jobs whose worker stopped sending heartbeats."""
+    stale = ExportJob.objects.filter(
+        state='running', heartbeat_at__lt=timezone.now() - timedelta(seconds=settings.EXPORT_JOB_STALE_AFTER),
+    )
+    _finish(
+        stale.filter(attempts__gte=settings.EXPORT_JOB_MAX_ATTEMPTS),
+        state='failed', error='The export worker stopped responding.',
+    )
+    return stale.update(state='queued', started_at=None, heartbeat_at=None, rows_written=0)
+
+
+def work(poll_interval=None, once=False, stdout=None):
+    """Process jobs until interrupted, or until the queue is empty with once."""
+    poll_interval = poll_interval or settings.EXPORT_JOB_POLL_INTERVAL
+    next_housekeeping = 0
+    while True:
+        close_old_connections()
+        if time.monotonic() >= next_housekeeping:
+            expire()
+            requeue_stale()
+            imports.expire_reports()
+            next_housekeeping = time.monotonic() + HOUSEKEEPING_INTERVAL
+        job = claim()
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        started = time.perf_counter()
+        job = run(job)
+        if stdout is not None:
+            stdout.write(f'{job}: {job.rows_written} rows in {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,286 @@
+"""
+Streamed data exports for the staff export page.
+
+A dataset is a queryset plus named columns. Rows are read with
+values_list().iterator(), which uses a server-side cursor where the database
+has one, and are written EXPORT_BATCH_ROWS at a time:
+
+- csv and jsonl are streamed as they are produced.
+- parquet writes each batch as a pyarrow record batch (one row group) and
+  streams the bytes written so far.
+- xlsx is written by openpyxl in write-only mode, which spools rows to disk,
+  to a temporary file that is then streamed.
+
+Memory use therefore depends on the batch size, not on the number of rows.
+pyarrow and openpyxl are imported on first use so they do not slow down
+worker start-up.
+"""
+import csv
+import tempfile
+from collections import namedtuple
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Case, F, FloatField, Q, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import IPO, IPOApplication, IPONotification
+
+Column = namedtuple('Column', 'name source type')
+Dataset = namedtuple('Dataset', 'label queryset columns status_filter date_field order_by')
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+XLSX_MAX_ROWS = 1048575  # one row is the header
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _gain_loss():
+    return Case(
+        When(Q(ipo_price__gt=0, current_market_price__isnull=False),
+             then=(F('current_market_price') - F('ipo_price')) * 100.0 / F('ipo_price')),
+        output_field=FloatField(),
+    )
+
+
+def _read_status(value):
+    if value not in ('read', 'unread'):
+        raise ExportError("Notification status must be 'read' or 'unread'.")
+    return Q(is_read=value == 'read')
+
+
+DATASETS = {
+    'ipos': Dataset(
+        label='IPOs',
+        queryset=lambda: IPO.objects.all(),
+        columns=(
+            Column('id', 'id', 'int'),
+            Column('company_name', 'company_name', 'string'),
+            Column('issue_type', 'issue_type', 'string'),
+            Column('price_band', 'price_band', 'string'),
+            Column('issue_size', 'issue_size', 'string'),
+            Column('open_date', 'open_date', 'date'),
+            Column('close_date', 'close_date', 'date'),
+            Column('listing_date', 'listing_date', 'date'),
+            Column('status', 'status', 'string'),
+            Column('ipo_price', 'ipo_price', 'float'),
+            Column('listing_price', 'listing_price', 'float'),
+            Column('current_market_price', 'current_market_price', 'float'),
+            Column('gain_loss_percent', _gain_loss, 'float'),
+            Column('total_applications', lambda: Coalesce(F('stats__applications'), 0), 'int'),
+            Column('trackers', lambda: Coalesce(F('stats__trackers'), 0), 'int'),
+            Column('created_at', 'created_at', 'datetime'),
+            Column('updated_at', 'updated_at', 'datetime'),
+        ),
+        status_filter=lambda value: Q(status=value),
+        date_field='open_date',
+        order_by=('-open_date', 'id'),
+    ),
+    'applications': Dataset(
+        label='Applications',
+        queryset=lambda: IPOApplication.objects.all(),
+        columns=(
+            Column('id', 'id', 'int'),
+            Column('user_id', 'user_id', 'int'),
+            Column('username', 'user__username', 'string'),
+            Column('user_email', 'user__email', 'string'),
+            Column('ipo_id', 'ipo_id', 'int'),
+            Column('company_name', 'ipo__company_name', 'string'),
+            Column('ipo_status', 'ipo__status', 'string'),
+            Column('status', 'status', 'string'),
+            Column('quantity_applied', 'quantity_applied', 'int'),
+            Column('application_date', 'application_date', 'datetime'),
+            Column('status_updated_at', 'status_updated_at', 'datetime'),
+            Column('remarks', 'remarks', 'string'),
+        ),
+        status_filter=lambda value: Q(status=value),
+        date_field='application_date__date',
+        order_by=('id',),
+    ),
+    'notifications': Dataset(
+        label='Notifications',
+        queryset=lambda: IPONotification.objects.all(),
+        columns=(
+            Column('id', 'id', 'int'),
+            Column('user_id', 'user_id', 'int'),
+            Column('username', 'user__username', 'string'),
+            Column('user_email', 'user__email', 'string'),
+            Column('message', 'message', 'string'),
+            Column('is_read', 'is_read', 'bool'),
+            Column('created_at', 'created_at', 'datetime'),
+        ),
+        status_filter=_read_status,
+        date_field='created_at__date',
+        order_by=('id',),
+    ),
+}
+
+
+def select_columns(dataset, names=None):
+    """The dataset's columns, or the named ones in the order given."""
+    if not names:
+        return dataset.columns
+    by_name = {column.name: column for column in dataset.columns}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ExportError(f"Unknown column(s): {', '.join(unknown)}.")
+    return tuple(by_name[name] for name in dict.fromkeys(names))
+
+
+def queryset(dataset, status='', date_from='', date_to=''):
+    """The filtered, ordered queryset; the dates bound date_field inclusively."""
+    rows = dataset.queryset()
+    if status:
+        rows = rows.filter(dataset.status_filter(status))
+    for value, operator in ((date_from, 'gte'), (date_to, 'lte')):
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                raise ExportError(f"Invalid date '{value}'; use YYYY-MM-DD.")
+            rows = rows.filter(**{f'{dataset.date_field}__{operator}': day})
+    return rows.order_by(*dataset.order_by)
+
+
+def rows(queryset, columns):
+    sources = [column.source() if callable(column.source) else column.source for column in columns]
+    return queryset.values_list(*sources).iterator(chunk_size=settings.EXPORT_BATCH_ROWS)
+
+
+def batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == settings.EXPORT_BATCH_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Buffer:
+    """A write-only file whose contents are taken with drain()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def write_csv(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column.name for column in columns]).encode()
+    for batch in batches(rows):
+        yield ''.join(writer.writerow(row) for row in batch).encode()
+
+
+def write_jsonl(columns, rows):
+    names = [column.name for column in columns]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for batch in batches(rows):
+        yield ''.join(encoder.encode(dict(zip(names, row))) + '\n' for row in batch).encode()
+
+
+def write_parquet(columns, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        'int': pa.int64(), 'float': pa.float64(), 'string': pa.string(), 'bool': pa.bool_(),
+        'date': pa.date32(), 'datetime': pa.timestamp('us', tz='UTC'),
+    }
+    schema = pa.schema([(column.name, types[column.type]) for column in columns])
+    sink = _Buffer()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in batches(rows):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def write_xlsx(columns, rows, title):
+    """Write the workbook to a temporary file and return it, rewound."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append([column.name for column in columns])
+    local = [index for index, column in enumerate(columns) if column.type == 'datetime']
+    for batch in batches(rows):
+        for row in batch:
+            if local:
+                # Excel has no time zones: write local wall-clock times
+                row = list(row)
+                for index in local:
+                    if isinstance(row[index], datetime):
+                        row[index] = timezone.localtime(row[index]).replace(tzinfo=None)
+            sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+STREAM_WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'parquet': write_parquet}
+
+
+def counted(rows, progress):
+    """Pass rows through, calling progress(n) after every EXPORT_BATCH_ROWS rows and at the end."""
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % settings.EXPORT_BATCH_ROWS == 0:
+            progress(count)
+    progress(count)
+
+
+def export_to_file(dataset, columns, queryset, export_format, progress=None):
+    """Write a whole export to a temporary file and return it, rewound."""
+    records = rows(queryset, columns)
+    if progress is not None:
+        records = counted(records, progress)
+    if export_format == 'xlsx':
+        return write_xlsx(columns, records, dataset.label)
+    output = tempfile.TemporaryFile()
+    for chunk in STREAM_WRITERS[export_format](columns, records):
+        output.write(chunk)
+    output.seek(0)
+    return output
@@ -0,0 +1,124 @@
+"""
+iCalendar (RFC 5545) feeds of IPO dates.
+
+Each IPO becomes up to two all-day events: the subscription window (open to
+close date) and the listing day. The feed is streamed straight from values()
+rows. feed_state() gives the ETag and Last-Modified of a feed from a single
+aggregate query, so polling clients whose copy is current get a 304 without
+the feed being generated.
+"""
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max
+from django.urls import reverse
+
+from .models import IPO, IPOTracking
+
+PRODID = '-//Bluestock Fintech//IPO Calendar//EN'
+COLUMNS = ('id', 'company_name', 'open_date', 'close_date', 'listing_date',
+           'price_band', 'issue_type', 'status', 'updated_at')
+EVENTS_PER_CHUNK = 200
+
+
+def escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line to 75 octets, without splitting UTF-8 characters."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    start, limit = 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Back off to a character boundary (not a UTF-8 continuation byte)
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start, limit = end, 74  # continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _date(value):
+    return value.strftime('%Y%m%d')
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ipo_events(row, host, url):
+    stamp = _utc(row['updated_at'])
+    description = escape(f"{row['issue_type']} · Price band {row['price_band']} · {url}")
+    events = []
+    if row['open_date'] and row['close_date']:
+        events.append(('subscription', f"{row['company_name']} IPO open",
+                       row['open_date'], max(row['close_date'], row['open_date'])))
+    if row['listing_date']:
+        events.append(('listing', f"{row['company_name']} listing", row['listing_date'], row['listing_date']))
+    for kind, summary, first_day, last_day in events:
+        yield from (
+            'BEGIN:VEVENT',
+            f"UID:ipo-{row['id']}-{kind}@{host}",
+            f'DTSTAMP:{stamp}',
+            f'LAST-MODIFIED:{stamp}',
+            f'DTSTART;VALUE=DATE:{_date(first_day)}',
+            # DTEND of an all-day event is exclusive
+            f'DTEND;VALUE=DATE:{_date(last_day + timedelta(days=1))}',
+            f'SUMMARY:{escape(summary)}',
+            f'DESCRIPTION:{description}',
+            f'URL:{url}',
+            'TRANSP:TRANSPARENT',
+            'END:VEVENT',
+        )
+
+
+def stream(rows, name, request):
+    """Yield the calendar in chunks of EVENTS_PER_CHUNK IPOs."""
+    host = request.get_host().split(':')[0]
+    base_url = request.build_absolute_uri('/')[:-1]
+    header = (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape(name)}', 'REFRESH-INTERVAL;VALUE=DURATION:PT1H', 'X-PUBLISHED-TTL:PT1H',
+    )
+    yield ''.join(fold(line) for line in header)
+    chunk = []
+    for index, row in enumerate(rows, 1):
+        url = base_url + reverse('ipo_app:ipo_detail', args=[row['id']])
+        chunk.extend(fold(line) for line in ipo_events(row, host, url))
+        if index % EVENTS_PER_CHUNK == 0:
+            yield ''.join(chunk)
+            chunk = []
+    chunk.append('END:VCALENDAR\r\n')
+    yield ''.join(chunk)
+
+
+def feed_rows(user=None):
+    ipos = IPO.objects.all()
+    if user is not None:
+        ipos = ipos.filter(ipotracking__user=user)
+    return ipos.order_by('open_date', 'id').values(*COLUMNS).iterator(chunk_size=2000)
+
+
+def feed_state(user=None):
+    """Return (etag, last_modified) of the feed of all IPOs or of a user's tracked IPOs."""
+    if user is None:
+        # Creating, editing or deleting an IPO changes the newest updated_at
+        # or the count
+        state = IPO.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+        changed = [state['last']]
+    else:
+        state = IPOTracking.objects.filter(user=user).aggregate(
+            count=Count('id'), last=Max('ipo__updated_at'), tracked=Max('tracked_at'),
+        )
+        changed = [state['last'], state['tracked']]
+    changed = [value for value in changed if value is not None]
+    last_modified = max(changed) if changed else None
+    key = f"{user.pk if user else 'all'}:{state['count']}:{':'.join(value.isoformat() for value in changed)}"
+    return hashlib.md5(key.encode()).hexdigest(), last_modified
@@ -0,0 +1,352 @@
+"""
+Vectorized validation for the IPO bulk import.
+
+The uploaded CSV or XLSX file is read into a pandas DataFrame of strings.
+Every rule runs once per column over the whole frame (date parsing with
+to_datetime, numbers with to_numeric, enums with isin, lengths with
+str.len), so no Python code runs per cell. Each rule adds its failing rows
+to the error table: row number (the header is row 1), column, value and
+message. The error table is offered to the user as a downloadable CSV
+report.
+
+Rows without errors are matched to existing IPOs by normalized company name
+(see names.py, so "Acme Ltd" matches "ACME Limited") through a key map
+loaded with a few chunked queries. Depending on on_existing, a
+matching row is skipped, created anyway, or diffed against the current
+values (upsert): only the fields that differ are written, with bulk_update()
+grouped by the set of changed fields, and unchanged IPOs are not touched, so
+their updated_at (and every cache keyed on it) stays valid. The import
+looks the matches up again under the write lock, so IPOs added, edited or
+deleted since validation are neither duplicated nor overwritten with a
+stale diff.
+
+Rows that would create an IPO whose name is merely similar to an existing
+IPO, or to an earlier row of the file, are imported but flagged as possible
+duplicates in the report; the lookups go through a trigram index, not a
+comparison of every pair of names.
+
+Reports are saved to the default storage under import-reports/; the export
+workers' housekeeping deletes them IMPORT_REPORT_TTL seconds later (see
+expire_reports()).
+
+pandas is imported on first use so it does not slow down worker start-up.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .dashboard import bump_ipo_version
+from .models import ChangeSequence, IPO, IPOStats
+from .names import NameIndex, ipo_name_index, normalize_name
+from .transactions import immediate_atomic
+
+ISSUE_TYPES = ('Book Built Issue', 'Fixed Price Issue', 'SME IPO')
+STATUSES = tuple(status for status, _ in IPO.STATUS_CHOICES)
+REQUIRED_COLUMNS = ('company_name', 'issue_type', 'status', 'open_date', 'close_date')
+TEXT_COLUMNS = ('company_name', 'issue_type', 'price_band', 'issue_size')
+DATE_COLUMNS = ('open_date', 'close_date', 'listing_date')
+NUMBER_COLUMNS = ('ipo_price', 'listing_price', 'current_market_price')
+FIELDS = (*TEXT_COLUMNS, 'status', *DATE_COLUMNS, *NUMBER_COLUMNS)
+ON_EXISTING = ('skip', 'update', 'create')
+EXTENSIONS = ('.csv', '.xlsx')
+ERROR_COLUMNS = ['row', 'column', 'value', 'error']
+DUPLICATE_LOOKUP_CHUNK = 900  # under SQLite's 999 query parameters
+REPORT_DIR = 'import-reports'
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be imported (format, encoding, columns)."""
+
+
+class Validation:
+    """The outcome of validate(): clean rows, errors, warnings and skipped duplicates."""
+
+    def __init__(self, total, clean, errors, skipped, on_existing='skip', existing=None, columns=FIELDS,
+                 warnings=None):
+        self.total = total
+        self.clean = clean
+        self.errors = errors
+        # Possible duplicates; these rows are still imported
+        self.warnings = warnings if warnings is not None else errors.iloc[:0]
+        self.skipped = skipped
+        self.on_existing = on_existing
+        # normalized name -> current values of the matching IPO, for upserts
+        self.existing = existing or {}
+        # The fields the file has a column for; upserts leave the others alone
+        self.columns = columns
+
+    @property
+    def invalid(self):
+        return self.errors['row'].nunique() if len(self.errors) else 0
+
+    @property
+    def has_report(self):
+        return bool(len(self.errors) or len(self.warnings))
+
+    def error_report(self):
+        """The errors and warnings as CSV bytes, ordered by row number."""
+        import pandas as pd
+
+        report = pd.concat([self.errors, self.warnings]).sort_values('row', kind='stable')
+        return report.to_csv(index=False).encode()
+
+
+def expire_reports():
+    """Delete the error reports saved more than IMPORT_REPORT_TTL seconds ago."""
+    try:
+        _, files = default_storage.listdir(REPORT_DIR)
+    except FileNotFoundError:
+        return 0
+    cutoff = timezone.now() - timedelta(seconds=settings.IMPORT_REPORT_TTL)
+    expired = 0
+    for file_name in files:
+        name = f'{REPORT_DIR}/{file_name}'
+        try:
+            if default_storage.get_modified_time(name) > cutoff:
+                continue
+        except FileNotFoundError:
+            # Replaced by a newer report of the same session meanwhile
+            continue
+        default_storage.delete(name)
+        expired += 1
+    return expired
+
+
+def read_table(upload):
+    """Read an uploaded CSV or XLSX file into a DataFrame of strings."""
+    import pandas as pd
+
+    name = upload.name.lower()
+    if not name.endswith(EXTENSIONS):
+        raise ImportFileError('Please upload a CSV or Excel (.xlsx) file.')
+    try:
+        if name.endswith('.csv'):
+            frame = pd.read_csv(upload, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+        else:
+            frame = pd.read_excel(upload, dtype=str, engine='openpyxl').fillna('')
+    except UnicodeDecodeError:
+        raise ImportFileError('The CSV file must be UTF-8 encoded.')
+    except Exception as error:
+        # pandas and openpyxl raise a variety of errors for malformed files
+        raise ImportFileError(f'Could not read the file: {error}')
+    frame.columns = [str(column).strip() for column in frame.columns]
+    missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ImportFileError(f"Missing required column(s): {', '.join(missing)}.")
+    return frame
+
+
+def validate(frame, on_existing='skip'):
+    import numpy as np
+    import pandas as pd
+
+    rows = pd.Series(np.arange(2, len(frame) + 2), index=frame.index)
+    empty = pd.Series('', index=frame.index)
+    text = {
+        column: frame[column].str.strip() if column in frame.columns else empty
+        for column in FIELDS
+    }
+    errors = []
+
+    def fail(mask, column, message):
+        if mask.any():
+            errors.append(pd.DataFrame({
+                'row': rows[mask], 'column': column, 'value': text[column][mask], 'error': message,
+            }))
+
+    for column in REQUIRED_COLUMNS:
+        fail(text[column] == '', column, 'This field is required.')
+    for column in TEXT_COLUMNS:
+        max_length = IPO._meta.get_field(column).max_length
+        fail(text[column].str.len() > max_length, column, f'Must be at most {max_length} characters.')
+
+    status = text['status'].str.lower()
+    fail((status != '') & ~status.isin(STATUSES), 'status', f"Must be one of: {', '.join(STATUSES)}.")
+    issue_type = text['issue_type']
+    fail((issue_type != '') & ~issue_type.isin(ISSUE_TYPES), 'issue_type',
+         f"Must be one of: {', '.join(ISSUE_TYPES)}.")
+
+    dates = {}
+    for column in DATE_COLUMNS:
+        # Excel date cells read as strings come with a midnight time
+        values = text[column].where(~text[column].str.endswith(' 00:00:00'), text[column].str[:10])
+        dates[column] = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+        fail((values != '') & dates[column].isna(), column, 'Must be a date in YYYY-MM-DD format.')
+    fail(dates['close_date'] < dates['open_date'], 'close_date', 'Must not be before open_date.')
+
+    numbers = {}
+    for column in NUMBER_COLUMNS:
+        numbers[column] = pd.to_numeric(text[column].where(text[column] != ''), errors='coerce')
+        not_number = (text[column] != '') & ~np.isfinite(numbers[column])
+        fail(not_number, column, 'Must be a number.')
+        fail(numbers[column] < 0, column, 'Must not be negative.')
+
+    names = text['company_name']
+    unique_names = names.unique()
+    keys = names.map(dict(zip(unique_names, map(normalize_name, unique_names))))
+    existing = {}
+    if on_existing != 'create':
+        existing = existing_ipos(keys[keys != ''].unique().tolist())
+    if on_existing == 'update':
+        matches = keys.map({key: len(rows) for key, rows in existing.items()}).fillna(0)
+        fail(matches > 1, 'company_name', 'Matches more than one existing IPO; update it by hand.')
+
+    errors = pd.concat(errors) if errors else pd.DataFrame(columns=ERROR_COLUMNS)
+    errors = errors.sort_values('row', kind='stable').reset_index(drop=True)
+    invalid = rows.isin(errors['row'])
+
+    # Later rows repeating a company are skipped, as are (with 'skip') rows
+    # of companies that already exist
+    skipped = pd.Series(False, index=frame.index)
+    if on_existing != 'create':
+        skipped = ~invalid & keys.duplicated()
+    if on_existing == 'skip':
+        skipped |= ~invalid & keys.isin(existing)
+
+    valid = ~invalid & ~skipped
+    creating = valid & ~keys.isin(existing)
+    warnings = near_duplicates(rows[creating], names[creating], keys[creating])
+    clean = pd.DataFrame({
+        **{column: text[column][valid] for column in ('company_name', 'issue_type', 'price_band', 'issue_size')},
+        'normalized_name': keys[valid],
+        'status': status[valid],
+        **{column: dates[column][valid].dt.date for column in DATE_COLUMNS},
+        **{column: numbers[column][valid] for column in NUMBER_COLUMNS},
+    })
+    return Validation(
+        total=len(frame), clean=clean, errors=errors, skipped=int(skipped.sum()), on_existing=on_existing,
+        existing={name: rows[0] for name, rows in existing.items() if len(rows) == 1},
+        columns=tuple(column for column in FIELDS if column in frame.columns), warnings=warnings,
+    )
+
+
+def existing_ipos(keys):
+    """The key map: {normalized name: [current values of each IPO with that name]}."""
+    existing = {}
+    for start in range(0, len(keys), DUPLICATE_LOOKUP_CHUNK):
+        chunk = keys[start:start + DUPLICATE_LOOKUP_CHUNK]
+        for row in IPO.objects.filter(normalized_name__in=chunk).order_by('pk').values('pk', 'normalized_name', *FIELDS):
+            existing.setdefault(row.pop('normalized_name'), []).append(row)
+    return existing
+
+
+def near_duplicates(rows, names, keys):
+    """Warnings for the new names similar to an existing IPO or an earlier row."""
+    import pandas as pd
+
+    existing = ipo_name_index()
+    earlier = NameIndex(keys)
+    warnings = []
+    for row, name, key in zip(rows, names, keys):
+        if not key:
+            continue
+        match = next(iter(existing.similar(name, key=key, limit=1)), None)
+        if match is not None:
+            warnings.append((row, 'company_name', name,
+                             f'Possible duplicate of existing IPO "{match.name}" (similarity {match.similarity:.2f}).'))
+        else:
+            match = next(iter(earlier.similar(name, key=key, limit=1)), None)
+            if match is not None:
+                warnings.append((row, 'company_name', name,
+                                 f'Possible duplicate of row {match.ident}, "{match.name}" '
+                                 f'(similarity {match.similarity:.2f}).'))
+        earlier.add(row, name, key)
+    return pd.DataFrame(warnings, columns=ERROR_COLUMNS)
+
+
+def _value(value):
+    # NaN (missing number) and NaT (missing date) become NULL
+    if value is None or value != value:
+        return None
+    return value
+
+
+def plan(validation):
+    """
+    Return (new IPOs, {changed fields: IPOs to update}, unchanged count),
+    writing nothing.
+    """
+    import pandas as pd
+
+    clean = validation.clean
+    matched = clean['normalized_name'].isin(validation.existing) if validation.on_existing == 'update' else (
+        pd.Series(False, index=clean.index)
+    )
+
+    columns = list(clean.columns)
+    creates = [
+        IPO(**{column: _value(value) for column, value in zip(columns, row)})
+        for row in clean[~matched].itertuples(index=False, name=None)
+    ]
+
+    updates = {}
+    incoming = clean[matched]
+    if not len(incoming):
+        return creates, updates, 0
+    current = pd.DataFrame.from_records(
+        [validation.existing[key] for key in incoming['normalized_name']], index=incoming.index,
+    )
+    compared = [column for column in validation.columns if column != 'company_name']
+    # Equal, or both missing (NaN, NaT and None all count as missing)
+    changed = pd.DataFrame({
+        column: ~((incoming[column] == current[column]) | (incoming[column].isna() & current[column].isna()))
+        for column in compared
+    })
+    any_changed = changed.any(axis=1)
+    for index, flags in changed[any_changed].iterrows():
+        fields = tuple(column for column in compared if flags[column])
+        ipo = IPO(pk=int(current.at[index, 'pk']), **{field: _value(incoming.at[index, field]) for field in fields})
+        updates.setdefault(fields, []).append(ipo)
+    return creates, updates, int((~any_changed).sum())
+
+
+def recheck(validation):
+    """
+    Match the clean rows against the IPOs as they are now. Rows of companies
+    added since validate() are skipped like those validate() skipped, and
+    upserts diff against current values (an IPO deleted since is created).
+    """
+    if validation.on_existing == 'create' or not len(validation.clean):
+        return
+    keys = validation.clean['normalized_name']
+    existing = existing_ipos(keys.unique().tolist())
+    if validation.on_existing == 'skip':
+        skip = keys.isin(existing)
+    else:
+        skip = keys.map({key: len(rows) for key, rows in existing.items()}).fillna(0) > 1
+    validation.clean = validation.clean[~skip]
+    validation.skipped += int(skip.sum())
+    validation.existing = {key: rows[0] for key, rows in existing.items() if len(rows) == 1}
+
+
+def import_ipos(validation):
+    """Write the valid rows; returns {'inserted': n, 'updated': n, 'unchanged': n}."""
+    with immediate_atomic():
+        recheck(validation)
+        creates, updates, unchanged = plan(validation)
+        now = timezone.now()
+        # Delta sync numbers, in the transaction that writes the rows
+        next_seq = ChangeSequence.reserve(len(creates) + sum(map(len, updates.values()))) if creates or updates else 0
+        for ipo in creates:
+            ipo.change_seq = next_seq
+            next_seq += 1
+        IPO.objects.bulk_create(creates, batch_size=500)
+        # bulk_create skips the signals that create stats rows and
+        # invalidate the dashboards
+        IPOStats.objects.bulk_create([IPOStats(ipo=ipo) for ipo in creates], batch_size=500)
+        for fields, ipos in updates.items():
+            # bulk_update does not apply auto_now either
+            for ipo in ipos:
+                ipo.updated_at = now
+                ipo.change_seq = next_seq
+                next_seq += 1
+            IPO.objects.bulk_update(ipos, [*fields, 'updated_at', 'change_seq'], batch_size=500)
+        if creates or updates:
+            bump_ipo_version()
+    return {
+        'inserted': len(creates),
+        'updated': sum(len(ipos) for ipos in updates.values()),
+        'unchanged': unchanged,
+    }
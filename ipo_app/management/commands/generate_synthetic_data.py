@@ -0,0 +1,325 @@
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ipo_app.dashboard import bump_ipo_version
+from ipo_app.names import normalize_name
+from ipo_app.stats import reconcile
+from ipo_app.models import ChangeSequence, IPO, IPOApplication, IPONotification, IPOReminder, IPOTracking
+
+NAME_PREFIXES = [
+    'Apex', 'Bharat', 'Crest', 'Deccan', 'Evergreen', 'Falcon', 'Ganga', 'Horizon', 'Indus', 'Jupiter',
+    'Kaveri', 'Lotus', 'Meridian', 'Nova', 'Orbit', 'Pinnacle', 'Quantum', 'Radiant', 'Sahyadri', 'Trident',
+    'Unity', 'Vertex', 'Western', 'Zenith', 'Aurora', 'Banyan', 'Coastal', 'Dhruv', 'Everest', 'Fortune',
+]
+NAME_SECTORS = [
+    'Agro', 'Auto Components', 'Biotech', 'Cables', 'Chemicals', 'Digital', 'Electricals', 'Energy',
+    'Engineering', 'Finance', 'Foods', 'Healthcare', 'Infra', 'Logistics', 'Metals', 'Pharma',
+    'Polymers', 'Realty', 'Renewables', 'Retail', 'Software', 'Steel', 'Telecom', 'Textiles',
+]
+NAME_SUFFIXES = ['Ltd', 'Industries Ltd', 'Technologies Ltd', 'Enterprises Ltd', 'Solutions Ltd', 'Holdings Ltd']
+ISSUE_TYPES = ['Book Built Issue', 'Fixed Price Issue', 'SME IPO']
+ISSUE_TYPE_WEIGHTS = [0.65, 0.1, 0.25]
+FIRST_NAMES = ['Aarav', 'Ananya', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Nikhil', 'Priya', 'Rahul', 'Riya', 'Rohan', 'Sneha', 'Vikram']
+LAST_NAMES = ['Agarwal', 'Bose', 'Iyer', 'Joshi', 'Kapoor', 'Mehta', 'Nair', 'Patel', 'Rao', 'Reddy', 'Shah', 'Singh']
+LISTED_APPLICATION_STATUSES = ['allotted', 'not_allotted', 'rejected']
+LISTED_APPLICATION_WEIGHTS = [0.3, 0.65, 0.05]
+OPEN_APPLICATION_STATUSES = ['applied', 'under_review', 'approved']
+OPEN_APPLICATION_WEIGHTS = [0.6, 0.3, 0.1]
+
+
+class BatchWriter:
+    """
+    Buffer rows for one model and insert them batch_size at a time with a
+    single executemany() per batch.
+
+    This skips model instantiation and per-field pre_save, which is what
+    makes bulk_create() too slow for millions of rows. It also means
+    auto_now/auto_now_add are not applied, so the generated timestamps
+    are stored as given.
+    """
+
+    def __init__(self, model, batch_size):
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        self.names = [field.attname for field in fields]
+        self.defaults = {field.attname: field.get_default() for field in fields}
+        ops = connection.ops
+        adapters = {
+            models.DateTimeField: ops.adapt_datetimefield_value,
+            models.DateField: ops.adapt_datefield_value,
+            models.TimeField: ops.adapt_timefield_value,
+        }
+        self.adapters = [
+            next((adapt for cls, adapt in adapters.items() if isinstance(field, cls)), None)
+            for field in fields
+        ]
+        columns = ', '.join(ops.quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        self.sql = f'INSERT INTO {ops.quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+
+    def add(self, **values):
+        row = {**self.defaults, **values}
+        self.pending.append(tuple(
+            row[name] if adapt is None or row[name] is None else adapt(row[name])
+            for name, adapt in zip(self.names, self.adapters)
+        ))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(self.sql, self.pending)
+            self.written += len(self.pending)
+            self.pending = []
+
+
+class Command(BaseCommand):
+    help = 'Generate seeded synthetic users, IPOs and user activity for load and capacity testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--ipos', type=int, default=500, help='Number of IPOs to create')
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply --users and --ipos by this factor')
+        parser.add_argument('--tracking-per-user', type=float, default=5, help='Mean tracked IPOs per user')
+        parser.add_argument('--applications-per-user', type=float, default=2, help='Mean applications per user')
+        parser.add_argument('--reminders-per-user', type=float, default=1, help='Mean reminders per user')
+        parser.add_argument('--notifications-per-user', type=float, default=10, help='Mean notifications per user')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed produces the same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--prefix', default='synthetic', help='Username prefix for generated users')
+        parser.add_argument('--password', default='synthetic-password', help='Password shared by all generated users')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.today = date.today()
+        self.now = timezone.now()
+        self.tz = timezone.get_current_timezone()
+        self.batch_size = options['batch_size']
+        users = int(options['users'] * options['scale'])
+        ipos = int(options['ipos'] * options['scale'])
+        if users < 1 or ipos < 1:
+            raise CommandError('--users and --ipos must produce at least one row each.')
+
+        self.username_prefix = f"{options['prefix']}_{options['seed']}_"
+        if User.objects.filter(username__startswith=self.username_prefix).exists():
+            raise CommandError(
+                f'Users prefixed "{self.username_prefix}" already exist; pick another --prefix or --seed.'
+            )
+
+        started = time.perf_counter()
+        self.create_ipos(ipos)
+        self.create_users(users, options['password'])
+        self.create_activity(options)
+        # Raw inserts skip the signals that invalidate cached dashboards and
+        # maintain the IPOStats counters
+        bump_ipo_version()
+        stats_started = time.perf_counter()
+        result = reconcile()
+        self.report('IPO stats', result['created'] + result['repaired'], stats_started)
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f}s.'))
+
+    def report(self, label, count, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label:<14} {count:>10,} rows  {elapsed:>7.1f}s  {count / max(elapsed, 1e-9):>10,.0f} rows/s')
+
+    def aware(self, day, seconds):
+        return datetime.combine(day, dt_time(), tzinfo=self.tz) + timedelta(seconds=seconds)
+
+    def company_name(self, index, names):
+        base = names[index % len(names)]
+        return base if index < len(names) else f'{base} {index // len(names) + 1}'
+
+    def create_ipos(self, count):
+        started = time.perf_counter()
+        rng = self.rng
+        names = [f'{p} {s} {x}' for p in NAME_PREFIXES for s in NAME_SECTORS for x in NAME_SUFFIXES]
+        rng.shuffle(names)
+        first_pk = IPO.objects.aggregate(last=Max('pk'))['last'] or 0
+
+        writer = BatchWriter(IPO, self.batch_size)
+        # Delta sync numbers are taken in the transaction that inserts the rows
+        with transaction.atomic():
+            first_seq = ChangeSequence.reserve(count)
+            for i in range(count):
+                # Mostly listed IPOs from the last five years, weighted towards
+                # recent ones, plus a few ongoing and upcoming issues
+                roll = rng.random()
+                if roll < 0.05:
+                    open_date = self.today + timedelta(days=rng.randint(1, 45))
+                elif roll < 0.07:
+                    open_date = self.today - timedelta(days=rng.randint(0, 2))
+                else:
+                    open_date = self.today - timedelta(days=int(rng.expovariate(1 / 400)) % 1820 + 5)
+                close_date = open_date + timedelta(days=rng.choice([2, 3, 3, 3, 4]))
+                if open_date > self.today:
+                    status = 'upcoming'
+                elif close_date >= self.today:
+                    status = 'ongoing'
+                else:
+                    status = 'listed'
+
+                upper = round(rng.lognormvariate(5.5, 0.8))
+                lower = max(1, round(upper * rng.uniform(0.9, 0.97)))
+                ipo_price = listing_price = current_market_price = listing_date = None
+                if status == 'listed':
+                    listing_date = close_date + timedelta(days=rng.choice([3, 5, 6, 7]))
+                    ipo_price = float(upper)
+                    listing_price = round(ipo_price * rng.lognormvariate(0.08, 0.25), 2)
+                    current_market_price = round(listing_price * rng.lognormvariate(0.05, 0.4), 2)
+                created_at = self.aware(min(open_date, self.today) - timedelta(days=rng.randint(7, 45)), rng.randint(0, 86399))
+
+                company_name = self.company_name(i, names)
+                writer.add(
+                    company_name=company_name,
+                    normalized_name=normalize_name(company_name),
+                    price_band=f'₹{lower} - ₹{upper}',
+                    open_date=open_date,
+                    close_date=close_date,
+                    issue_size=f'₹{round(rng.lognormvariate(6, 1.2)):,} Crores',
+                    issue_type=rng.choices(ISSUE_TYPES, ISSUE_TYPE_WEIGHTS)[0],
+                    listing_date=listing_date,
+                    status=status,
+                    ipo_price=ipo_price,
+                    listing_price=listing_price,
+                    current_market_price=current_market_price,
+                    created_at=created_at,
+                    updated_at=created_at,
+                    change_seq=first_seq + i,
+                )
+            writer.flush()
+
+        self.ipos = list(
+            IPO.objects.filter(pk__gt=first_pk).order_by('pk').values_list('pk', 'company_name', 'status', 'open_date')
+        )
+        self.report('IPOs', writer.written, started)
+
+    def create_users(self, count, password):
+        started = time.perf_counter()
+        rng = self.rng
+        # Hash once; PBKDF2 per user would dominate the run time
+        password = make_password(password)
+        first_pk = User.objects.aggregate(last=Max('pk'))['last'] or 0
+
+        writer = BatchWriter(User, self.batch_size)
+        for i in range(count):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            date_joined = self.now - timedelta(seconds=int(rng.expovariate(1 / (365 * 86400))) % (3 * 365 * 86400))
+            username = f'{self.username_prefix}{i}'
+            writer.add(
+                username=username,
+                email=f'{username}@example.com',
+                first_name=first_name,
+                last_name=last_name,
+                password=password,
+                date_joined=date_joined,
+                last_login=date_joined + (self.now - date_joined) * rng.random() if rng.random() < 0.8 else None,
+            )
+        writer.flush()
+
+        self.user_ids = list(
+            User.objects.filter(pk__gt=first_pk, username__startswith=self.username_prefix).values_list('pk', flat=True)
+        )
+        self.report('Users', writer.written, started)
+
+    def popularity(self, indexes, boost_open):
+        # Zipf-like interest: a few IPOs draw most of the activity, and
+        # open or upcoming issues draw more than old listings
+        rng = self.rng
+        ranks = list(range(1, len(indexes) + 1))
+        rng.shuffle(ranks)
+        weights = [
+            (3 if boost_open and self.ipos[index][2] != 'listed' else 1) / rank ** 0.9
+            for index, rank in zip(indexes, ranks)
+        ]
+        return indexes, list(accumulate(weights))
+
+    def count(self, mean):
+        # Long-tailed per-user activity: most users do little, a few do a lot
+        return int(self.rng.expovariate(1 / mean) + 0.5) if mean > 0 else 0
+
+    def pick(self, pool, mean):
+        indexes, cum_weights = pool
+        if not indexes:
+            return set()
+        count = min(len(indexes), self.count(mean))
+        return set(self.rng.choices(indexes, cum_weights=cum_weights, k=count))
+
+    def create_activity(self, options):
+        started = time.perf_counter()
+        rng = self.rng
+        ipos = self.ipos
+        all_ipos = self.popularity(list(range(len(ipos))), boost_open=True)
+        applicable = self.popularity([i for i, ipo in enumerate(ipos) if ipo[2] != 'upcoming'], boost_open=True)
+        remindable = self.popularity([i for i, ipo in enumerate(ipos) if ipo[2] != 'listed'], boost_open=False)
+
+        tracking = BatchWriter(IPOTracking, self.batch_size)
+        applications = BatchWriter(IPOApplication, self.batch_size)
+        reminders = BatchWriter(IPOReminder, self.batch_size)
+        notifications = BatchWriter(IPONotification, self.batch_size)
+
+        for user_id in self.user_ids:
+            for index in self.pick(all_ipos, options['tracking_per_user']):
+                pk, name, status, open_date = ipos[index]
+                tracked_at = min(self.now, self.aware(
+                    min(open_date, self.today) - timedelta(days=rng.randint(0, 20)), rng.randint(0, 86399),
+                ))
+                tracking.add(user_id=user_id, ipo_id=pk, tracked_at=tracked_at)
+                notifications.add(
+                    user_id=user_id, message=f'You started tracking {name}', created_at=tracked_at,
+                    is_read=rng.random() < 0.7,
+                )
+
+            for index in self.pick(applicable, options['applications_per_user']):
+                pk, name, status, open_date = ipos[index]
+                if status == 'listed':
+                    application_status = rng.choices(LISTED_APPLICATION_STATUSES, LISTED_APPLICATION_WEIGHTS)[0]
+                else:
+                    application_status = rng.choices(OPEN_APPLICATION_STATUSES, OPEN_APPLICATION_WEIGHTS)[0]
+                applied_at = self.aware(open_date + timedelta(days=rng.randint(0, 2)), rng.randint(9 * 3600, 17 * 3600))
+                applications.add(
+                    user_id=user_id, ipo_id=pk, application_date=min(applied_at, self.now),
+                    status=application_status, quantity_applied=rng.choice([1, 1, 1, 2, 3, 5, 10]) * rng.choice([10, 15, 25, 50]),
+                )
+                notifications.add(
+                    user_id=user_id, message=f'Your application for {name} is {application_status.replace("_", " ")}',
+                    created_at=min(applied_at, self.now), is_read=rng.random() < 0.6,
+                )
+
+            for index in self.pick(remindable, options['reminders_per_user']):
+                pk, name, status, open_date = ipos[index]
+                reminders.add(
+                    user_id=user_id, ipo_id=pk, reminder_date=max(open_date - timedelta(days=1), self.today),
+                    reminder_time=dt_time(rng.randint(8, 18), rng.choice([0, 15, 30, 45])),
+                    message=rng.choice(['', '', f'{name} opens soon', 'Check the GMP before applying']),
+                    is_active=rng.random() < 0.85,
+                    created_at=self.now - timedelta(seconds=rng.randint(0, 30 * 86400)),
+                )
+
+            # Broadcast-style notifications, spread over the last six months
+            for _ in range(self.count(options['notifications_per_user'])):
+                pk, name, status, open_date = ipos[rng.randrange(len(ipos))]
+                created_at = self.now - timedelta(seconds=int(rng.expovariate(1 / (30 * 86400))) % (180 * 86400))
+                notifications.add(
+                    user_id=user_id, message=f'{name} ({status}) opens on {open_date:%b %d, %Y}',
+                    created_at=created_at, is_read=created_at < self.now - timedelta(days=3) and rng.random() < 0.8,
+                )
+
+        for writer in (tracking, applications, reminders, notifications):
+            writer.flush()
+        for label, writer in (('Tracking', tracking), ('Applications', applications), ('Reminders', reminders)):
+            self.stdout.write(f'{label:<14} {writer.written:>10,} rows')
+        total = sum(writer.written for writer in (tracking, applications, reminders, notifications))
+        self.stdout.write(f'{"Notifications":<14} {notifications.written:>10,} rows')
+        self.report('User activity', total, started)
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ipo_app.models import IPODeletion
+
+
+class Command(BaseCommand):
+    help = 'Delete IPO sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SYNC_TOMBSTONE_RETENTION_DAYS,
+            help='Keep tombstones newer than this many days',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = IPODeletion.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} IPO tombstones older than {options["days"]} days.'))
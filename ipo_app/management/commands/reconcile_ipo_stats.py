@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ipo_app.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount IPOStats from the tracking, application and reminder tables and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ipo_ids', nargs='*', type=int, help='Only these IPOs (default: all)')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        result = reconcile(options['ipo_ids'] or None, dry_run=options['dry_run'])
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['created']} and {'repair' if options['dry_run'] else 'repaired'} "
+            f"{result['repaired']} IPO stats rows; {result['unchanged']} were already correct."
+        ))
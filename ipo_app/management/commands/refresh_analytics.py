@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from ipo_app import analytics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the analytics dashboard snapshot; run on a schedule (e.g. every 15 minutes)'
+
+    def handle(self, *args, **options):
+        snapshot = analytics.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'Analytics snapshot {snapshot.pk} computed in {snapshot.duration_ms:.0f} ms.'
+        ))
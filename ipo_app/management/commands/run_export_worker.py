@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ipo_app import export_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued export jobs from the export page; keep one or more running alongside the web service'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--poll-interval', type=float,
+                            help='Seconds between checks of an empty queue (default: EXPORT_JOB_POLL_INTERVAL)')
+
+    def handle(self, *args, **options):
+        try:
+            export_jobs.work(poll_interval=options['poll_interval'], once=options['once'], stdout=self.stdout)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Export worker stopped.'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ipo_app import digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Email every user a digest of their tracked IPOs opening or closing soon, status and '
+        'price changes, and application status changes; run once a day'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Build the digests without sending them or recording the run')
+        parser.add_argument('--batch-size', type=int, help='Emails per batch (default: DIGEST_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        run = digest.run(dry_run=options['dry_run'], batch_size=options['batch_size'])
+        elapsed = ((run.finished_at or timezone.now()) - run.started_at).total_seconds()
+        if options['dry_run']:
+            self.stdout.write(f'Dry run: {run.users} digest(s) built in {elapsed:.1f}s, none sent.')
+            return
+        if run.failed:
+            self.stdout.write(self.style.WARNING(
+                f'{run.sent} digest(s) sent, {run.failed} failed in {elapsed:.1f}s; '
+                'the next run reports these changes again.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{run.sent} digest(s) sent in {elapsed:.1f}s.'))
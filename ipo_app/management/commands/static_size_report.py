@@ -0,0 +1,121 @@
+import json
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from ipo_app.storage import IMAGE_EXTENSIONS, IMAGE_VARIANTS_MANIFEST
+
+CATEGORIES = (
+    ('css', ('.css',)),
+    ('js', ('.js', '.mjs')),
+    ('image', IMAGE_EXTENSIONS + ('.gif', '.svg', '.webp', '.avif', '.ico')),
+    ('font', ('.woff', '.woff2', '.ttf', '.otf', '.eot')),
+)
+
+
+def category(name):
+    lowered = name.lower()
+    for label, extensions in CATEGORIES:
+        if lowered.endswith(extensions):
+            return label
+    return 'other'
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Report the size of every collected static file as stored and as served '
+        '(gzip, Brotli, AVIF/WebP), checked against STATIC_SIZE_BUDGETS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Largest files to list')
+        parser.add_argument('--json', dest='json_path', help='Also write the full report to this file')
+        parser.add_argument('--fail-on-budget', action='store_true',
+                            help='Exit with an error when a budget is exceeded')
+
+    def handle(self, *args, **options):
+        hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+        if not hashed_files:
+            raise CommandError(f'No static files manifest in {settings.STATIC_ROOT}; run collectstatic first.')
+        variants_path = os.path.join(settings.STATIC_ROOT, IMAGE_VARIANTS_MANIFEST)
+        try:
+            with open(variants_path) as f:
+                image_variants = json.load(f)
+        except (OSError, ValueError):
+            image_variants = {}
+
+        files = []
+        for name, hashed_name in sorted(hashed_files.items()):
+            path = os.path.join(settings.STATIC_ROOT, hashed_name)
+            size = file_size(path)
+            if size is None:
+                continue
+            encodings = {
+                'gzip': file_size(path + '.gz'),
+                'br': file_size(path + '.br'),
+                **image_variants.get(hashed_name, {}).get('variants', {}),
+            }
+            encodings = {key: value for key, value in encodings.items() if value is not None}
+            files.append({
+                'name': name,
+                'category': category(name),
+                'size': size,
+                'encodings': encodings,
+                # What a current browser downloads: the smallest encoding offered
+                'served': min([size, *encodings.values()]),
+            })
+
+        budgets = getattr(settings, 'STATIC_SIZE_BUDGETS', {})
+        over_budget = [
+            entry for entry in files
+            if entry['category'] in budgets and entry['served'] > budgets[entry['category']]
+        ]
+        totals = {}
+        for entry in files:
+            total = totals.setdefault(entry['category'], {'files': 0, 'size': 0, 'served': 0})
+            total['files'] += 1
+            total['size'] += entry['size']
+            total['served'] += entry['served']
+        served_total = sum(entry['served'] for entry in files)
+        if 'total' in budgets and served_total > budgets['total']:
+            over_budget.append({'name': '(all files)', 'category': 'total', 'served': served_total})
+
+        self.print_report(files, totals, over_budget, budgets, options['top'])
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'files': files, 'totals': totals, 'over_budget': over_budget, 'budgets': budgets},
+                          f, indent=2)
+        if over_budget and options['fail_on_budget']:
+            raise CommandError(f'{len(over_budget)} static size budget(s) exceeded.')
+
+    def print_report(self, files, totals, over_budget, budgets, top):
+        kb = lambda size: f'{size / 1024:,.1f} KB'
+        self.stdout.write(f"{'category':<10}{'files':>7}{'stored':>14}{'served':>14}{'saved':>8}")
+        for label, total in sorted(totals.items()):
+            saved = 1 - total['served'] / total['size'] if total['size'] else 0
+            self.stdout.write(
+                f"{label:<10}{total['files']:>7}{kb(total['size']):>14}{kb(total['served']):>14}{saved:>8.0%}"
+            )
+        self.stdout.write(f'\nLargest {top} files as served:')
+        for entry in sorted(files, key=lambda entry: entry['served'], reverse=True)[:top]:
+            best = min(entry['encodings'].items(), key=lambda item: item[1], default=(None, None))[0]
+            via = f' via {best}' if best and entry['encodings'][best] == entry['served'] else ''
+            self.stdout.write(f"  {kb(entry['served']):>12}  {entry['name']} ({kb(entry['size'])} stored{via})")
+        if over_budget:
+            self.stdout.write(self.style.WARNING(f'\n{len(over_budget)} over budget:'))
+            for entry in over_budget:
+                limit = budgets[entry['category']]
+                self.stdout.write(self.style.WARNING(
+                    f"  {entry['name']}: {kb(entry['served'])} > {kb(limit)} ({entry['category']})"
+                ))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nAll static files within budget.'))
@@ -0,0 +1,282 @@
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import query_metrics, request_profiler
+from .db_routers import _use_replica
+from .storage import variant_original
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Mark GET/HEAD requests to the views in REPLICA_ROUTED_VIEWS as replica reads."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.routed_views = set(getattr(settings, 'REPLICA_ROUTED_VIEWS', []))
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Keep process_view on the event loop instead of a sync thread
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _use_replica.set(False)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        finally:
+            _use_replica.set(False)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS:
+            return None
+        match = request.resolver_match
+        if match and match.url_name in self.routed_views:
+            _use_replica.set(True)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return ReplicaRoutingMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also run in an async middleware chain, and that
+    serves the AVIF/WebP variants written by OptimizedStaticFilesStorage to
+    browsers that accept them.
+
+    The stock middleware is sync-only, which under ASGI forces every request
+    (and the async views below it) through Django's single sync thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    # Most preferred first
+    IMAGE_VARIANTS = (('image/avif', '.avif'), ('image/webp', '.webp'))
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.serve_static(request)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self.serve_static(request)
+        if response is not None:
+            return response
+        return await self.get_response(request)
+
+    def lookup(self, path):
+        if self.autorefresh:
+            return self.find_file(path)
+        return self.files.get(path)
+
+    def serve_static(self, request):
+        path = request.path_info
+        static_file = self.lookup(path)
+        if static_file is None:
+            return None
+        variants = [
+            (media_type, variant)
+            for media_type, suffix in self.IMAGE_VARIANTS
+            if (variant := self.lookup(path + suffix)) is not None
+        ]
+        if not variants:
+            return self.serve(static_file, request)
+        accept = request.headers.get('Accept', '')
+        for media_type, variant in variants:
+            if media_type in accept:
+                static_file = variant
+                break
+        response = self.serve(static_file, request)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    def immutable_file_test(self, path, url):
+        # A variant is as immutable as the hashed image it was encoded from
+        original = variant_original(url)
+        return super().immutable_file_test(path, original or url)
+
+
+class SQLProfilingMiddleware:
+    """
+    Record query count, SQL time and repeated query shapes for a sample of
+    requests, report them in a Server-Timing header and aggregate them per
+    view for the Prometheus metrics endpoint.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.SQL_PROFILING_SAMPLE_RATE
+        self.repeat_threshold = settings.SQL_PROFILING_REPEAT_THRESHOLD
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        recorder = query_metrics.QueryRecorder()
+        started = time.perf_counter()
+        with query_metrics.recording(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        recorder = query_metrics.QueryRecorder()
+        started = time.perf_counter()
+        with query_metrics.recording(recorder):
+            response = await self.get_response(request)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def finish(self, request, response, recorder, elapsed):
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        repeated = recorder.repeated(self.repeat_threshold)
+        for sql, count in repeated.items():
+            logger.warning('Possible N+1 in %s: query repeated %d times: %s', view, count, sql)
+        query_metrics.record(view, recorder, elapsed, repeated)
+
+        timings = [
+            f'sql;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+            f'app;dur={elapsed * 1000:.1f}',
+        ]
+        if repeated:
+            timings.append(f'n-plus-one;desc="{len(repeated)} repeated query shapes"')
+        if response.has_header('Server-Timing'):
+            timings.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+class RequestProfilerMiddleware:
+    """
+    Capture a sampled call-stack profile of a request.
+
+    Staff trigger it with an "X-Profile: 1" header or a "?_profile=1" query
+    flag. Other requests are sampled too when PROFILER_SLOW_REQUEST_MS is
+    set, and their profile is kept only if they turn out slower than that.
+
+    Async views share the event loop thread, so samples of that thread
+    cannot be told apart by request: a requested profile of an async view
+    also contains the stacks of whatever else the loop ran meanwhile, and
+    async views are left out of slow-request sampling altogether.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_ms = settings.PROFILER_SLOW_REQUEST_MS
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        request._profile = None
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.stop(request)
+            raise
+        if response.streaming and request._profile:
+            # Keep sampling while the body is generated on this thread
+            response.streaming_content = self.profile_stream(request, response.streaming_content, started)
+            return response
+        return self.finish(request, response, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        request._profile = None
+        request._profile_loop_thread = threading.get_ident()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            self.stop(request)
+            raise
+        return self.finish(request, response, started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Under ASGI this runs on the thread that will also run a sync view;
+        # async views run on the event loop thread instead
+        on_loop = iscoroutinefunction(view_func) and hasattr(request, '_profile_loop_thread')
+        thread_id = request._profile_loop_thread if on_loop else threading.get_ident()
+
+        if request.user.is_staff and (
+            request.headers.get('X-Profile') == '1' or request.GET.get('_profile') == '1'
+        ):
+            trigger = 'requested'
+        elif self.slow_request_ms and not on_loop:
+            trigger = 'slow'
+        else:
+            return None
+        profile = request_profiler.Profile(settings.PROFILER_SAMPLE_INTERVAL)
+        request._profile = (thread_id, profile, trigger)
+        request_profiler.sampler().add(thread_id, profile)
+        return None
+
+    def stop(self, request):
+        if request._profile:
+            thread_id, profile, _ = request._profile
+            request_profiler.sampler().remove(thread_id, profile)
+
+    def save(self, request, started):
+        """Stop sampling and store the profile if it should be kept."""
+        self.stop(request)
+        if not request._profile:
+            return None
+        _, profile, trigger = request._profile
+        duration = time.perf_counter() - started
+        if trigger == 'requested' or duration * 1000 >= self.slow_request_ms:
+            return request_profiler.save(profile, request, trigger, duration)
+        return None
+
+    def finish(self, request, response, started):
+        profile_id = self.save(request, started)
+        if profile_id is not None:
+            response['X-Profile-Id'] = profile_id
+        return response
+
+    def profile_stream(self, request, content, started):
+        try:
+            yield from content
+        finally:
+            self.save(request, started)
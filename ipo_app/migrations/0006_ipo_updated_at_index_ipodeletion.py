@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipo_app', '0005_alter_ipo_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IPODeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ipo_id', models.BigIntegerField()),
+                ('company_name', models.CharField(max_length=255)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ipo',
+            index=models.Index(fields=['updated_at', 'id'], name='ipo_updated_at_idx'),
+        ),
+    ]
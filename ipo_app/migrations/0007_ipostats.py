@@ -0,0 +1,65 @@
+# Generated by Django 5.0.2 on 2026-10-19 12:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+# The application statuses as of this migration; a frozen copy of the
+# recount in ipo_app.stats, which follows the live models
+APPLICATION_STATUSES = ('applied', 'under_review', 'approved', 'rejected', 'allotted', 'not_allotted')
+
+
+def populate_stats(apps, schema_editor):
+    IPO = apps.get_model('ipo_app', 'IPO')
+    IPOStats = apps.get_model('ipo_app', 'IPOStats')
+    counts = {pk: {} for pk in IPO.objects.values_list('pk', flat=True)}
+
+    def grouped(model_name, **aggregates):
+        model = apps.get_model('ipo_app', model_name)
+        return model.objects.order_by().values('ipo_id').annotate(**aggregates)
+
+    for row in grouped('IPOTracking', trackers=Count('pk')):
+        counts[row.pop('ipo_id')].update(row)
+    for row in grouped('IPOReminder', active_reminders=Count('pk', filter=Q(is_active=True))):
+        counts[row.pop('ipo_id')].update(row)
+    applications = grouped(
+        'IPOApplication',
+        applications=Count('pk'),
+        **{f'applications_{status}': Count('pk', filter=Q(status=status)) for status in APPLICATION_STATUSES},
+    )
+    for row in applications:
+        counts[row.pop('ipo_id')].update(row)
+    IPOStats.objects.bulk_create(
+        [IPOStats(ipo_id=pk, **counters) for pk, counters in counts.items()], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipo_app', '0006_ipo_updated_at_index_ipodeletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IPOStats',
+            fields=[
+                ('ipo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='ipo_app.ipo')),
+                ('trackers', models.IntegerField(default=0)),
+                ('active_reminders', models.IntegerField(default=0)),
+                ('applications', models.IntegerField(default=0)),
+                ('applications_applied', models.IntegerField(default=0)),
+                ('applications_under_review', models.IntegerField(default=0)),
+                ('applications_approved', models.IntegerField(default=0)),
+                ('applications_rejected', models.IntegerField(default=0)),
+                ('applications_allotted', models.IntegerField(default=0)),
+                ('applications_not_allotted', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'IPO stats',
+                'indexes': [models.Index(fields=['-applications'], name='ipostats_applications_idx'), models.Index(fields=['-trackers'], name='ipostats_trackers_idx')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipo_app', '0007_ipostats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField()),
+                ('computed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('duration_ms', models.FloatField()),
+            ],
+            options={
+                'ordering': ['-computed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-19 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipo_app', '0008_analyticssnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ipo',
+            index=models.Index(fields=['open_date'], name='ipo_open_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ipo',
+            index=models.Index(fields=['close_date'], name='ipo_close_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ipo',
+            index=models.Index(fields=['listing_date'], name='ipo_listing_date_idx'),
+        ),
+    ]
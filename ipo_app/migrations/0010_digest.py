@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-19 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipo_app', '0009_ipo_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(db_index=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('users', models.IntegerField(default=0)),
+                ('sent', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IPODigestState',
+            fields=[
+                ('ipo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='ipo_app.ipo')),
+                ('status', models.CharField(max_length=20)),
+                ('current_market_price', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ipoapplication',
+            name='status_updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.2 on 2026-10-19 12:54
+
+import unicodedata
+
+from django.db import migrations, models
+
+# A frozen copy of ipo_app.names.normalize_name() as of this migration, so
+# that it neither imports the app's live models nor changes with them
+LEGAL_SUFFIXES = frozenset({
+    'co', 'company', 'corp', 'corporation', 'inc', 'incorporated', 'limited', 'llc', 'llp', 'ltd', 'plc',
+    'pvt', 'private',
+})
+
+
+def normalize_name(name):
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold().replace('&', ' and ')
+    words = ''.join(
+        char if char.isalnum() or unicodedata.category(char).startswith('M') else ' ' for char in text
+    ).split()
+    if len(words) > 1 and words[0] == 'the':
+        words.pop(0)
+    while len(words) > 1 and (words[-1] in LEGAL_SUFFIXES or words[-1] == 'and'):
+        words.pop()
+    return ' '.join(words)
+
+
+def populate_normalized_names(apps, schema_editor):
+    IPO = apps.get_model('ipo_app', 'IPO')
+    ipos = list(IPO.objects.only('pk', 'company_name'))
+    for ipo in ipos:
+        ipo.normalized_name = normalize_name(ipo.company_name)
+    IPO.objects.bulk_update(ipos, ['normalized_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipo_app', '0011_export_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ipo',
+            name='normalized_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_normalized_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ipo',
+            index=models.Index(fields=['normalized_name'], name='ipo_normalized_name_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+def number_existing_changes(apps, schema_editor):
+    # Existing IPOs in updated_at order, then the tombstones; sync clients
+    # start over with a full sync after this migration
+    IPO = apps.get_model('ipo_app', 'IPO')
+    IPODeletion = apps.get_model('ipo_app', 'IPODeletion')
+    ChangeSequence = apps.get_model('ipo_app', 'ChangeSequence')
+    seq = 0
+    for model, order in ((IPO, ('updated_at', 'id')), (IPODeletion, ('id',))):
+        rows = list(model.objects.order_by(*order).only('pk'))
+        for row in rows:
+            seq += 1
+            row.change_seq = seq
+        model.objects.bulk_update(rows, ['change_seq'], batch_size=500)
+    ChangeSequence.objects.create(name='ipo', value=seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipo_app', '0012_ipo_normalized_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ipo',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ipodeletion',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ipo',
+            index=models.Index(fields=['change_seq'], name='ipo_change_seq_idx'),
+        ),
+    ]
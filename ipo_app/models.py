@@ -1,8 +1,17 @@
-from django.db import models
+import secrets
+
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 
 # Create your models here.
 
+def percent_change(base, value):
+    # Shared by the IPO return properties and the list fast path in serializers.py
+    if base and value:
+        return round(((value - base) / base) * 100, 2)
+    return None
+
 class IPO(models.Model):
     STATUS_CHOICES = [
         ('upcoming', 'Upcoming'),
@@ -11,6 +20,9 @@ class IPO(models.Model):
     ]
     
     company_name = models.CharField(max_length=255)
+    # normalize_name(company_name), kept in sync by a pre_save signal; bulk
+    # writes set it themselves
+    normalized_name = models.CharField(max_length=255, blank=True, default='', editable=False)
     logo = models.ImageField(upload_to='logos/', null=True, blank=True)
     price_band = models.CharField(max_length=100)
     open_date = models.DateField()
@@ -27,24 +39,82 @@ class IPO(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Position in the change sequence (see ChangeSequence), set on every
+    # write; the delta sync watermark
+    change_seq = models.BigIntegerField(default=0, editable=False)
+    
+    def save(self, *args, **kwargs):
+        # The number is taken in the transaction that writes the row
+        with transaction.atomic():
+            self.change_seq = ChangeSequence.reserve()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+            super().save(*args, **kwargs)
     
     @property
     def listing_gain(self):
-        if self.ipo_price and self.listing_price:
-            return round(((self.listing_price - self.ipo_price) / self.ipo_price) * 100, 2)
-        return None
+        return percent_change(self.ipo_price, self.listing_price)
     
     @property
     def current_return(self):
-        if self.ipo_price and self.current_market_price:
-            return round(((self.current_market_price - self.ipo_price) / self.ipo_price) * 100, 2)
-        return None
+        return percent_change(self.ipo_price, self.current_market_price)
     
     def __str__(self):
         return self.company_name
     
     class Meta:
         ordering = ['-open_date']
+        indexes = [
+            # Delta sync scans IPOs changed after an (updated_at, id) watermark
+            models.Index(fields=['updated_at', 'id'], name='ipo_updated_at_idx'),
+            # Date-range scans of the calendar API
+            models.Index(fields=['open_date'], name='ipo_open_date_idx'),
+            models.Index(fields=['close_date'], name='ipo_close_date_idx'),
+            models.Index(fields=['listing_date'], name='ipo_listing_date_idx'),
+            # Duplicate checks of the bulk import and the create form
+            models.Index(fields=['normalized_name'], name='ipo_normalized_name_idx'),
+            models.Index(fields=['change_seq'], name='ipo_change_seq_idx'),
+        ]
+
+# Tombstones for deleted IPOs, so sync clients can mirror deletions
+class IPODeletion(models.Model):
+    ipo_id = models.BigIntegerField()
+    company_name = models.CharField(max_length=255)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    change_seq = models.BigIntegerField(default=0, db_index=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.company_name} (deleted {self.deleted_at:%Y-%m-%d})"
+
+# Monotonic change counter for delta sync. Every IPO write and tombstone
+# takes the next number(s) inside its own transaction. Bumping the counter
+# row locks it until commit, so numbers become visible in commit order (which
+# application-clock timestamps do not guarantee on Postgres, or for writes
+# stamped before they got the lock) and a sync watermark never skips a row.
+# Writes that bypass IPO.save() (bulk_create, bulk_update, queryset.update)
+# must set change_seq themselves with reserve().
+class ChangeSequence(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    
+    @classmethod
+    def reserve(cls, count=1, name='ipo'):
+        """Take the next count numbers and return the first; call inside the write transaction."""
+        if not transaction.get_connection().in_atomic_block:
+            raise RuntimeError('ChangeSequence.reserve() must run inside the transaction of the write.')
+        if not cls.objects.filter(name=name).update(value=F('value') + count):
+            cls.objects.create(name=name, value=count)
+        return cls.objects.filter(name=name).values_list('value', flat=True).get() - count + 1
+    
+    @classmethod
+    def current(cls, name='ipo'):
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 0
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
 
 # User IPO Watchlist
 class IPOTracking(models.Model):
@@ -96,6 +166,8 @@ class IPOApplication(models.Model):
     status = models.CharField(max_length=20, choices=APPLICATION_STATUS_CHOICES, default='applied')
     quantity_applied = models.IntegerField(default=0)
     remarks = models.TextField(blank=True)
+    # Set by a pre_save signal whenever status changes; read by the daily digest
+    status_updated_at = models.DateTimeField(null=True, blank=True, db_index=True)
     
     class Meta:
         unique_together = ['user', 'ipo']
@@ -103,6 +175,114 @@ class IPOApplication(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.ipo.company_name} ({self.get_status_display()})"
 
+# Engagement counters per IPO, kept up to date by ipo_app.stats. Rebuild with
+# `manage.py reconcile_ipo_stats` if they drift from the source tables.
+class IPOStats(models.Model):
+    ipo = models.OneToOneField(IPO, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    trackers = models.IntegerField(default=0)
+    active_reminders = models.IntegerField(default=0)
+    applications = models.IntegerField(default=0)
+    applications_applied = models.IntegerField(default=0)
+    applications_under_review = models.IntegerField(default=0)
+    applications_approved = models.IntegerField(default=0)
+    applications_rejected = models.IntegerField(default=0)
+    applications_allotted = models.IntegerField(default=0)
+    applications_not_allotted = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'IPO stats'
+        indexes = [
+            # Popularity rankings
+            models.Index(fields=['-applications'], name='ipostats_applications_idx'),
+            models.Index(fields=['-trackers'], name='ipostats_trackers_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ipo_id}: {self.trackers} trackers, {self.applications} applications"
+
+# Precomputed analytics dashboard figures, written by ipo_app.analytics
+class AnalyticsSnapshot(models.Model):
+    data = models.JSONField()
+    computed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    duration_ms = models.FloatField()
+    
+    class Meta:
+        ordering = ['-computed_at']
+    
+    def __str__(self):
+        return f"Analytics snapshot {self.computed_at:%Y-%m-%d %H:%M}"
+
+# Daily digest bookkeeping (ipo_app.digest). Each run reports changes since
+# the previous completed run, compared against the IPO state it recorded.
+# Runs with failed sends are saved without finished_at and record no state.
+class DigestRun(models.Model):
+    started_at = models.DateTimeField(db_index=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    users = models.IntegerField(default=0)
+    sent = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"Digest run {self.started_at:%Y-%m-%d %H:%M} ({self.sent} sent)"
+
+class IPODigestState(models.Model):
+    ipo = models.OneToOneField(IPO, on_delete=models.CASCADE, primary_key=True)
+    status = models.CharField(max_length=20)
+    current_market_price = models.FloatField(null=True, blank=True)
+
+# Queued exports (ipo_app.export_jobs), run by `manage.py run_export_worker`
+class ExportJob(models.Model):
+    STATE_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    dataset = models.CharField(max_length=30)
+    format = models.CharField(max_length=10)
+    params = models.JSONField(default=dict)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    rows_total = models.IntegerField(null=True, blank=True)
+    rows_written = models.IntegerField(default=0)
+    artifact = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Bumped with every progress update; a running job that stops updating
+    # belonged to a worker that died and is queued again
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['state', 'created_at'], name='exportjob_state_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.dataset}.{self.format} export #{self.pk} ({self.state})"
+
+def new_calendar_feed_secret():
+    return secrets.token_urlsafe(24)
+
+# Secret part of a user's private calendar feed URL (see views.calendar_feed_token).
+# Resetting it from the dashboard revokes every URL handed out before.
+class CalendarFeed(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='calendar_feed')
+    secret = models.CharField(max_length=64, default=new_calendar_feed_secret)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Calendar feed of {self.user.username}"
+
 class ContactMessage(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
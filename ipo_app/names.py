@@ -0,0 +1,175 @@
+"""
+Company-name matching for duplicate detection.
+
+normalize_name() reduces a name to a key that ignores case, accents,
+punctuation and legal suffixes, so "TechCorp Solutions Ltd." and
+"Techcorp Solutions" share the key "techcorp solutions". The key is stored,
+indexed, in IPO.normalized_name, which makes exact duplicate checks one
+indexed lookup.
+
+Near-duplicates ("TechCorp Solution", "Tech Corp Solutions") are found with
+NameIndex, an in-memory inverted index from character trigrams to names.
+Similarity is the Dice coefficient of the trigram sets. Names are indexed
+under their rarest trigrams only, and a query only scores the names that
+turn up in several of its own rarest trigrams' posting lists (prefix
+filtering, counting the lists each name is in as ScanCount does), so it
+neither compares a name with every other nor reads the long posting lists
+of common trigrams such as "ltd" or "tec".
+
+ipo_name_index() keeps one index of all IPOs per process and rebuilds it
+when the IPO version (see dashboard.py) changes.
+"""
+import heapq
+import math
+import unicodedata
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+
+from .dashboard import ipo_version
+from .models import IPO
+
+LEGAL_SUFFIXES = frozenset({
+    'co', 'company', 'corp', 'corporation', 'inc', 'incorporated', 'limited', 'llc', 'llp', 'ltd', 'plc',
+    'pvt', 'private',
+})
+
+# Posting lists of a query's prefix that a name must be in to be scored
+PREFIX_OVERLAP = 3
+
+Match = namedtuple('Match', 'similarity ident name')
+
+
+def normalize_name(name):
+    """The duplicate-detection key of a company name."""
+    text = unicodedata.normalize('NFKD', name or '')
+    # Drop accents; other marks (Indic vowel signs) are part of the word
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold().replace('&', ' and ')
+    words = ''.join(
+        char if char.isalnum() or unicodedata.category(char).startswith('M') else ' ' for char in text
+    ).split()
+    if len(words) > 1 and words[0] == 'the':
+        words.pop(0)
+    # "Pvt. Ltd.", "Private Limited", "& Co."
+    while len(words) > 1 and (words[-1] in LEGAL_SUFFIXES or words[-1] == 'and'):
+        words.pop()
+    return ' '.join(words)
+
+
+def trigrams(key):
+    padded = f' {key} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def overlap_needed(size, threshold):
+    """Trigrams a name with size trigrams shares with any name threshold similar to it."""
+    # Dice = 2c / (a + b) >= t, and b >= t * a / (2 - t), so c >= t * a / (2 - t)
+    return max(1, math.ceil(threshold * size / (2 - threshold) - 1e-9))
+
+
+class NameIndex:
+    """
+    A trigram index of names, queried with similar().
+
+    Trigrams are ranked by how few of the keys given to the constructor
+    contain them (unseen ones first). A name is indexed under the rarest of
+    its trigrams only, its prefix: all but overlap_needed - PREFIX_OVERLAP of
+    them. Two names similar enough share overlap_needed trigrams, so both
+    prefixes hold the PREFIX_OVERLAP rarest shared ones, and a query counts
+    how many of its prefix's posting lists each name turns up in and only
+    scores the names found in at least that many. Pass the keys of all the
+    names to be added; the index stays exact without them, only slower.
+    """
+
+    def __init__(self, keys=(), threshold=None):
+        self.threshold = settings.IPO_NAME_SIMILARITY if threshold is None else threshold
+        frequency = Counter(gram for key in keys for gram in trigrams(key))
+        # Trigram -> rank, rarest first; every name sorts its trigrams by it
+        self.order = {gram: n for n, gram in enumerate(sorted(frequency, key=lambda gram: (frequency[gram], gram)))}
+        self.entries = []  # (ident, name, key, trigrams)
+        self.postings = defaultdict(list)  # trigram -> entry numbers
+        self.keys = defaultdict(list)  # key -> entry numbers
+
+    def __len__(self):
+        return len(self.entries)
+
+    def prefix(self, grams):
+        """
+        Return (prefix, shared): the trigrams a name is indexed and queried
+        under, and how many of them any similar indexed name shares.
+        """
+        # Trigrams no indexed name has can go anywhere in the order
+        unseen = grams.difference(self.order)
+        rarest = [*unseen, *sorted(grams - unseen, key=self.order.__getitem__)]
+        needed = overlap_needed(len(grams), self.threshold)
+        return rarest[:len(grams) - needed + PREFIX_OVERLAP], min(PREFIX_OVERLAP, needed)
+
+    def add(self, ident, name, key=None):
+        key = normalize_name(name) if key is None else key
+        grams = trigrams(key)
+        number = len(self.entries)
+        self.entries.append((ident, name, key, grams))
+        self.keys[key].append(number)
+        for gram in sorted(grams.difference(self.order)):
+            self.order[gram] = -len(self.order)
+        for gram in self.prefix(grams)[0]:
+            self.postings[gram].append(number)
+
+    def similar(self, name, threshold=None, limit=5, key=None):
+        """The indexed names at least threshold similar to name, best first."""
+        threshold = self.threshold if threshold is None else threshold
+        if threshold < self.threshold:
+            raise ValueError(f'This index finds names at least {self.threshold} similar.')
+        key = normalize_name(name) if key is None else key
+        grams = trigrams(key)
+        candidates = set(self.keys.get(key, ()))
+        prefix, shared = self.prefix(grams)
+        if prefix:
+            # seen[n]: the names in more than n of the posting lists so far,
+            # counted with set operations rather than per name
+            seen = [set() for _ in range(shared)]
+            for gram in prefix:
+                numbers = self.postings.get(gram)
+                if numbers:
+                    for count in range(shared - 1, 0, -1):
+                        seen[count].update(seen[count - 1].intersection(numbers))
+                    seen[0].update(numbers)
+            candidates.update(seen[-1])
+
+        # A match also has between t / (2 - t) and (2 - t) / t times as many
+        shortest = len(grams) * threshold / (2 - threshold) - 1e-9
+        longest = len(grams) * (2 - threshold) / threshold + 1e-9
+        matches = []
+        for number in candidates:
+            ident, other, other_key, other_grams = self.entries[number]
+            if other_key == key:
+                similarity = 1.0
+            elif not shortest <= len(other_grams) <= longest:
+                continue
+            else:
+                similarity = 2 * len(grams & other_grams) / (len(grams) + len(other_grams))
+            if similarity >= threshold:
+                matches.append(Match(round(similarity, 3), ident, other))
+        return heapq.nlargest(limit, matches, key=lambda match: match.similarity)
+
+
+_cached_index = (None, None)
+
+
+def ipo_name_index():
+    """The index of all IPO names (ident is the IPO's pk); do not add to it."""
+    global _cached_index
+    version = ipo_version()
+    cached_version, index = _cached_index
+    if index is None or cached_version != version:
+        rows = list(IPO.objects.order_by('pk').values_list('pk', 'company_name', 'normalized_name'))
+        index = NameIndex(key for _, _, key in rows)
+        for pk, name, key in rows:
+            index.add(pk, name, key)
+        _cached_index = (version, index)
+    return index
+
+
+def similar_ipos(name, exclude=None):
+    """IPOs whose names are the same as or similar to name: [Match], best first."""
+    return [match for match in ipo_name_index().similar(name) if match.ident != exclude]
@@ -0,0 +1,171 @@
+"""
+Per-request SQL metrics for SQLProfilingMiddleware.
+
+execute_wrapper is installed on every database connection when it opens and
+forwards queries to the QueryRecorder of the current request, if it is being
+profiled. The recorder lives in a context variable so that it also follows
+async views into the threads the async ORM runs queries in. The totals are
+aggregated per view in process memory and periodically flushed to the shared
+'metrics' cache, so the metrics endpoint can report them for all workers.
+
+Each worker's totals are a series of their own (a worker label): a sum over
+the workers currently registered would drop whenever one restarts, which
+Prometheus reads as a counter reset. Aggregate with sum(rate(...)) instead.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+cache = ConnectionProxy(caches, 'metrics')
+
+REGISTRY_KEY = 'query_metrics:workers'
+WORKER_TIMEOUT = 7 * 24 * 3600
+
+# Per view: sampled requests, queries, SQL seconds, request seconds, N+1 requests
+FIELDS = ('requests', 'queries', 'sql_seconds', 'request_seconds', 'n_plus_one')
+
+METRICS = (
+    ('requests', 'ipo_view_sampled_requests_total', 'Requests profiled by SQLProfilingMiddleware.'),
+    ('queries', 'ipo_view_sql_queries_total', 'SQL queries issued by profiled requests.'),
+    ('sql_seconds', 'ipo_view_sql_seconds_total', 'Time spent in SQL by profiled requests.'),
+    ('request_seconds', 'ipo_view_request_seconds_total', 'Wall time of profiled requests.'),
+    ('n_plus_one', 'ipo_view_n_plus_one_requests_total', 'Profiled requests that repeated a query shape.'),
+)
+
+_recorder = ContextVar('query_recorder', default=None)
+_lock = threading.Lock()
+_views = {}
+_last_flush = 0.0
+_worker = (None, None)
+
+
+class QueryRecorder:
+    """Query count, SQL time and repeated query shapes of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            # SQL reaches the wrapper with placeholders, so the text is the shape
+            self.shapes[sql] += 1
+
+    def repeated(self, threshold):
+        return {sql: count for sql, count in self.shapes.items() if count >= threshold}
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    # connection_created fires again whenever a persistent connection reconnects
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+@contextmanager
+def recording(recorder):
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def record(view, recorder, request_seconds, n_plus_one):
+    _worker_id()
+    with _lock:
+        totals = _views.setdefault(view, dict.fromkeys(FIELDS, 0))
+        totals['requests'] += 1
+        totals['queries'] += recorder.count
+        totals['sql_seconds'] += recorder.duration
+        totals['request_seconds'] += request_seconds
+        totals['n_plus_one'] += bool(n_plus_one)
+    if time.monotonic() - _last_flush >= settings.SQL_PROFILING_FLUSH_INTERVAL:
+        flush()
+
+
+def _worker_key(worker_id):
+    return f'query_metrics:worker:{worker_id}'
+
+
+def _worker_id():
+    # Unique per process, and regenerated after a fork (gunicorn --preload)
+    global _worker
+    pid, worker_id = _worker
+    if pid != os.getpid():
+        _views.clear()
+        _worker = (os.getpid(), f'{os.getpid()}-{uuid.uuid4().hex[:8]}')
+    return _worker[1]
+
+
+def flush():
+    global _last_flush
+    worker_id = _worker_id()
+    with _lock:
+        _last_flush = time.monotonic()
+        snapshot = {view: dict(totals) for view, totals in _views.items()}
+    cache.set(_worker_key(worker_id), snapshot, WORKER_TIMEOUT)
+    # Registering is read-modify-write; a worker lost to a concurrent update
+    # re-registers on its next flush
+    workers = cache.get(REGISTRY_KEY) or []
+    if worker_id not in workers:
+        cache.set(REGISTRY_KEY, workers + [worker_id], None)
+
+
+def _live_snapshots(workers):
+    """The snapshots of workers; workers whose snapshot expired leave the registry."""
+    snapshots = cache.get_many([_worker_key(worker) for worker in workers])
+    live = [worker for worker in workers if _worker_key(worker) in snapshots]
+    if live != workers:
+        # Workers that stopped (restarts, deploys) stop flushing, and their
+        # snapshots expire after WORKER_TIMEOUT
+        cache.set(REGISTRY_KEY, live, None)
+    return snapshots
+
+
+def collect():
+    """Return {worker: {view: totals}} for every registered worker."""
+    flush()
+    workers = cache.get(REGISTRY_KEY) or []
+    snapshots = _live_snapshots(workers)
+    return {worker: snapshots[_worker_key(worker)] for worker in workers if _worker_key(worker) in snapshots}
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(workers):
+    lines = [
+        '# HELP ipo_sql_profiling_sample_rate Fraction of requests profiled.',
+        '# TYPE ipo_sql_profiling_sample_rate gauge',
+        f'ipo_sql_profiling_sample_rate {settings.SQL_PROFILING_SAMPLE_RATE}',
+    ]
+    for field, name, help_text in METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for worker in sorted(workers):
+            views = workers[worker]
+            for view in sorted(views):
+                lines.append(f'{name}{{view="{_label(view)}",worker="{_label(worker)}"}} {views[view][field]}')
+    return '\n'.join(lines) + '\n'
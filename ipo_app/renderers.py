@@ -0,0 +1,35 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer for responses that are already plain Python data.
+
+    Encodes with the stdlib C encoder directly, without DRF's encoder hooks
+    or circular-reference tracking. Output is byte-identical to
+    JSONRenderer; indented output and data the stdlib encoder cannot handle
+    (lazy strings, Decimals, ...) fall back to the parent implementation.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = json.JSONEncoder(
+            ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict,
+            check_circular=False,
+            separators=(',', ':') if self.compact else (', ', ': '),
+        )
+        try:
+            ret = encoder.encode(data)
+        except (TypeError, ValueError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
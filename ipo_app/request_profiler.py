@@ -0,0 +1,161 @@
+"""
+Sampling call-stack profiler for RequestProfilerMiddleware.
+
+A single background thread wakes every PROFILER_SAMPLE_INTERVAL seconds and
+records the current stack of each thread with a request being profiled, so
+the cost does not grow with the depth or speed of the code under it. Stacks
+are kept in the folded format ("outer;inner;leaf count") that speedscope and
+flamegraph.pl read directly.
+
+Kept profiles go into a ring buffer of PROFILER_RING_SIZE slots in the shared
+'metrics' cache, so every worker sees the same recent profiles.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+
+cache = ConnectionProxy(caches, 'metrics')
+
+COUNTER_KEY = 'request_profiles:next'
+MAX_DEPTH = 200
+
+_base_dir = str(settings.BASE_DIR) + os.sep
+_template_dir = os.sep + os.path.join('django', 'template') + os.sep
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(_base_dir):
+        filename = filename[len(_base_dir):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_qualname} ({filename}:{code.co_firstlineno})'
+
+
+class Profile:
+    """Folded stack samples of one request."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.template_samples = 0
+
+    def add(self, frame):
+        labels = []
+        in_template = False
+        while frame is not None and len(labels) < MAX_DEPTH:
+            code = frame.f_code
+            in_template = in_template or _template_dir in code.co_filename
+            labels.append(_frame_label(code))
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(labels))] += 1
+        self.samples += 1
+        self.template_samples += in_template
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Sampler(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name='request-profiler', daemon=True)
+        self.interval = interval
+        self.lock = threading.Lock()
+        # thread id -> profiles of the requests running on it; an ASGI event
+        # loop thread runs several requests at once
+        self.active = {}
+        self.wakeup = threading.Event()
+
+    def add(self, thread_id, profile):
+        with self.lock:
+            self.active.setdefault(thread_id, []).append(profile)
+            self.wakeup.set()
+
+    def remove(self, thread_id, profile):
+        with self.lock:
+            profiles = self.active.get(thread_id, [])
+            if profile in profiles:
+                profiles.remove(profile)
+            if not profiles:
+                self.active.pop(thread_id, None)
+            if not self.active:
+                self.wakeup.clear()
+
+    def run(self):
+        while True:
+            # Sleep without polling while nothing is being profiled
+            self.wakeup.wait()
+            time.sleep(self.interval)
+            with self.lock:
+                active = [(thread_id, list(profiles)) for thread_id, profiles in self.active.items()]
+            frames = sys._current_frames()
+            for thread_id, profiles in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    for profile in profiles:
+                        profile.add(frame)
+
+
+_sampler = (None, None)
+_sampler_lock = threading.Lock()
+
+
+def sampler():
+    # One sampler thread per process, restarted after a fork (gunicorn --preload)
+    global _sampler
+    with _sampler_lock:
+        pid, thread = _sampler
+        if pid != os.getpid():
+            thread = Sampler(settings.PROFILER_SAMPLE_INTERVAL)
+            thread.start()
+            _sampler = (os.getpid(), thread)
+        return thread
+
+
+def _slot_key(profile_id):
+    return f'request_profiles:slot:{profile_id % settings.PROFILER_RING_SIZE}'
+
+
+def save(profile, request, trigger, duration):
+    cache.add(COUNTER_KEY, 0, None)
+    profile_id = cache.incr(COUNTER_KEY)
+    match = request.resolver_match
+    meta = {
+        'id': profile_id,
+        'view': match.view_name if match else None,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': request.user.get_username() if request.user.is_authenticated else None,
+        'trigger': trigger,
+        'duration_ms': round(duration * 1000, 1),
+        'samples': profile.samples,
+        'sample_interval_ms': profile.interval * 1000,
+        'template_ms': round(profile.template_samples * profile.interval * 1000, 1),
+        'created_at': timezone.now().isoformat(),
+    }
+    cache.set(_slot_key(profile_id), {'meta': meta, 'folded': profile.folded()}, None)
+    return profile_id
+
+
+def recent():
+    """Metadata of the profiles still in the ring buffer, newest first."""
+    keys = [f'request_profiles:slot:{slot}' for slot in range(settings.PROFILER_RING_SIZE)]
+    entries = cache.get_many(keys).values()
+    return sorted((entry['meta'] for entry in entries), key=lambda meta: meta['id'], reverse=True)
+
+
+def get(profile_id):
+    entry = cache.get(_slot_key(profile_id))
+    if entry is None or entry['meta']['id'] != profile_id:
+        return None
+    return entry
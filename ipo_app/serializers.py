@@ -1,10 +1,21 @@
+from operator import itemgetter
+
+from django.utils import timezone
 from rest_framework import serializers
-from .models import IPO
+from .models import IPO, IPODeletion, percent_change
 
 class IPOSerializer(serializers.ModelSerializer):
     listing_gain = serializers.ReadOnlyField()
     current_return = serializers.ReadOnlyField()
     
+    def __init__(self, *args, **kwargs):
+        # Optional sparse fieldset, e.g. IPOSerializer(ipo, fields=['id', 'status'])
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
     class Meta:
         model = IPO
         fields = [
@@ -14,4 +25,86 @@ class IPOSerializer(serializers.ModelSerializer):
             'rhp_pdf', 'drhp_pdf', 'listing_gain', 'current_return',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at'] 
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class IPODeletionSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='ipo_id')
+    
+    class Meta:
+        model = IPODeletion
+        fields = ['id', 'company_name', 'deleted_at']
+
+
+class IPOFastListSerializer:
+    """
+    Read-only fast path for IPO list responses.
+
+    Builds exactly the representation IPOSerializer produces, but from
+    ``values()`` rows instead of model instances, so no model or DRF field
+    objects are created per row. Use ``columns()`` to get the projection.
+    """
+    computed_fields = {
+        'listing_gain': ('ipo_price', 'listing_price'),
+        'current_return': ('ipo_price', 'current_market_price'),
+    }
+    date_fields = {'open_date', 'close_date', 'listing_date'}
+    datetime_fields = {'created_at', 'updated_at'}
+    float_fields = {'ipo_price', 'listing_price', 'current_market_price'}
+    file_fields = {'logo', 'rhp_pdf', 'drhp_pdf'}
+
+    def __init__(self, rows, fields=None, context=None):
+        self.rows = rows
+        self.fields = list(fields or IPOSerializer.Meta.fields)
+        self.context = context or {}
+
+    @classmethod
+    def columns(cls, fields=None):
+        """Model columns needed to represent ``fields``."""
+        columns = []
+        for name in fields or IPOSerializer.Meta.fields:
+            for column in cls.computed_fields.get(name, (name,)):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    def _getter(self, name):
+        if name in self.computed_fields:
+            base, value = self.computed_fields[name]
+            return lambda row: percent_change(row[base], row[value])
+        if name in self.date_fields:
+            return lambda row: row[name].isoformat() if row[name] is not None else None
+        if name in self.datetime_fields:
+            tz = timezone.get_current_timezone()
+            return lambda row: self._datetime(row[name], tz)
+        if name in self.float_fields:
+            return lambda row: float(row[name]) if row[name] is not None else None
+        if name in self.file_fields:
+            storage = IPO._meta.get_field(name).storage
+            return lambda row: self._file_url(storage, row[name])
+        return itemgetter(name)
+
+    @staticmethod
+    def _datetime(value, tz):
+        # Mirrors rest_framework.fields.DateTimeField.to_representation
+        if not value:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    def _file_url(self, storage, name):
+        # Mirrors rest_framework.fields.FileField.to_representation
+        if not name:
+            return None
+        url = storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    @property
+    def data(self):
+        getters = [(name, self._getter(name)) for name in self.fields]
+        return [{name: get(row) for name, get in getters} for row in self.rows]
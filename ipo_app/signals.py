@@ -0,0 +1,101 @@
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import stats
+from .dashboard import bump_ipo_version, bump_user_version
+from .names import normalize_name
+from .query_metrics import install_execute_wrapper
+from .models import ChangeSequence, IPO, IPOApplication, IPODeletion, IPONotification, IPOReminder, IPOStats, IPOTracking
+
+
+@receiver(pre_save, sender=IPO)
+def normalize_ipo_name(sender, instance, **kwargs):
+    instance.normalized_name = normalize_name(instance.company_name)
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'company_name' in update_fields and 'normalized_name' not in update_fields:
+        # update_fields is frozen; persist the key alongside the name
+        sender.objects.filter(pk=instance.pk).update(normalized_name=instance.normalized_name)
+
+
+@receiver(post_delete, sender=IPO)
+def record_ipo_deletion(sender, instance, **kwargs):
+    # Covers ipo_delete, bulk delete, the Django admin and cascades; runs
+    # inside the deletion's transaction
+    IPODeletion.objects.create(
+        ipo_id=instance.pk, company_name=instance.company_name, change_seq=ChangeSequence.reserve(),
+    )
+
+
+@receiver(post_save, sender=IPO)
+@receiver(post_delete, sender=IPO)
+def invalidate_ipo_dashboards(sender, instance, **kwargs):
+    bump_ipo_version()
+
+
+@receiver(post_save, sender=IPO)
+def create_ipo_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        IPOStats.objects.get_or_create(ipo=instance)
+
+
+@receiver(post_init, sender=IPOTracking)
+@receiver(post_init, sender=IPOApplication)
+@receiver(post_init, sender=IPOReminder)
+def remember_stats_contribution(sender, instance, **kwargs):
+    stats.remember(instance)
+
+
+@receiver(post_save, sender=IPOTracking)
+@receiver(post_save, sender=IPOApplication)
+@receiver(post_save, sender=IPOReminder)
+def update_ipo_stats(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        stats.record_save(instance, created)
+
+
+@receiver(post_delete, sender=IPOTracking)
+@receiver(post_delete, sender=IPOApplication)
+@receiver(post_delete, sender=IPOReminder)
+def update_ipo_stats_on_delete(sender, instance, origin=None, **kwargs):
+    # Deleting an IPO cascades to its stats row; nothing left to update
+    if isinstance(origin, IPO) or (isinstance(origin, QuerySet) and origin.model is IPO):
+        return
+    stats.record_delete(instance)
+
+
+@receiver(post_init, sender=IPOApplication)
+def remember_application_status(sender, instance, **kwargs):
+    # None when the status was deferred or the row is new
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(pre_save, sender=IPOApplication)
+def stamp_application_status_change(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    loaded = getattr(instance, '_loaded_status', None)
+    if loaded is not None and instance.status != loaded:
+        instance.status_updated_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status_updated_at' not in update_fields:
+            # update_fields is frozen; persist the stamp alongside the status
+            sender.objects.filter(pk=instance.pk).update(status_updated_at=instance.status_updated_at)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=IPOTracking)
+@receiver(post_delete, sender=IPOTracking)
+@receiver(post_save, sender=IPOApplication)
+@receiver(post_delete, sender=IPOApplication)
+@receiver(post_save, sender=IPOReminder)
+@receiver(post_delete, sender=IPOReminder)
+@receiver(post_save, sender=IPONotification)
+@receiver(post_delete, sender=IPONotification)
+def invalidate_user_dashboard(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+connection_created.connect(install_execute_wrapper, dispatch_uid='ipo_app.query_metrics')
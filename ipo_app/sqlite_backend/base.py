@@ -0,0 +1,27 @@
+"""
+SQLite backend for multi-worker production deployments.
+
+Enabled with SQLITE_PRODUCTION_MODE=1. Every new connection applies the
+pragmas in settings.SQLITE_PRAGMAS (WAL journaling, synchronous level,
+busy_timeout, mmap_size, cache_size) and transactions opened by
+ipo_app.transactions.write_transaction start with BEGIN IMMEDIATE.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+from ..transactions import _immediate
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if _immediate.get():
+            self.cursor().execute("BEGIN IMMEDIATE")
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,158 @@
+"""
+Incremental maintenance of the IPOStats engagement counters.
+
+Each tracking, application and reminder row contributes to the counters of
+its IPO (one tracker; one application plus one in its status column; one
+active reminder while active). Signals record what a row contributed when it
+was loaded, and on save or delete apply the difference as a single
+"UPDATE ... SET col = col + n", so concurrent writers never lose updates.
+
+Writes that skip signals (QuerySet.update(), bulk_create(), raw SQL) call
+reconcile() for the IPOs they touched; `manage.py reconcile_ipo_stats` runs
+it for every IPO to repair any other drift.
+"""
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import IPOApplication
+from .transactions import immediate_atomic
+
+STATUS_FIELDS = {status: f'applications_{status}' for status, _ in IPOApplication.APPLICATION_STATUS_CHOICES}
+COUNTER_FIELDS = ('trackers', 'active_reminders', 'applications', *STATUS_FIELDS.values())
+
+
+def contribution(instance):
+    """Return (ipo_id, {counter: n}) for a row, or None if its fields were deferred."""
+    values = instance.__dict__
+    model = instance._meta.model_name
+    if model == 'ipotracking':
+        fields = ('ipo_id',)
+    elif model == 'ipoapplication':
+        fields = ('ipo_id', 'status')
+    else:
+        fields = ('ipo_id', 'is_active')
+    # Reading a deferred field would cost a query per loaded row
+    if any(field not in values for field in fields) or values['ipo_id'] is None:
+        return None
+    if model == 'ipotracking':
+        counters = {'trackers': 1}
+    elif model == 'ipoapplication':
+        counters = {'applications': 1}
+        if values['status'] in STATUS_FIELDS:
+            counters[STATUS_FIELDS[values['status']]] = 1
+    else:
+        counters = {'active_reminders': int(bool(values['is_active']))}
+    return values['ipo_id'], counters
+
+
+def remember(instance):
+    instance._stats_contribution = contribution(instance)
+
+
+def adjust(ipo_id, deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    IPOStats = global_apps.get_model('ipo_app', 'IPOStats')
+    updated = IPOStats.objects.filter(ipo_id=ipo_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()},
+    )
+    if not updated:
+        # No row yet (IPO created in bulk): count it from scratch instead
+        reconcile([ipo_id])
+
+
+def apply_change(old, new):
+    """Apply the counter difference between two contribution() results."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for sign, entry in ((-1, old), (1, new)):
+        if entry is not None:
+            ipo_id, counters = entry
+            for field, value in counters.items():
+                deltas[ipo_id][field] += sign * value
+    for ipo_id, counters in deltas.items():
+        adjust(ipo_id, counters)
+
+
+def record_save(instance, created):
+    old = None if created else getattr(instance, '_stats_contribution', None)
+    new = contribution(instance)
+    if not created and old is None:
+        # What the row counted for before is unknown (loaded with only()/defer())
+        if new is not None:
+            reconcile([new[0]])
+    else:
+        apply_change(old, new)
+    remember(instance)
+
+
+def record_delete(instance):
+    old = getattr(instance, '_stats_contribution', None) or contribution(instance)
+    apply_change(old, None)
+
+
+def count_rows(ipo_ids=None, apps=global_apps):
+    """Return {ipo_id: {counter: n}} computed from the source tables."""
+    counts = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+
+    def grouped(model_name, **aggregates):
+        queryset = apps.get_model('ipo_app', model_name).objects.all()
+        if ipo_ids is not None:
+            queryset = queryset.filter(ipo_id__in=ipo_ids)
+        return queryset.order_by().values('ipo_id').annotate(**aggregates)
+
+    for row in grouped('IPOTracking', trackers=Count('pk')):
+        counts[row['ipo_id']]['trackers'] = row['trackers']
+    for row in grouped('IPOReminder', active_reminders=Count('pk', filter=Q(is_active=True))):
+        counts[row['ipo_id']]['active_reminders'] = row['active_reminders']
+    applications = grouped(
+        'IPOApplication',
+        applications=Count('pk'),
+        **{field: Count('pk', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+    )
+    for row in applications:
+        ipo_id = row.pop('ipo_id')
+        counts[ipo_id].update(row)
+    return counts
+
+
+def reconcile(ipo_ids=None, dry_run=False, apps=global_apps):
+    """
+    Recount the stats of the given IPOs (all when None) from the source
+    tables, creating missing rows and correcting drifted ones. Returns the
+    number of rows created, repaired and already correct.
+    """
+    IPO = apps.get_model('ipo_app', 'IPO')
+    IPOStats = apps.get_model('ipo_app', 'IPOStats')
+    result = {'created': 0, 'repaired': 0, 'unchanged': 0}
+    with immediate_atomic():
+        ipos = IPO.objects.order_by('pk')
+        stats = IPOStats.objects.all()
+        if ipo_ids is not None:
+            ipos = ipos.filter(pk__in=ipo_ids)
+            stats = stats.filter(ipo_id__in=ipo_ids)
+        expected = count_rows(ipo_ids, apps)
+        existing = {row.ipo_id: row for row in stats.select_for_update()}
+        now = timezone.now()
+        create, repair = [], []
+        for ipo_id in ipos.values_list('pk', flat=True).iterator(chunk_size=2000):
+            counters = expected.get(ipo_id, dict.fromkeys(COUNTER_FIELDS, 0))
+            row = existing.get(ipo_id)
+            if row is None:
+                create.append(IPOStats(ipo_id=ipo_id, updated_at=now, **counters))
+            elif any(getattr(row, field) != value for field, value in counters.items()):
+                for field, value in counters.items():
+                    setattr(row, field, value)
+                row.updated_at = now
+                repair.append(row)
+            else:
+                result['unchanged'] += 1
+        result['created'], result['repaired'] = len(create), len(repair)
+        if not dry_run:
+            IPOStats.objects.bulk_create(create, batch_size=500)
+            IPOStats.objects.bulk_update(repair, [*COUNTER_FIELDS, 'updated_at'], batch_size=500)
+    return result
@@ -1,3 +1,448 @@
-from django.test import TestCase
+import os
+import random
+import smtplib
+import tempfile
+import unittest
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import async_views, db_routers, digest, export_jobs, imports
+from .models import ChangeSequence, DigestRun, ExportJob, IPO, IPOApplication, IPOReminder, IPOStats, IPOTracking
+from .names import NameIndex, normalize_name, trigrams
+from .throttling import TokenBucketThrottle
+
+
+def make_ipo(name, **fields):
+    return IPO.objects.create(**{
+        'company_name': name,
+        'price_band': '₹100 - ₹110',
+        'open_date': date(2026, 11, 2),
+        'close_date': date(2026, 11, 4),
+        'issue_size': '₹500 Crores',
+        'issue_type': 'Book Built Issue',
+        'status': 'upcoming',
+        **fields,
+    })
+
+
+class IPOSyncTests(TestCase):
+    """A client following sync tokens sees every create, update and delete."""
+
+    def setUp(self):
+        self.client = APIClient()
+        staff = User.objects.create_user('sync-staff', password='pw', is_staff=True)
+        self.client.force_authenticate(staff)
+
+    def sync(self, token=None, **params):
+        if token:
+            params['sync_token'] = token
+        response = self.client.get('/api/ipo/sync/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def drain(self, token=None, **params):
+        """Follow has_more to the end: (changed ids in order, deleted ids, last token)."""
+        changed, deleted = [], []
+        while True:
+            page = self.sync(token, **params)
+            changed += [ipo['id'] for ipo in page['changed']]
+            deleted += [tombstone['id'] for tombstone in page['deleted']]
+            token = page['sync_token']
+            if not page['has_more']:
+                return changed, deleted, token
+
+    def test_full_sync_pages_through_every_ipo(self):
+        ipos = [make_ipo(f'Company {n}') for n in range(7)]
+        changed, deleted, _ = self.drain(limit=3)
+        self.assertEqual(changed, [ipo.pk for ipo in ipos])
+        self.assertEqual(deleted, [])
+
+    def test_later_calls_see_creates_updates_and_deletes(self):
+        kept, renamed, removed = make_ipo('Kept'), make_ipo('Renamed'), make_ipo('Removed')
+        _, _, token = self.drain()
+
+        created = make_ipo('Created')
+        renamed.company_name = 'Renamed Again'
+        renamed.save()
+        removed_pk = removed.pk
+        removed.delete()
+        response = self.client.post('/api/ipo/bulk/', [{
+            'company_name': 'Bulk Created', 'price_band': 'x', 'open_date': '2026-12-01',
+            'close_date': '2026-12-03', 'issue_size': 'y', 'issue_type': 'SME IPO', 'status': 'upcoming',
+        }], format='json')
+        bulk_pk = response.json()['results'][0]['id']
+        response = self.client.patch('/api/ipo/bulk/', [{'id': kept.pk, 'ipo_price': 105}], format='json')
+        self.assertEqual(response.status_code, 200)
+
+        changed, deleted, token = self.drain(token, limit=2)
+        self.assertEqual(changed, [created.pk, renamed.pk, bulk_pk, kept.pk])
+        self.assertEqual(deleted, [removed_pk])
+
+        # Nothing new: an empty page, and the same position
+        changed, deleted, _ = self.drain(token)
+        self.assertEqual((changed, deleted), ([], []))
+
+    def test_late_commit_with_an_older_timestamp_is_not_skipped(self):
+        ipo = make_ipo('Late')
+        _, _, token = self.drain()
+        make_ipo('Newer')
+        # A writer that stamped updated_at before it got the write lock, and
+        # committed after a newer change was already synced
+        _, _, token = self.drain(token)
+        with transaction.atomic():
+            ipo.updated_at = timezone.now() - timedelta(minutes=5)
+            ipo.change_seq = ChangeSequence.reserve()
+            IPO.objects.bulk_update([ipo], ['updated_at', 'change_seq'])
+        changed, _, _ = self.drain(token)
+        self.assertEqual(changed, [ipo.pk])
+
+    def test_updated_since_starts_at_the_first_later_change(self):
+        make_ipo('Old')
+        since = timezone.now()
+        new = make_ipo('New')
+        changed, _, _ = self.drain(updated_since=since.isoformat())
+        self.assertEqual(changed, [new.pk])
+
+    def test_full_sync_skips_earlier_tombstones(self):
+        make_ipo('Gone').delete()
+        changed, deleted, token = self.drain()
+        self.assertEqual(deleted, [])
+        gone = make_ipo('Gone Later')
+        gone_pk = gone.pk
+        gone.delete()
+        changed, deleted, _ = self.drain(token)
+        self.assertEqual((changed, deleted), ([], [gone_pk]))
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('feed-user', password='pw')
+        self.client.force_login(self.user)
+
+    def feed_url(self):
+        return self.client.get(reverse('ipo_app:user_dashboard')).context['calendar_feed_url']
+
+    def test_reset_revokes_the_old_link(self):
+        old_url = self.feed_url()
+        self.assertEqual(self.client.get(old_url).status_code, 200)
+        self.assertEqual(self.feed_url(), old_url)
+
+        self.client.post(reverse('ipo_app:reset_calendar_feed'))
+        new_url = self.feed_url()
+        self.assertNotEqual(new_url, old_url)
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+
+class DigestTests(TestCase):
+    def setUp(self):
+        self.ipo = make_ipo('Digest Co', open_date=date(2030, 1, 1), close_date=date(2030, 1, 3))
+        user = User.objects.create_user('digest-user', email='digest@example.com')
+        IPOTracking.objects.create(user=user, ipo=self.ipo)
+        digest.run()  # Records the baseline
+        mail.outbox.clear()
+
+    def set_status(self, status):
+        IPO.objects.filter(pk=self.ipo.pk).update(status=status)
+
+    def test_change_made_while_sending_is_reported_next_run(self):
+        self.set_status('open')
+        send_batch = digest.DigestSender.send_batch
+
+        def send_then_change(sender, batch):
+            send_batch(sender, batch)
+            self.set_status('closed')
+
+        with mock.patch.object(digest.DigestSender, 'send_batch', send_then_change):
+            digest.run()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Open', mail.outbox[0].body)
+        digest.run()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Closed', mail.outbox[1].body)
+
+    def test_failed_run_is_not_a_baseline(self):
+        self.set_status('open')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=smtplib.SMTPException), self.assertLogs('ipo_app.digest', 'ERROR'):
+            failed = digest.run()
+        self.assertEqual(failed.failed, 1)
+        self.assertIsNone(DigestRun.objects.get(pk=failed.pk).finished_at)
+        retried = digest.run()
+        self.assertEqual((retried.sent, retried.failed), (1, 0))
+        self.assertIn('Open', mail.outbox[0].body)
+
+
+class StatsTests(TestCase):
+    """IPOStats follows every change to trackings, applications and reminders."""
+
+    def setUp(self):
+        self.ipo = make_ipo('Stats Co')
+        self.users = [User.objects.create_user(f'stats-user-{n}') for n in range(3)]
+        for user in self.users:
+            IPOTracking.objects.create(user=user, ipo=self.ipo)
+            IPOApplication.objects.create(user=user, ipo=self.ipo)
+            IPOReminder.objects.create(
+                user=user, ipo=self.ipo, reminder_date=date(2026, 11, 1), reminder_time=time(9, 0),
+            )
+
+    def stats(self, ipo=None):
+        return IPOStats.objects.get(ipo=ipo or self.ipo)
+
+    def assertNoDrift(self):
+        out = StringIO()
+        call_command('reconcile_ipo_stats', '--dry-run', stdout=out)
+        self.assertIn('Would create 0 and repair 0 IPO stats rows', out.getvalue())
+
+    def test_counts_new_rows(self):
+        stats = self.stats()
+        self.assertEqual(
+            (stats.trackers, stats.applications, stats.applications_applied, stats.active_reminders), (3, 3, 3, 3),
+        )
+        self.assertNoDrift()
+
+    def test_application_status_changes_move_between_columns(self):
+        applications = list(IPOApplication.objects.filter(ipo=self.ipo))
+        applications[0].status = 'allotted'
+        applications[0].save()
+        applications[1].status = 'rejected'
+        applications[1].save()
+        applications[1].status = 'not_allotted'
+        applications[1].save()
+        stats = self.stats()
+        self.assertEqual(stats.applications, 3)
+        self.assertEqual(
+            (stats.applications_applied, stats.applications_allotted, stats.applications_rejected,
+             stats.applications_not_allotted),
+            (1, 1, 0, 1),
+        )
+        self.assertNoDrift()
+
+    def test_deactivated_reminders_stop_counting(self):
+        reminder = IPOReminder.objects.filter(ipo=self.ipo).first()
+        reminder.is_active = False
+        reminder.save()
+        reminder.save()  # Saving again changes nothing
+        self.assertEqual(self.stats().active_reminders, 2)
+        reminder.delete()
+        self.assertEqual(self.stats().active_reminders, 2)
+        IPOReminder.objects.filter(ipo=self.ipo).first().delete()
+        self.assertEqual(self.stats().active_reminders, 1)
+        self.assertNoDrift()
+
+    def test_cascade_deletes(self):
+        other = make_ipo('Other Stats Co')
+        IPOTracking.objects.create(user=self.users[0], ipo=other)
+        self.users[1].delete()
+        stats = self.stats()
+        self.assertEqual((stats.trackers, stats.applications, stats.active_reminders), (2, 2, 2))
+
+        self.ipo.delete()
+        self.assertFalse(IPOStats.objects.filter(ipo_id=self.ipo.pk).exists())
+        self.assertEqual(self.stats(other).trackers, 1)
+        self.assertNoDrift()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ExportJobTests(TestCase):
+    def setUp(self):
+        make_ipo('Export Co')
+        user = User.objects.create_user('export-staff', is_staff=True)
+        export_jobs.submit(user, 'ipos', 'csv', {})
+
+    def test_job_runs_to_a_file(self):
+        job = export_jobs.run(export_jobs.claim())
+        self.assertEqual((job.state, job.rows_written), ('done', 1))
+        self.assertTrue(default_storage.exists(job.artifact.name))
+
+    def test_requeued_job_drops_the_file_it_saved(self):
+        job = export_jobs.claim()
+        save = default_storage.save
+        saved = []
+
+        def save_while_requeued(name, content):
+            # The worker looked dead and another one claimed the job
+            ExportJob.objects.filter(pk=job.pk).update(state='queued')
+            export_jobs.claim()
+            saved.append(save(name, content))
+            return saved[-1]
+
+        with mock.patch.object(default_storage, 'save', save_while_requeued), \
+                self.assertLogs('ipo_app.export_jobs', 'WARNING'):
+            job = export_jobs.run(job)
+        self.assertEqual((job.state, job.attempts, job.artifact.name), ('running', 2, ''))
+        self.assertFalse(default_storage.exists(saved[0]))
+
+
+class NameIndexTests(TestCase):
+    def test_finds_the_names_comparing_every_pair_finds(self):
+        rng = random.Random(3)
+        words = ['Tech', 'Power', 'Infra', 'Kavi', 'Ravi', 'Tara', 'Sun', 'Dev', 'Pharma', 'Global', 'India']
+        names = []
+        for _ in range(400):
+            if names and rng.random() < 0.3:
+                name = rng.choice(names)
+                at = rng.randrange(len(name))
+                names.append(name[:at] + rng.choice('aeiou ') + name[at + 1:])
+            else:
+                names.append(f"{' '.join(rng.sample(words, rng.randint(1, 3)))} {rng.randint(1, 99)} Ltd")
+        keys = [normalize_name(name) for name in names]
+        grams = [trigrams(key) for key in keys]
+        index = NameIndex(keys, threshold=0.8)
+        for n, key in enumerate(keys):
+            expected = {
+                other for other in range(n)
+                if keys[other] == key or 2 * len(grams[n] & grams[other]) / (len(grams[n]) + len(grams[other])) >= 0.8
+            }
+            found = {match.ident for match in index.similar(names[n], limit=n + 1, key=key)}
+            self.assertEqual(found, expected, names[n])
+            index.add(n, names[n], key)
+
+
+class ImportTests(TestCase):
+    def validate(self, on_existing, *names):
+        rows = ''.join(f'{name},Book Built Issue,listed,2026-11-02,2026-11-04,120\n' for name in names)
+        upload = SimpleUploadedFile('ipos.csv', (
+            'company_name,issue_type,status,open_date,close_date,current_market_price\n' + rows
+        ).encode())
+        return imports.validate(imports.read_table(upload), on_existing=on_existing)
+
+    def test_upsert_diffs_against_ipos_as_they_are_at_import(self):
+        edited, deleted = make_ipo('Edited Co'), make_ipo('Deleted Co')
+        validation = self.validate('update', 'Edited Co', 'Deleted Co')
+        # Changed by someone else between validation and import
+        edited.status, edited.current_market_price = 'listed', 120
+        edited.save()
+        deleted.delete()
+
+        counts = imports.import_ipos(validation)
+        self.assertEqual(counts, {'inserted': 1, 'updated': 0, 'unchanged': 1})
+        self.assertEqual(IPO.objects.filter(company_name='Deleted Co').count(), 1)
+
+    def test_skip_skips_companies_added_since_validation(self):
+        validation = self.validate('skip', 'Late Co')
+        make_ipo('Late Co')
+        self.assertEqual(imports.import_ipos(validation), {'inserted': 0, 'updated': 0, 'unchanged': 0})
+        self.assertEqual(validation.skipped, 1)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMPORT_REPORT_TTL=3600)
+    def test_expired_error_reports_are_deleted(self):
+        old = default_storage.save(f'{imports.REPORT_DIR}/old.csv', ContentFile(b'row\n'))
+        new = default_storage.save(f'{imports.REPORT_DIR}/new.csv', ContentFile(b'row\n'))
+        saved_at = timezone.now() - timedelta(hours=2)
+        os.utime(default_storage.path(old), (saved_at.timestamp(), saved_at.timestamp()))
+
+        self.assertEqual(imports.expire_reports(), 1)
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(new))
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = db_routers.PrimaryReplicaRouter()
+
+    @mock.patch.object(db_routers, 'replica_configured', return_value=True)
+    def test_only_app_models_read_from_the_replica(self, _):
+        token = db_routers._use_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_read(IPO), 'replica')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+        finally:
+            db_routers._use_replica.reset(token)
+        self.assertEqual(self.router.db_for_read(IPO), 'default')
+        self.assertEqual(self.router.db_for_write(IPO), 'default')
+
+
+# Run with DATABASE_REPLICA_URL set; the replica mirrors the test database,
+# and sees its rows because a TransactionTestCase commits them
+@unittest.skipUnless(db_routers.replica_configured(), 'no replica database configured')
+class ReplicaRoutedViewTests(TransactionTestCase):
+    databases = {'default', 'replica'} if db_routers.replica_configured() else {'default'}
+
+    def test_routed_view_reads_session_and_user_from_the_primary(self):
+        make_ipo('Replica Co')
+        self.client.force_login(User.objects.create_user('replica-user', password='pw'))
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('ipo_app:ipo_list'))
+        self.assertEqual(response.status_code, 200)
+        primary_sql = ' '.join(query['sql'] for query in primary.captured_queries)
+        replica_sql = ' '.join(query['sql'] for query in replica.captured_queries)
+        self.assertIn('django_session', primary_sql)
+        self.assertIn('auth_user', primary_sql)
+        self.assertIn('ipo_app_ipo', replica_sql)
+        self.assertNotIn('django_session', replica_sql)
+        self.assertNotIn('auth_user', replica_sql)
+
+
+THROTTLE_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{alias}'}
+    for alias in ('default', 'throttle', 'metrics')
+}
+
+
+@override_settings(CACHES=THROTTLE_CACHES)
+@mock.patch.object(TokenBucketThrottle, 'timer', lambda throttle: 1_000_000.0)
+class ThrottleTests(TestCase):
+    """Anonymous API reads: 60/min for lists, 20/min for searches, per IP address."""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        make_ipo('Throttle Co')
+
+    def get(self, path='/api/ipo/', ip='203.0.113.1', **params):
+        return self.client.get(path, params, REMOTE_ADDR=ip)
+
+    def use_up(self, count, **kwargs):
+        statuses = {self.get(**kwargs).status_code for _ in range(count)}
+        self.assertEqual(statuses, {200})
+
+    def test_bucket_refuses_with_retry_after_when_empty(self):
+        self.use_up(60)
+        response = self.get()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_search_has_its_own_bucket(self):
+        self.use_up(60)
+        self.use_up(20, search='Throttle')
+        self.assertEqual(self.get(search='Throttle').status_code, 429)
+        self.assertEqual(self.get().status_code, 429)
+
+    def test_addresses_have_their_own_buckets(self):
+        self.use_up(60)
+        self.assertEqual(self.get().status_code, 429)
+        self.assertEqual(self.get(ip='203.0.113.2').status_code, 200)
+
+    def test_async_views_draw_from_the_same_bucket(self):
+        factory = RequestFactory()
+
+        def get_async():
+            request = factory.get('/api/ipo/', REMOTE_ADDR='203.0.113.1')
+            request.user = AnonymousUser()
+            return async_to_sync(async_views.ipo_api_list)(request)
+
+        self.use_up(30)
+        statuses = {get_async().status_code for _ in range(30)}
+        self.assertEqual(statuses, {200})
+        response = get_async()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
@@ -0,0 +1,76 @@
+"""
+Token-bucket throttling for the IPO API.
+
+A view names the budget a request draws from with get_throttle_scope() (or a
+throttle_scope attribute), e.g. 'ipo_list' or 'ipo_search'. The caller's tier
+is appended, so anonymous callers (keyed by IP address), signed-in users and
+staff (keyed by user id) each have their own rate, looked up in
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] as '<scope>_<tier>'. A rate of
+'60/min' is a bucket of 60 tokens refilled at one per second: bursts of up
+to 60 requests go through, after which callers get one request per second.
+
+Buckets live in the 'throttle' cache, which all gunicorn workers share and
+nothing else writes to (see CACHES in settings; only Redis makes the limits
+hold across hosts and under load). Each bucket is stored as one number, the
+time at which it will be full again (the GCRA form of a token bucket), so a
+check is one get and one set. Like DRF's own throttles this is not atomic:
+concurrent requests with the same key may overdraw a bucket by a few tokens,
+which is fine for shedding load.
+
+The API_THROTTLE_MULTIPLIER environment variable scales every rate, or turns
+the throttles off with 0.
+
+Refused requests get 429 with a Retry-After header from DRF.
+"""
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        # The scope, and so the rate, depends on the request and its caller
+        self.wait_seconds = None
+
+    @property
+    def cache(self):
+        return caches['throttle']
+
+    def get_tier(self, request):
+        user = request.user
+        if user and user.is_authenticated:
+            return 'staff' if user.is_staff else 'user'
+        return 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        get_scope = getattr(view, 'get_throttle_scope', None)
+        scope = get_scope() if get_scope else getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        self.scope = f'{scope}_{self.get_tier(request)}'
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+
+        now = self.timer()
+        interval = self.duration / self.num_requests
+        # When the bucket will be full again, after taking this request's token
+        full_at = max(self.cache.get(self.key) or now, now) + interval
+        if full_at - now > self.duration:
+            self.wait_seconds = full_at - now - self.duration
+            return False
+        self.cache.set(self.key, full_at, self.duration)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import transaction
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Read by ipo_app.sqlite_backend to open transactions with BEGIN IMMEDIATE
+_immediate = ContextVar('immediate_transaction', default=False)
+
+
+@contextmanager
+def immediate_atomic():
+    """transaction.atomic() that takes the SQLite write lock up front."""
+    token = _immediate.set(True)
+    try:
+        with transaction.atomic():
+            yield
+    finally:
+        _immediate.reset(token)
+
+
+def write_transaction(view_func):
+    """Run unsafe requests of a view inside one (immediate on SQLite) transaction.
+
+    BEGIN IMMEDIATE takes the write lock up front, so concurrent writers wait
+    on busy_timeout instead of failing with "database is locked" when a
+    deferred read transaction tries to upgrade to a write.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view_func(request, *args, **kwargs)
+        with immediate_atomic():
+            return view_func(request, *args, **kwargs)
+    return wrapper
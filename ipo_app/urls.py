@@ -10,6 +10,24 @@ router.register(r'ipo', views.IPOViewSet)
 
 app_name = 'ipo_app'
 
+if settings.ASYNC_READ_VIEWS:
+    # Async ORM versions of the read-heavy views, for ASGI workers
+    from . import async_views
+    ipo_list_view = async_views.ipo_list
+    ipo_detail_view = async_views.ipo_detail
+    all_notifications_view = async_views.all_notifications
+    async_api_urlpatterns = [
+        path('api/ipo/', async_views.ipo_api_list, name='ipo-list'),
+        path('api/ipo/upcoming/', async_views.ipo_api_status('upcoming'), name='ipo-upcoming'),
+        path('api/ipo/ongoing/', async_views.ipo_api_status('ongoing'), name='ipo-ongoing'),
+        path('api/ipo/listed/', async_views.ipo_api_status('listed'), name='ipo-listed'),
+    ]
+else:
+    ipo_list_view = views.IPOListView.as_view()
+    ipo_detail_view = views.IPODetailView.as_view()
+    all_notifications_view = views.all_notifications
+    async_api_urlpatterns = []
+
 urlpatterns = [
     # Home URL - Redirects to login
     path('', views.home_view, name='home'),
@@ -21,11 +39,23 @@ urlpatterns = [
     # Dashboard URLs
     path('user-dashboard/', views.user_dashboard, name='user_dashboard'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/panels/counters/', views.admin_panel_counters, name='admin_panel_counters'),
+    path('admin-dashboard/panels/recent-ipos/', views.admin_panel_recent_ipos, name='admin_panel_recent_ipos'),
+    path('admin-dashboard/panels/users/', views.admin_panel_users, name='admin_panel_users'),
     path('analytics/', views.analytics_dashboard, name='analytics'),
+    path('analytics/refresh/', views.refresh_analytics, name='refresh_analytics'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('profiles/', views.request_profiles, name='request_profiles'),
+    path('profiles/<int:profile_id>/', views.download_request_profile, name='download_request_profile'),
     
     # Web URLs (Read-only for regular users)
-    path('ipos/', views.IPOListView.as_view(), name='ipo_list'),
-    path('ipo/<int:pk>/', views.IPODetailView.as_view(), name='ipo_detail'),
+    path('ipos/', ipo_list_view, name='ipo_list'),
+    path('ipo/<int:pk>/', ipo_detail_view, name='ipo_detail'),
+    
+    # iCalendar feeds
+    path('calendar.ics', views.ipo_calendar_feed, name='ipo_calendar_feed'),
+    path('calendar/<str:token>.ics', views.tracked_calendar_feed, name='tracked_calendar_feed'),
+    path('calendar/reset/', views.reset_calendar_feed, name='reset_calendar_feed'),
     
     # Admin-only IPO Management URLs
     path('ipo/create/', views.ipo_create, name='ipo_create'),
@@ -33,13 +63,15 @@ urlpatterns = [
     path('ipo/<int:pk>/delete/', views.ipo_delete, name='ipo_delete'),
     
     # API URLs (Admin only)
+    *async_api_urlpatterns,
     path('api/', include(router.urls)),
     path('track-ipo/<int:pk>/', views.track_ipo, name='track_ipo'),
     path('notification/read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
-    path('all-notifications/', views.all_notifications, name='all_notifications'),
+    path('all-notifications/', all_notifications_view, name='all_notifications'),
     path('send-notification/', views.send_notification, name='send_notification'),
     path('bulk-import/', views.bulk_import_ipos, name='bulk_import'),
-    path('export-csv/', views.export_ipos_csv, name='export_csv'),
+    path('bulk-import/errors.csv', views.bulk_import_report, name='bulk_import_report'),
+    path('export-csv/', views.export_dataset, name='export_csv'),
     path('set-reminder/<int:ipo_id>/', views.set_reminder, name='set_reminder'),
     path('apply-ipo/<int:ipo_id>/', views.apply_ipo, name='apply_ipo'),
     path('my-reminders/', views.my_reminders, name='my_reminders'),
@@ -51,7 +83,11 @@ urlpatterns = [
     
     # Export Data
     path('export-data/', views.export_data_page, name='export_data'),
-    path('export-csv/', views.export_ipos_csv, name='export_csv'),
+    path('export/', views.export_dataset, name='export_dataset'),
+    path('export/jobs/', views.export_job_create, name='export_job_create'),
+    path('export/jobs/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('export-csv/', views.export_dataset, name='export_csv'),
 
     # Footer Pages
     path('privacy-policy/', views.privacy_policy, name='privacy_policy'),
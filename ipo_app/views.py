@@ -4,21 +4,42 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from rest_framework import viewsets, filters
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from rest_framework import viewsets, filters, status as http_status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError as APIValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.models import User
 from django.utils import timezone
-from .models import IPO, IPOTracking, IPONotification, IPOReminder, IPOApplication, ContactMessage
-from .serializers import IPOSerializer
+from .models import ChangeSequence, IPO, IPODeletion, IPOTracking, IPONotification, IPOReminder, IPOApplication, IPOStats, ContactMessage, ExportJob, CalendarFeed, new_calendar_feed_secret
+from .serializers import IPOSerializer, IPOFastListSerializer, IPODeletionSerializer
+from .renderers import FastJSONRenderer
+from .throttling import TokenBucketThrottle
+from .transactions import write_transaction, immediate_atomic
+from .dashboard import dashboard_snapshot, bump_ipo_version
+from . import analytics, export_jobs, exports, icalendar, imports, names, query_metrics, request_profiler
 from django.views.decorators.http import require_POST
 
-import csv
-import io
+import heapq
+import hmac
+import json
+import uuid
 from datetime import datetime
-from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.db.models import Count, F, Min, Q
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.urls import reverse
+from operator import itemgetter
+from datetime import timedelta
 from django.core.mail import send_mail
 from django.utils.html import strip_tags
 
@@ -83,38 +104,44 @@ class IPODetailView(DetailView):
 @login_required
 @user_passes_test(is_admin)
 def ipo_create(request):
+    ipo = None
+    similar = []
     if request.method == 'POST':
         try:
-            # Create new IPO
-            ipo = IPO.objects.create(
+            ipo = IPO(
                 company_name=request.POST.get('company_name'),
                 price_band=request.POST.get('price_band'),
-                open_date=request.POST.get('open_date'),
-                close_date=request.POST.get('close_date'),
+                open_date=parse_date(request.POST.get('open_date') or ''),
+                close_date=parse_date(request.POST.get('close_date') or ''),
                 issue_size=request.POST.get('issue_size'),
                 issue_type=request.POST.get('issue_type'),
                 status=request.POST.get('status'),
                 ipo_price=request.POST.get('ipo_price') or None,
                 listing_price=request.POST.get('listing_price') or None,
                 current_market_price=request.POST.get('current_market_price') or None,
-                listing_date=request.POST.get('listing_date') or None,
+                listing_date=parse_date(request.POST.get('listing_date') or ''),
             )
             
-            # Handle file uploads
-            if 'logo' in request.FILES:
-                ipo.logo = request.FILES['logo']
-            if 'rhp_pdf' in request.FILES:
-                ipo.rhp_pdf = request.FILES['rhp_pdf']
-            if 'drhp_pdf' in request.FILES:
-                ipo.drhp_pdf = request.FILES['drhp_pdf']
-            
-            ipo.save()
-            messages.success(request, 'IPO created successfully!')
-            return redirect('ipo_app:admin_dashboard')
+            # IPOs with the same or a similar name must be confirmed; the
+            # form is shown again, filled in, with the matches
+            if not request.POST.get('confirm_duplicate'):
+                similar = names.similar_ipos(ipo.company_name)
+            if not similar:
+                # Handle file uploads
+                if 'logo' in request.FILES:
+                    ipo.logo = request.FILES['logo']
+                if 'rhp_pdf' in request.FILES:
+                    ipo.rhp_pdf = request.FILES['rhp_pdf']
+                if 'drhp_pdf' in request.FILES:
+                    ipo.drhp_pdf = request.FILES['drhp_pdf']
+                
+                ipo.save()
+                messages.success(request, 'IPO created successfully!')
+                return redirect('ipo_app:admin_dashboard')
         except Exception as e:
             messages.error(request, f'Error creating IPO: {str(e)}')
     
-    return render(request, 'ipo_app/ipo_form.html')
+    return render(request, 'ipo_app/ipo_form.html', {'ipo': ipo, 'similar_ipos': similar})
 
 @login_required
 @user_passes_test(is_admin)
@@ -202,51 +229,17 @@ def user_dashboard(request):
     if request.user.is_staff:
         return redirect('ipo_app:admin_dashboard')
     
-    # Get user-specific data
-    upcoming_ipos = IPO.objects.filter(status='upcoming')[:6]
-    ongoing_ipos = IPO.objects.filter(status='ongoing')[:6]
-    listed_ipos = IPO.objects.filter(status='listed')[:6]
-    
-    # Notifications (latest 5)
-    notifications = IPONotification.objects.filter(user=request.user).order_by('-created_at')[:5]
-    notifications_count = IPONotification.objects.filter(user=request.user).count()
-    
-    # Tracked IPOs
-    tracked_ipos = IPOTracking.objects.filter(user=request.user).select_related('ipo')
-    tracked_ipos_count = tracked_ipos.count()
-    
-    # Applications
-    applications_count = IPOApplication.objects.filter(user=request.user).count()
-    
-    # Active reminders
-    active_reminders = IPOReminder.objects.filter(user=request.user, is_active=True).order_by('reminder_date')
-    reminders_count = active_reminders.count()
-    
-    # Recent applications
-    recent_applications = IPOApplication.objects.filter(user=request.user).select_related('ipo').order_by('-application_date')[:5]
-    
-    context = {
-        'upcoming_ipos': upcoming_ipos,
-        'ongoing_ipos': ongoing_ipos,
-        'listed_ipos': listed_ipos,
-        'total_upcoming': IPO.objects.filter(status='upcoming').count(),
-        'total_ongoing': IPO.objects.filter(status='ongoing').count(),
-        'total_listed': IPO.objects.filter(status='listed').count(),
-        'total_all': IPO.objects.count(),
-        'notifications': notifications,
-        'notifications_count': notifications_count,
-        'tracked_ipos': tracked_ipos,
-        'tracked_ipos_count': tracked_ipos_count,
-        'applications_count': applications_count,
-        'reminders_count': reminders_count,
-        'active_reminders': active_reminders,
-        'recent_applications': recent_applications,
-    }
+    # One cached snapshot per user, invalidated via ipo_app.dashboard versions
+    context = dashboard_snapshot(request.user)
+    context['calendar_feed_url'] = request.build_absolute_uri(
+        reverse('ipo_app:tracked_calendar_feed', args=[calendar_feed_token(request.user)])
+    )
     
     return render(request, 'ipo_app/user_dashboard.html', context)
 
 @login_required
 @user_passes_test(is_admin)
+@write_transaction
 def send_notification(request):
     if request.method == 'POST':
         message = request.POST.get('message')
@@ -255,8 +248,13 @@ def send_notification(request):
             user = User.objects.get(pk=user_id)
             IPONotification.objects.create(user=user, message=message)
         else:
-            for user in User.objects.all():
-                IPONotification.objects.create(user=user, message=message)
+            IPONotification.objects.bulk_create(
+                [IPONotification(user_id=user_id, message=message)
+                 for user_id in User.objects.values_list('pk', flat=True)],
+                batch_size=500,
+            )
+            # bulk_create skips signals; invalidate every user's dashboard
+            bump_ipo_version()
         messages.success(request, 'Notification sent!')
     return redirect('ipo_app:admin_dashboard')
 
@@ -264,234 +262,545 @@ def send_notification(request):
 @login_required
 @user_passes_test(is_admin)
 def admin_dashboard(request):
-    # Get admin-specific data
-    ipos = IPO.objects.all().order_by('-created_at')
-    upcoming_count = IPO.objects.filter(status='upcoming').count()
-    ongoing_count = IPO.objects.filter(status='ongoing').count()
-    listed_count = IPO.objects.filter(status='listed').count()
-    total_count = IPO.objects.count()
-    all_users = User.objects.all()
-    
-    # Get additional data for dashboard
-    total_users = User.objects.count()
-    total_applications = IPOApplication.objects.count()
-    total_tracking = IPOTracking.objects.count()
-    total_reminders = IPOReminder.objects.count()
-    recent_ipos = IPO.objects.all().order_by('-created_at')[:5]
-    
-    context = {
-        'ipos': ipos,
-        'upcoming_count': upcoming_count,
-        'ongoing_count': ongoing_count,
-        'listed_count': listed_count,
-        'total_count': total_count,
-        'total_ipos': total_count,
-        'ongoing_ipos': ongoing_count,
-        'total_users': total_users,
-        'total_applications': total_applications,
-        'total_tracking': total_tracking,
-        'total_reminders': total_reminders,
-        'recent_ipos': recent_ipos,
-        # Add navbar data
-        'total_upcoming': upcoming_count,
-        'total_ongoing': ongoing_count,
-        'total_listed': listed_count,
-        'total_all': total_count,
-        'all_users': all_users,
-    }
-    return render(request, 'ipo_app/admin_dashboard.html', context)
+    # Fast shell: counters and panels are fetched from the admin_panel_* endpoints
+    return render(request, 'ipo_app/admin_dashboard.html')
+
+@login_required
+@user_passes_test(is_admin)
+def admin_panel_counters(request):
+    counters = IPO.objects.aggregate(
+        total_ipos=Count('id'),
+        upcoming_ipos=Count('id', filter=Q(status='upcoming')),
+        ongoing_ipos=Count('id', filter=Q(status='ongoing')),
+        listed_ipos=Count('id', filter=Q(status='listed')),
+    )
+    counters.update(
+        total_users=User.objects.count(),
+        total_applications=IPOApplication.objects.count(),
+        total_tracking=IPOTracking.objects.count(),
+        total_reminders=IPOReminder.objects.count(),
+    )
+    return JsonResponse(counters)
+
+@login_required
+@user_passes_test(is_admin)
+def admin_panel_recent_ipos(request):
+    search = request.GET.get('search', '').strip()
+    queryset = IPO.objects.order_by('-created_at').only(
+        'company_name', 'logo', 'issue_type', 'status', 'issue_size', 'open_date', 'created_at'
+    )
+    if search:
+        queryset = queryset.filter(company_name__icontains=search)
+    page_obj = Paginator(queryset, 5).get_page(request.GET.get('page'))
+    return render(request, 'ipo_app/partials/admin_recent_ipos.html', {'page_obj': page_obj, 'search': search})
+
+@login_required
+@user_passes_test(is_admin)
+def admin_panel_users(request):
+    # Server-side user search for the users panel and notification recipient picker
+    search = request.GET.get('search', '').strip()
+    queryset = User.objects.order_by('username').only('username', 'email', 'is_staff')
+    if search:
+        queryset = queryset.filter(Q(username__icontains=search) | Q(email__icontains=search))
+    page_obj = Paginator(queryset, 20).get_page(request.GET.get('page'))
+    return JsonResponse({
+        'results': [
+            {'id': user.pk, 'username': user.username, 'email': user.email, 'is_staff': user.is_staff}
+            for user in page_obj
+        ],
+        'count': page_obj.paginator.count,
+        'page': page_obj.number,
+        'num_pages': page_obj.paginator.num_pages,
+    })
 
 @login_required
 @user_passes_test(is_admin)
 def bulk_import_ipos(request):
     if request.method == 'POST':
-        csv_file = request.FILES.get('csv_file')
-        skip_duplicates = request.POST.get('skip_duplicates') == 'on'
-        validate_data = request.POST.get('validate_data') == 'on'
+        upload = request.FILES.get('csv_file')
+        # Rows of companies that already exist: skip, update (upsert) or create
+        on_existing = request.POST.get('on_existing', 'skip')
+        if on_existing not in imports.ON_EXISTING:
+            on_existing = 'skip'
+        validate_only = request.POST.get('validate_only') == 'on'
         
-        if not csv_file:
-            messages.error(request, 'Please select a CSV file.')
+        if not upload:
+            messages.error(request, 'Please select a CSV or Excel file.')
             return redirect('ipo_app:bulk_import')
         
-        if not csv_file.name.endswith('.csv'):
-            messages.error(request, 'Please upload a valid CSV file.')
+        try:
+            validation = imports.validate(imports.read_table(upload), on_existing=on_existing)
+        except imports.ImportFileError as e:
+            messages.error(request, str(e))
             return redirect('ipo_app:bulk_import')
         
-        try:
-            # Read CSV file
-            decoded_file = csv_file.read().decode('utf-8')
-            csv_data = csv.DictReader(io.StringIO(decoded_file))
-            
-            imported_count = 0
-            skipped_count = 0
-            error_count = 0
-            errors = []
-            
-            for row_num, row in enumerate(csv_data, start=2):  # Start from 2 to account for header
-                try:
-                    # Validate required fields
-                    if not row.get('company_name'):
-                        raise ValidationError(f"Row {row_num}: Company name is required")
-                    
-                    if not row.get('issue_type'):
-                        raise ValidationError(f"Row {row_num}: Issue type is required")
-                    
-                    if not row.get('status'):
-                        raise ValidationError(f"Row {row_num}: Status is required")
-                    
-                    # Check for duplicates if skip_duplicates is enabled
-                    if skip_duplicates and IPO.objects.filter(company_name=row['company_name']).exists():
-                        skipped_count += 1
-                        continue
-                    
-                    # Parse dates
-                    open_date = None
-                    close_date = None
-                    listing_date = None
-                    
-                    if row.get('open_date'):
-                        try:
-                            open_date = datetime.strptime(row['open_date'], '%Y-%m-%d').date()
-                        except ValueError:
-                            raise ValidationError(f"Row {row_num}: Invalid open_date format. Use YYYY-MM-DD")
-                    
-                    if row.get('close_date'):
-                        try:
-                            close_date = datetime.strptime(row['close_date'], '%Y-%m-%d').date()
-                        except ValueError:
-                            raise ValidationError(f"Row {row_num}: Invalid close_date format. Use YYYY-MM-DD")
-                    
-                    if row.get('listing_date'):
-                        try:
-                            listing_date = datetime.strptime(row['listing_date'], '%Y-%m-%d').date()
-                        except ValueError:
-                            raise ValidationError(f"Row {row_num}: Invalid listing_date format. Use YYYY-MM-DD")
-                    
-                    # Parse fields
-                    issue_size = row.get('issue_size', '')
-                    price_band = row.get('price_band', '')
-                    
-                    ipo_price = None
-                    if row.get('ipo_price') and row['ipo_price'].strip():
-                        try:
-                            ipo_price = float(row['ipo_price'])
-                        except ValueError:
-                            raise ValidationError(f"Row {row_num}: Invalid ipo_price. Must be a number")
-                    
-                    listing_price = None
-                    if row.get('listing_price') and row['listing_price'].strip():
-                        try:
-                            listing_price = float(row['listing_price'])
-                        except ValueError:
-                            raise ValidationError(f"Row {row_num}: Invalid listing_price. Must be a number")
-                    
-                    current_market_price = None
-                    if row.get('current_market_price') and row['current_market_price'].strip():
-                        try:
-                            current_market_price = float(row['current_market_price'])
-                        except ValueError:
-                            raise ValidationError(f"Row {row_num}: Invalid current_market_price. Must be a number")
-                    
-                    # Validate status
-                    valid_statuses = ['upcoming', 'ongoing', 'listed']
-                    if row['status'].lower() not in valid_statuses:
-                        raise ValidationError(f"Row {row_num}: Invalid status. Must be one of: {', '.join(valid_statuses)}")
-                    
-                    # Validate issue type
-                    valid_issue_types = ['Book Built Issue', 'Fixed Price Issue', 'SME IPO']
-                    if row['issue_type'] not in valid_issue_types:
-                        raise ValidationError(f"Row {row_num}: Invalid issue_type. Must be one of: {', '.join(valid_issue_types)}")
-                    
-                    # Create IPO object
-                    ipo = IPO(
-                        company_name=row['company_name'],
-                        issue_type=row['issue_type'],
-                        price_band=price_band,
-                        issue_size=issue_size,
-                        open_date=open_date,
-                        close_date=close_date,
-                        listing_date=listing_date,
-                        status=row['status'].lower(),
-                        ipo_price=ipo_price,
-                        listing_price=listing_price,
-                        current_market_price=current_market_price
-                    )
-                    
-                    # Validate the model
-                    if validate_data:
-                        ipo.full_clean()
-                    
-                    ipo.save()
-                    imported_count += 1
-                    
-                except ValidationError as e:
-                    error_count += 1
-                    errors.append(str(e))
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Row {row_num}: Unexpected error - {str(e)}")
-            
-            # Prepare success/error messages
-            if imported_count > 0:
-                success_msg = f"Successfully imported {imported_count} IPOs."
-                if skipped_count > 0:
-                    success_msg += f" Skipped {skipped_count} duplicates."
-                if error_count > 0:
-                    success_msg += f" {error_count} rows had errors."
-                messages.success(request, success_msg)
-            
-            if errors:
-                error_msg = "Import completed with errors:\n" + "\n".join(errors[:5])  # Show first 5 errors
-                if len(errors) > 5:
-                    error_msg += f"\n... and {len(errors) - 5} more errors."
-                messages.warning(request, error_msg)
-            
-            if imported_count == 0 and error_count > 0:
-                messages.error(request, f"No IPOs were imported. {error_count} errors occurred.")
-            
-        except Exception as e:
-            messages.error(request, f'Error processing CSV file: {str(e)}')
+        # Replace the previous error report of this session, if any
+        previous_report = request.session.pop('bulk_import_report', None)
+        if previous_report:
+            default_storage.delete(previous_report)
+        if validation.has_report:
+            request.session['bulk_import_report'] = default_storage.save(
+                f'{imports.REPORT_DIR}/{uuid.uuid4().hex}.csv', ContentFile(validation.error_report()),
+            )
+        
+        valid_count = len(validation.clean)
+        if validate_only:
+            creates, updates, unchanged = imports.plan(validation)
+            messages.info(
+                request,
+                f"Validated {validation.total} rows: {len(creates)} to insert, "
+                f"{sum(len(ipos) for ipos in updates.values())} to update, {unchanged} unchanged, "
+                f"{validation.invalid} with errors, {validation.skipped} duplicates skipped, "
+                f"{len(validation.warnings)} possible duplicates. Nothing was imported.",
+            )
+        elif valid_count:
+            counts = imports.import_ipos(validation)
+            success_msg = f"Successfully imported {counts['inserted']} IPOs."
+            if on_existing == 'update':
+                success_msg = (
+                    f"Import complete: {counts['inserted']} inserted, {counts['updated']} updated, "
+                    f"{counts['unchanged']} unchanged."
+                )
+            if validation.skipped:
+                success_msg += f" Skipped {validation.skipped} duplicates."
+            if validation.invalid:
+                success_msg += f" {validation.invalid} rows had errors."
+            messages.success(request, success_msg)
+        elif validation.invalid:
+            messages.error(request, f"No IPOs were imported. {validation.invalid} rows had errors.")
+        else:
+            messages.warning(request, f"No IPOs were imported. Skipped {validation.skipped} duplicates.")
         
+        if validation.invalid:
+            first_errors = [
+                f"Row {error.row}: {error.column} - {error.error}"
+                for error in validation.errors.head(5).itertuples()
+            ]
+            messages.warning(
+                request,
+                "Rows with errors:\n" + "\n".join(first_errors)
+                + (f"\n... {len(validation.errors) - 5} more in the error report." if len(validation.errors) > 5 else ''),
+            )
+        if len(validation.warnings):
+            messages.warning(
+                request,
+                "Possible duplicates, please check:\n"
+                + "\n".join(f"Row {warning.row}: {warning.error}" for warning in validation.warnings.head(5).itertuples())
+                + (f"\n... {len(validation.warnings) - 5} more in the report." if len(validation.warnings) > 5 else ''),
+            )
         return redirect('ipo_app:bulk_import')
     
-    return render(request, 'ipo_app/bulk_import.html')
+    return render(request, 'ipo_app/bulk_import.html', {
+        'error_report': request.session.get('bulk_import_report'),
+    })
+
+@login_required
+@user_passes_test(is_admin)
+def bulk_import_report(request):
+    # The error report of this session's last import
+    name = request.session.get('bulk_import_report')
+    if not name or not default_storage.exists(name):
+        raise Http404('No import error report')
+    return FileResponse(
+        default_storage.open(name, 'rb'), as_attachment=True, filename='ipo_import_errors.csv', content_type='text/csv',
+    )
+
+# Calendar event type -> IPO date column
+CALENDAR_EVENTS = {'open': 'open_date', 'close': 'close_date', 'listing': 'listing_date'}
 
 # API Views - Admin only
 class IPOViewSet(viewsets.ModelViewSet):
     queryset = IPO.objects.all()
     serializer_class = IPOSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status']
     search_fields = ['company_name']
     ordering_fields = ['open_date', 'close_date', 'listing_date', 'company_name']
     ordering = ['-open_date']
+    bulk_actions = ('bulk', 'bulk_update', 'bulk_destroy')
+    bulk_max_items = 5000
+    throttle_classes = [TokenBucketThrottle]
+    read_actions = ('list', 'retrieve', 'upcoming', 'ongoing', 'listed', 'calendar', 'sync')
+    
+    def get_throttle_scope(self):
+        # Reads draw from the caller's list budget, or from the smaller search
+        # budget when they filter by name; writes are not throttled
+        if self.action not in self.read_actions:
+            return None
+        return 'ipo_search' if self.request.query_params.get('search') else 'ipo_list'
     
     def get_permissions(self):
+        # Bulk writes are for staff and partner sync accounts only
+        if self.action in self.bulk_actions:
+            return [IsAdminUser()]
         # Only admin users can access API
         if self.request.user.is_authenticated and self.request.user.is_staff:
             return []
         return []
     
+    def get_requested_fields(self):
+        """
+        Sparse fieldset from ?fields=a,b or ?omit=a,b on read requests.
+        Returns None when the full representation is wanted.
+        """
+        if hasattr(self, '_requested_fields'):
+            return self._requested_fields
+        
+        self._requested_fields = None
+        params = self.request.query_params
+        include = [f for f in params.get('fields', '').split(',') if f]
+        omit = [f for f in params.get('omit', '').split(',') if f]
+        if self.request.method not in ('GET', 'HEAD') or not (include or omit):
+            return None
+        
+        all_fields = IPOSerializer.Meta.fields
+        unknown = [f for f in include + omit if f not in all_fields]
+        if unknown:
+            raise APIValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+        
+        fields = [f for f in all_fields if (not include or f in include) and f not in omit]
+        if not fields:
+            raise APIValidationError({'fields': 'At least one field must be selected.'})
+        
+        self._requested_fields = fields
+        return fields
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields and self.action == 'retrieve':
+            # Only fetch the columns the trimmed serializer needs
+            queryset = queryset.only(*IPOFastListSerializer.columns(fields))
+        return queryset
+    
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+    
+    # Read-only fast path for list responses: same output as IPOSerializer,
+    # built from values() rows instead of model instances
+    def get_fast_rows(self, queryset):
+        return queryset.values(*IPOFastListSerializer.columns(self.get_requested_fields()))
+    
+    def get_fast_data(self, rows):
+        return IPOFastListSerializer(
+            rows, fields=self.get_requested_fields(), context=self.get_serializer_context()
+        ).data
+    
+    def list(self, request, *args, **kwargs):
+        rows = self.get_fast_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.get_fast_data(page))
+        return Response(self.get_fast_data(rows))
+    
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         ipos = self.queryset.filter(status='upcoming')
-        serializer = self.get_serializer(ipos, many=True)
-        return Response(serializer.data)
+        return Response(self.get_fast_data(self.get_fast_rows(ipos)))
     
     @action(detail=False, methods=['get'])
     def ongoing(self, request):
         ipos = self.queryset.filter(status='ongoing')
-        serializer = self.get_serializer(ipos, many=True)
-        return Response(serializer.data)
+        return Response(self.get_fast_data(self.get_fast_rows(ipos)))
     
     @action(detail=False, methods=['get'])
     def listed(self, request):
         ipos = self.queryset.filter(status='listed')
-        serializer = self.get_serializer(ipos, many=True)
-        return Response(serializer.data)
+        return Response(self.get_fast_data(self.get_fast_rows(ipos)))
+    
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        IPO events in a date range, oldest first.
+        
+        ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive, at most CALENDAR_MAX_DAYS
+        apart) and optionally ?events=open,close,listing. Each event type is
+        one range scan over the index on its date column. The status filter
+        and ?fields=/?omit= apply to the IPO of each event.
+        """
+        start, end = (parse_date(request.query_params.get(name) or '') for name in ('start', 'end'))
+        if start is None or end is None:
+            raise APIValidationError({'detail': 'start and end must be dates in YYYY-MM-DD format.'})
+        if end < start or (end - start).days > settings.CALENDAR_MAX_DAYS:
+            raise APIValidationError({'detail': f'end must be on or after start, at most {settings.CALENDAR_MAX_DAYS} days later.'})
+        requested = request.query_params.get('events')
+        event_types = [e for e in requested.split(',') if e] if requested else list(CALENDAR_EVENTS)
+        unknown = [e for e in event_types if e not in CALENDAR_EVENTS]
+        if unknown:
+            raise APIValidationError({'events': f"Unknown event type(s): {', '.join(unknown)}"})
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = IPOFastListSerializer.columns(self.get_requested_fields())
+        streams = []
+        for event_type in event_types:
+            field = CALENDAR_EVENTS[event_type]
+            rows = list(
+                queryset.filter(**{f'{field}__range': (start, end)}).order_by(field, 'id')
+                .values(*columns, event_date=F(field))
+            )
+            streams.append([
+                {'date': row['event_date'].isoformat(), 'event': event_type, 'ipo': data}
+                for row, data in zip(rows, self.get_fast_data(rows))
+            ])
+        events = list(heapq.merge(*streams, key=itemgetter('date')))
+        return Response({'start': start.isoformat(), 'end': end.isoformat(), 'count': len(events), 'events': events})
+    
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Delta sync: IPOs changed, and tombstones for IPOs deleted, since a watermark.
+        
+        Start with ?updated_since=<ISO datetime> (or nothing for the full
+        catalogue), then pass the returned ?sync_token= on every later call.
+        Keep calling while has_more is true. Responds 410 when the watermark is
+        older than the tombstone retention window and a full resync is needed.
+        
+        The watermark is a position in the change sequence (ChangeSequence),
+        which is taken inside each write's transaction and so follows commit
+        order; unlike updated_at it cannot skip a row that commits late.
+        updated_since is only the entry point and may repeat a few changes.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 500)), 1), 1000)
+        except ValueError:
+            raise APIValidationError({'limit': 'Must be an integer.'})
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        token = request.query_params.get('sync_token')
+        updated_since = request.query_params.get('updated_since')
+        
+        if token:
+            try:
+                state = signing.loads(token, salt='ipo-sync', max_age=retention)
+            except signing.SignatureExpired:
+                return Response({'detail': 'Sync token expired, full resync required.'}, status=http_status.HTTP_410_GONE)
+            except signing.BadSignature:
+                raise APIValidationError({'sync_token': 'Invalid sync token.'})
+            if 's' not in state:
+                # A timestamp watermark from before the change sequence
+                return Response({'detail': 'Sync token is outdated, full resync required.'}, status=http_status.HTTP_410_GONE)
+        elif updated_since:
+            since = parse_datetime(updated_since)
+            if since is None:
+                raise APIValidationError({'updated_since': 'Expected an ISO 8601 datetime.'})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            if since < timezone.now() - retention:
+                return Response({'detail': 'updated_since is too old, full resync required.'}, status=http_status.HTTP_410_GONE)
+            # Just before the first change stamped after since
+            firsts = [
+                IPO.objects.filter(updated_at__gt=since).aggregate(first=Min('change_seq'))['first'],
+                IPODeletion.objects.filter(deleted_at__gt=since).aggregate(first=Min('change_seq'))['first'],
+            ]
+            firsts = [first for first in firsts if first is not None]
+            state = {'s': min(firsts) - 1 if firsts else ChangeSequence.current()}
+        else:
+            # Full sync: every IPO, and only deletions that happen from now on
+            state = {'s': 0, 'f': ChangeSequence.current()}
+        
+        columns = IPOFastListSerializer.columns(self.get_requested_fields())
+        columns += [c for c in ('id', 'change_seq') if c not in columns]
+        rows = list(IPO.objects.filter(change_seq__gt=state['s']).order_by('change_seq').values(*columns)[:limit + 1])
+        deleted = list(
+            IPODeletion.objects.filter(change_seq__gt=max(state['s'], state.get('f', 0))).order_by('change_seq')
+            .values('change_seq', 'ipo_id', 'company_name', 'deleted_at')[:limit + 1]
+        )
+        # The first limit changes of both kinds, in sequence order
+        page = heapq.nsmallest(
+            limit, [(row['change_seq'], 0, row) for row in rows] + [(row['change_seq'], 1, row) for row in deleted],
+            key=itemgetter(0),
+        )
+        has_more = len(rows) + len(deleted) > limit
+        rows = [row for _, kind, row in page if kind == 0]
+        deleted = [row for _, kind, row in page if kind == 1]
+        if page:
+            state['s'] = page[-1][0]
+            if state['s'] >= state.get('f', 0):
+                state.pop('f', None)
+        
+        return Response({
+            'changed': self.get_fast_data(rows),
+            'deleted': IPODeletionSerializer(deleted, many=True).data,
+            'sync_token': signing.dumps(state, salt='ipo-sync'),
+            'has_more': has_more,
+        })
+    
+    # Bulk endpoints: POST/PUT/PATCH/DELETE /api/ipo/bulk/
+    # Items are validated together; if any fails nothing is written.
+    def get_bulk_items(self, key=None):
+        items = self.request.data
+        if key is not None:
+            items = items.get(key) if isinstance(items, dict) else None
+        if not isinstance(items, list):
+            raise APIValidationError({key or 'detail': 'Expected a list.'})
+        if len(items) > self.bulk_max_items:
+            raise APIValidationError({'detail': f'At most {self.bulk_max_items} items per request.'})
+        return items
+    
+    def bulk_error_response(self, results):
+        return Response({'results': results}, status=http_status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        items = self.get_bulk_items()
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return self.bulk_error_response([
+                {'index': index, 'status': 'invalid', 'errors': errors}
+                for index, errors in enumerate(serializer.errors) if errors
+            ])
+        
+        # bulk_create skips the pre_save signal that sets normalized_name
+        ipos = [
+            IPO(**data, normalized_name=names.normalize_name(data.get('company_name')))
+            for data in serializer.validated_data
+        ]
+        with immediate_atomic():
+            first_seq = ChangeSequence.reserve(len(ipos))
+            for offset, ipo in enumerate(ipos):
+                ipo.change_seq = first_seq + offset
+            IPO.objects.bulk_create(ipos, batch_size=500)
+            # bulk_create skips the signal that creates each stats row
+            IPOStats.objects.bulk_create([IPOStats(ipo=ipo) for ipo in ipos], batch_size=500)
+            bump_ipo_version()
+        
+        results = [{'index': index, 'id': ipo.pk, 'status': 'created'} for index, ipo in enumerate(ipos)]
+        return Response({'results': results}, status=http_status.HTTP_201_CREATED)
+    
+    @bulk.mapping.put
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        items = self.get_bulk_items()
+        partial = request.method == 'PATCH'
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        
+        # Each IPO once per request; otherwise the last item would silently win
+        first_index = {}
+        errors = []
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if not isinstance(pk, int):
+                continue
+            if pk in first_index:
+                errors.append({'index': index, 'status': 'duplicate',
+                               'errors': {'id': [f'Repeats the IPO of item {first_index[pk]}.']}})
+            first_index.setdefault(pk, index)
+        if errors:
+            return self.bulk_error_response(errors)
+        
+        # Load, validate and write under one write lock, so an IPO edited or
+        # deleted by another request in between is neither overwritten nor
+        # reported as updated
+        with immediate_atomic():
+            existing = IPO.objects.in_bulk([pk for pk in ids if isinstance(pk, int)])
+            changed = []
+            changed_fields = set()
+            for index, item in enumerate(items):
+                ipo = existing.get(item.get('id')) if isinstance(item, dict) else None
+                if ipo is None:
+                    errors.append({'index': index, 'status': 'not_found', 'errors': {'id': ['No IPO with this id.']}})
+                    continue
+                serializer = self.get_serializer(ipo, data=item, partial=partial)
+                if not serializer.is_valid():
+                    errors.append({'index': index, 'status': 'invalid', 'errors': serializer.errors})
+                    continue
+                for field, value in serializer.validated_data.items():
+                    setattr(ipo, field, value)
+                changed_fields.update(serializer.validated_data)
+                changed.append(ipo)
+            if errors:
+                return self.bulk_error_response(errors)
+            
+            # bulk_update() skips auto_now and the pre_save signals, so stamp
+            # updated_at, and normalize renamed companies, explicitly. The
+            # stamp is taken under the lock, after every earlier write
+            now = timezone.now()
+            first_seq = ChangeSequence.reserve(len(changed)) if changed else 0
+            for offset, ipo in enumerate(changed):
+                ipo.updated_at = now
+                ipo.change_seq = first_seq + offset
+                ipo.normalized_name = names.normalize_name(ipo.company_name)
+            if 'company_name' in changed_fields:
+                changed_fields.add('normalized_name')
+            IPO.objects.bulk_update(changed, sorted(changed_fields) + ['updated_at', 'change_seq'], batch_size=500)
+            bump_ipo_version()
+        
+        results = [{'index': index, 'id': ipo.pk, 'status': 'updated'} for index, ipo in enumerate(changed)]
+        return Response({'results': results})
+    
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        ids = self.get_bulk_items('ids')
+        if not all(isinstance(pk, int) for pk in ids):
+            raise APIValidationError({'ids': 'Expected a list of integer ids.'})
+        
+        with immediate_atomic():
+            existing = set(IPO.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            IPO.objects.filter(pk__in=existing).delete()
+        
+        results = [
+            {'index': index, 'id': pk, 'status': 'deleted' if pk in existing else 'not_found'}
+            for index, pk in enumerate(ids)
+        ]
+        return Response({'results': results})
+
+def calendar_feed_token(user):
+    feed, _ = CalendarFeed.objects.get_or_create(user=user)
+    return signing.Signer(salt='ipo-calendar').sign(f'{user.pk}:{feed.secret}')
+
+def _calendar_response(request, user, name):
+    # Validators come from one aggregate query, so an unchanged feed is
+    # answered with a 304 before any event is generated
+    etag, last_modified = icalendar.feed_state(user)
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=last_modified.timestamp() if last_modified else None,
+    )
+    if response is None:
+        response = StreamingHttpResponse(
+            icalendar.stream(icalendar.feed_rows(user), name, request),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'inline; filename="ipo-calendar.ics"'
+    response['ETag'] = quote_etag(etag)
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if user is None:
+        patch_cache_control(response, public=True, max_age=settings.CALENDAR_FEED_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, max_age=settings.CALENDAR_FEED_MAX_AGE)
+    return response
+
+def ipo_calendar_feed(request):
+    return _calendar_response(request, None, 'IPO Calendar')
+
+def tracked_calendar_feed(request, token):
+    # Calendar apps cannot log in, so the feed URL carries a signed user id
+    # and the user's current feed secret, which resetting it revokes
+    try:
+        user_id, secret = signing.Signer(salt='ipo-calendar').unsign(token).split(':', 1)
+    except (signing.BadSignature, ValueError):
+        raise Http404('Unknown calendar feed.')
+    feed = get_object_or_404(CalendarFeed.objects.select_related('user'), user_id=user_id, user__is_active=True)
+    if not hmac.compare_digest(feed.secret, secret):
+        raise Http404('Unknown calendar feed.')
+    return _calendar_response(request, feed.user, 'My tracked IPOs')
 
 @login_required
 @require_POST
+@write_transaction
+def reset_calendar_feed(request):
+    CalendarFeed.objects.update_or_create(user=request.user, defaults={'secret': new_calendar_feed_secret()})
+    messages.success(request, 'Your calendar feed has a new link and the old one no longer works. Subscribe again with the new link.')
+    return redirect('ipo_app:user_dashboard')
+
+@login_required
+@require_POST
+@write_transaction
 def track_ipo(request, pk):
     ipo = get_object_or_404(IPO, pk=pk)
     IPOTracking.objects.get_or_create(user=request.user, ipo=ipo)
@@ -535,255 +844,140 @@ def all_notifications(request):
 
 @login_required
 @user_passes_test(is_admin)
-def export_ipos_csv(request):
-    # Get filter parameters
-    status_filter = request.GET.get('status', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    
-    # Build queryset with filters
-    queryset = IPO.objects.all()
-    
-    if status_filter:
-        queryset = queryset.filter(status=status_filter)
-    
-    if date_from:
-        queryset = queryset.filter(open_date__gte=date_from)
-    
-    if date_to:
-        queryset = queryset.filter(open_date__lte=date_to)
+def export_dataset(request):
+    # IPOs, applications or notifications as CSV, JSON Lines, Parquet or XLSX
+    dataset_name = request.GET.get('dataset', 'ipos')
+    export_format = request.GET.get('format', 'csv')
+    dataset = exports.DATASETS.get(dataset_name)
+    if dataset is None or export_format not in exports.FORMATS:
+        return HttpResponseBadRequest('Unknown dataset or export format.')
+    try:
+        # ?columns=a,b or ?columns=a&columns=b; all columns when omitted
+        column_names = [
+            name.strip() for value in request.GET.getlist('columns') for name in value.split(',') if name.strip()
+        ]
+        columns = exports.select_columns(dataset, column_names)
+        queryset = exports.queryset(
+            dataset,
+            status=request.GET.get('status', ''),
+            date_from=request.GET.get('date_from', ''),
+            date_to=request.GET.get('date_to', ''),
+        )
+    except exports.ExportError as error:
+        return HttpResponseBadRequest(str(error))
     
-    # Create response
-    response = HttpResponse(content_type='text/csv')
+    content_type, extension = exports.FORMATS[export_format]
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"ipo_data_export_{timestamp}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    
-    # Write header
-    writer.writerow([
-        'Company Name',
-        'Issue Type', 
-        'Price Band (Lower)',
-        'Price Band (Upper)',
-        'Issue Size (Cr)',
-        'Lot Size',
-        'Open Date',
-        'Close Date',
-        'Listing Date',
-        'Status',
-        'IPO Price',
-        'Listing Price',
-        'Current Market Price',
-        'Gain/Loss (%)',
-        'Total Applications',
-        'Subscription Rate',
-        'Created Date',
-        'Last Updated'
-    ])
-    
-    # Write data rows
-    for ipo in queryset.order_by('-open_date'):
-        # Calculate gain/loss percentage
-        gain_loss = 0
-        if ipo.ipo_price and ipo.current_market_price:
-            gain_loss = ((ipo.current_market_price - ipo.ipo_price) / ipo.ipo_price) * 100
-        
-        # Get total applications for this IPO
-        total_applications = IPOApplication.objects.filter(ipo=ipo).count()
-        
-        writer.writerow([
-            ipo.company_name,
-            ipo.issue_type,
-            ipo.price_band_lower,
-            ipo.price_band_upper,
-            ipo.issue_size,
-            ipo.lot_size,
-            ipo.open_date.strftime('%Y-%m-%d') if ipo.open_date else '',
-            ipo.close_date.strftime('%Y-%m-%d') if ipo.close_date else '',
-            ipo.listing_date.strftime('%Y-%m-%d') if ipo.listing_date else '',
-            ipo.status.title(),
-            ipo.ipo_price or '',
-            ipo.listing_price or '',
-            ipo.current_market_price or '',
-            f"{gain_loss:.2f}%" if gain_loss != 0 else '',
-            total_applications,
-            ipo.subscription_rate or '',
-            ipo.created_at.strftime('%Y-%m-%d %H:%M:%S') if ipo.created_at else '',
-            ipo.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ipo.updated_at else ''
-        ])
+    filename = f"{dataset_name}_export_{timestamp}.{extension}"
+    # Bigger exports would tie up the worker; they go through export jobs
+    if queryset[:settings.EXPORT_SYNC_MAX_ROWS + 1].count() > settings.EXPORT_SYNC_MAX_ROWS:
+        return HttpResponseBadRequest(
+            f'More than {settings.EXPORT_SYNC_MAX_ROWS} rows; queue an export job from the export page instead.'
+        )
+    rows = exports.rows(queryset, columns)
+    if export_format == 'xlsx':
+        output = exports.write_xlsx(columns, rows, dataset.label)
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=content_type)
     
+    writer = exports.STREAM_WRITERS[export_format]
+    response = StreamingHttpResponse(writer(columns, rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 @login_required
 @user_passes_test(is_admin)
-def analytics_dashboard(request):
-    from django.db.models import Avg, Count, Sum, Q
-    from datetime import datetime, timedelta
-    import json
-    
-    # Basic counts
-    total_ipos = IPO.objects.count()
-    upcoming_count = IPO.objects.filter(status='upcoming').count()
-    ongoing_count = IPO.objects.filter(status='ongoing').count()
-    listed_count = IPO.objects.filter(status='listed').count()
-    
-    # Calculate percentages
-    total = total_ipos if total_ipos > 0 else 1
-    upcoming_percentage = (upcoming_count / total) * 100
-    ongoing_percentage = (ongoing_count / total) * 100
-    listed_percentage = (listed_count / total) * 100
-    
-    # Financial statistics
-    avg_ipo_price = IPO.objects.exclude(ipo_price=None).aggregate(avg=Avg('ipo_price'))['avg']
-    avg_listing_price = IPO.objects.exclude(listing_price=None).aggregate(avg=Avg('listing_price'))['avg']
-    total_issue_size = IPO.objects.aggregate(total=Sum('issue_size'))['total'] or 0
-    avg_issue_size = IPO.objects.aggregate(avg=Avg('issue_size'))['avg'] or 0
-    
-    # Application statistics
-    total_applications = IPOApplication.objects.count()
-    avg_applications_per_ipo = total_applications / total if total > 0 else 0
-    
-    # Performance statistics
-    listed_ipos = IPO.objects.filter(status='listed').exclude(ipo_price=None).exclude(current_market_price=None)
-    avg_gain_loss = 0
-    if listed_ipos.exists():
-        total_gain_loss = 0
-        for ipo in listed_ipos:
-            if ipo.ipo_price and ipo.current_market_price:
-                gain_loss = ((ipo.current_market_price - ipo.ipo_price) / ipo.ipo_price) * 100
-                total_gain_loss += gain_loss
-        avg_gain_loss = total_gain_loss / listed_ipos.count()
-    
-    # Top performers
-    top_performers = []
-    for ipo in IPO.objects.filter(status='listed').exclude(ipo_price=None).exclude(current_market_price=None)[:10]:
-        gain_loss = 0
-        if ipo.ipo_price and ipo.current_market_price:
-            gain_loss = ((ipo.current_market_price - ipo.ipo_price) / ipo.ipo_price) * 100
-        
-        application_count = IPOApplication.objects.filter(ipo=ipo).count()
-        
-        top_performers.append({
-            'id': ipo.id,
-            'company_name': ipo.company_name,
-            'issue_size': ipo.issue_size,
-            'ipo_price': ipo.ipo_price,
-            'current_market_price': ipo.current_market_price,
-            'gain_loss': gain_loss,
-            'application_count': application_count
-        })
-    
-    # Sort by gain/loss
-    top_performers.sort(key=lambda x: x['gain_loss'], reverse=True)
-    
-    # Monthly trend data
-    monthly_data = []
-    monthly_labels = []
-    for i in range(6):
-        date = datetime.now() - timedelta(days=30*i)
-        month_start = date.replace(day=1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        count = IPO.objects.filter(
-            created_at__gte=month_start,
-            created_at__lte=month_end
-        ).count()
-        
-        monthly_data.append(count)
-        monthly_labels.append(date.strftime('%b %Y'))
-    
-    monthly_data.reverse()
-    monthly_labels.reverse()
-    
-    # Issue size distribution
-    small_ipos = IPO.objects.filter(issue_size__lt=100).count()
-    medium_ipos = IPO.objects.filter(issue_size__gte=100, issue_size__lt=500).count()
-    large_ipos = IPO.objects.filter(issue_size__gte=500, issue_size__lt=1000).count()
-    mega_ipos = IPO.objects.filter(issue_size__gte=1000).count()
-    
-    issue_size_data = [small_ipos, medium_ipos, large_ipos, mega_ipos]
-    
-    # Performance vs Issue Size scatter data
-    performance_data = []
-    for ipo in IPO.objects.filter(status='listed').exclude(ipo_price=None).exclude(current_market_price=None):
-        gain_loss = 0
-        if ipo.ipo_price and ipo.current_market_price:
-            gain_loss = ((ipo.current_market_price - ipo.ipo_price) / ipo.ipo_price) * 100
-        
-        performance_data.append({
-            'x': ipo.issue_size or 0,
-            'y': gain_loss
-        })
-    
-    # Additional statistics
-    max_subscription_rate = 0  # Placeholder since subscription_rate field doesn't exist
-    
-    # Most popular IPO (by applications)
-    most_popular_ipo = None
-    if IPOApplication.objects.exists():
-        popular_ipo = IPOApplication.objects.values('ipo__company_name').annotate(
-            count=Count('id')
-        ).order_by('-count').first()
-        if popular_ipo:
-            most_popular_ipo = popular_ipo['ipo__company_name']
-    
-    # User statistics
-    active_users = User.objects.filter(is_active=True).count()
-    user_growth = 0  # Placeholder for user growth calculation
-    
-    # Growth rate calculation
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    last_month = current_month - 1 if current_month > 1 else 12
-    last_year = current_year if current_month > 1 else current_year - 1
-    
-    current_month_ipos = IPO.objects.filter(
-        created_at__year=current_year,
-        created_at__month=current_month
-    ).count()
-    
-    last_month_ipos = IPO.objects.filter(
-        created_at__year=last_year,
-        created_at__month=last_month
-    ).count()
-    
-    growth_rate = 0
-    if last_month_ipos > 0:
-        growth_rate = ((current_month_ipos - last_month_ipos) / last_month_ipos) * 100
-    
-    context = {
-        'total_ipos': total_ipos,
-        'upcoming_count': upcoming_count,
-        'ongoing_count': ongoing_count,
-        'listed_count': listed_count,
-        'upcoming_percentage': upcoming_percentage,
-        'ongoing_percentage': ongoing_percentage,
-        'listed_percentage': listed_percentage,
-        'avg_ipo_price': avg_ipo_price,
-        'avg_listing_price': avg_listing_price,
-        'total_issue_size': total_issue_size,
-        'avg_issue_size': avg_issue_size,
-        'total_applications': total_applications,
-        'avg_applications_per_ipo': avg_applications_per_ipo,
-        'avg_gain_loss': avg_gain_loss,
-        'top_performers': top_performers,
-        'monthly_labels': json.dumps(monthly_labels),
-        'monthly_data': json.dumps(monthly_data),
-        'issue_size_data': json.dumps(issue_size_data),
-        'performance_data': json.dumps(performance_data),
-        'max_subscription_rate': max_subscription_rate,
-        'most_popular_ipo': most_popular_ipo,
-        'active_users': active_users,
-        'user_growth': user_growth,
-        'growth_rate': growth_rate,
+@require_POST
+@write_transaction
+def export_job_create(request):
+    params = {
+        'columns': [name for name in request.POST.getlist('columns') if name],
+        'status': request.POST.get('status', ''),
+        'date_from': request.POST.get('date_from', ''),
+        'date_to': request.POST.get('date_to', ''),
     }
-    
+    try:
+        job = export_jobs.submit(
+            request.user, request.POST.get('dataset', 'ipos'), request.POST.get('format', 'csv'), params,
+        )
+    except exports.ExportError as error:
+        messages.error(request, str(error))
+    else:
+        messages.success(request, f'Export #{job.pk} queued. It will be ready to download below shortly.')
+    return redirect('ipo_app:export_data')
+
+@login_required
+@user_passes_test(is_admin)
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, user=request.user)
+    payload = export_jobs.status(job)
+    payload['download_url'] = reverse('ipo_app:export_job_download', args=[job.pk]) if job.state == 'done' else None
+    return JsonResponse(payload)
+
+@login_required
+@user_passes_test(is_admin)
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, user=request.user, state='done')
+    if not job.artifact:
+        raise Http404('Export file not found')
+    return FileResponse(
+        job.artifact.open('rb'), as_attachment=True, filename=export_jobs.filename(job),
+        content_type=exports.FORMATS[job.format][0],
+    )
+
+def metrics(request):
+    # Prometheus scrape target; staff sessions or the METRICS_TOKEN bearer token
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+        authorized = True
+    if not authorized:
+        return HttpResponse(status=401 if token else 403)
+    body = query_metrics.render_prometheus(query_metrics.collect())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@login_required
+@user_passes_test(is_admin)
+def request_profiles(request):
+    return JsonResponse({'results': request_profiler.recent()})
+
+@login_required
+@user_passes_test(is_admin)
+def download_request_profile(request, profile_id):
+    entry = request_profiler.get(profile_id)
+    if entry is None:
+        raise Http404('Profile has been rotated out or does not exist.')
+    # Folded stacks: open in speedscope.app or feed to flamegraph.pl
+    response = HttpResponse(entry['folded'], content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.folded"'
+    return response
+
+@login_required
+@user_passes_test(is_admin)
+def analytics_dashboard(request):
+    # Rendered from the latest precomputed snapshot; see ipo_app.analytics
+    snapshot = analytics.latest()
+    context = dict(snapshot.data)
+    for key in ('monthly_labels', 'monthly_data', 'issue_size_data', 'performance_data'):
+        context[key] = json.dumps(context[key])
+    age = (timezone.now() - snapshot.computed_at).total_seconds()
+    context.update(
+        snapshot=snapshot,
+        snapshot_stale=age > settings.ANALYTICS_SNAPSHOT_MAX_AGE,
+    )
     return render(request, 'ipo_app/analytics.html', context)
 
 @login_required
+@user_passes_test(is_admin)
+@require_POST
+@write_transaction
+def refresh_analytics(request):
+    snapshot = analytics.refresh()
+    messages.success(request, f'Analytics refreshed in {snapshot.duration_ms:.0f} ms.')
+    return redirect('ipo_app:analytics')
+
+@login_required
+@write_transaction
 def set_reminder(request, ipo_id):
     ipo = get_object_or_404(IPO, pk=ipo_id)
     if request.method == 'POST':
@@ -812,6 +1006,7 @@ def set_reminder(request, ipo_id):
     return render(request, 'ipo_app/set_reminder.html', {'ipo': ipo})
 
 @login_required
+@write_transaction
 def apply_ipo(request, ipo_id):
     ipo = get_object_or_404(IPO, pk=ipo_id)
     if request.method == 'POST':
@@ -862,6 +1057,7 @@ def manage_applications(request):
 
 @login_required
 @user_passes_test(is_admin)
+@write_transaction
 def update_application_status(request, application_id):
     application = get_object_or_404(IPOApplication, pk=application_id)
     if request.method == 'POST':
@@ -1077,6 +1273,11 @@ def export_data_page(request):
         'status_filter': status_filter,
         'date_from': date_from,
         'date_to': date_to,
+        'export_datasets': [
+            {'name': name, 'label': dataset.label, 'columns': [column.name for column in dataset.columns]}
+            for name, dataset in exports.DATASETS.items()
+        ],
+        'export_jobs': ExportJob.objects.filter(user=request.user)[:10],
     }
     
     return render(request, 'ipo_app/export_data.html', context)
@@ -0,0 +1,85 @@
+"""
+Start-up warmup for web workers.
+
+Does the work the first request would otherwise pay for: building the URL
+resolvers, compiling every template into the cached loader, loading the
+static files manifest and the DRF settings, and opening the database
+connections. Called from gunicorn's post_worker_init hook (gunicorn.conf.py),
+i.e. before the worker starts accepting connections.
+"""
+import os
+import time
+
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver, reverse
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def warm_resolvers():
+    get_resolver().url_patterns
+    # reverse() populates the reverse and namespace dicts of every resolver
+    reverse('ipo_app:home')
+    resolver = get_resolver()
+    return len(resolver.reverse_dict) + len(resolver.namespace_dict)
+
+
+def warm_templates():
+    compiled = 0
+    for engine in engines.all():
+        for template_dir in engine.template_dirs:
+            for root, _, files in os.walk(template_dir):
+                for name in files:
+                    if name.endswith(TEMPLATE_EXTENSIONS):
+                        path = os.path.relpath(os.path.join(root, name), template_dir)
+                        try:
+                            engine.get_template(path.replace(os.sep, '/'))
+                        except TemplateSyntaxError:
+                            # Leave templates that cannot compile to fail
+                            # on the request that uses them, as before
+                            continue
+                        compiled += 1
+    return compiled
+
+
+def warm_static():
+    from django.contrib.staticfiles.storage import staticfiles_storage
+    # Instantiating the manifest storage reads staticfiles.json
+    return len(getattr(staticfiles_storage, 'hashed_files', {}))
+
+
+def warm_rest_framework():
+    from rest_framework.settings import api_settings
+
+    from .serializers import IPOSerializer
+    # Import the configured renderer, parser, filter and pagination classes
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_FILTER_BACKENDS',
+                 'DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PAGINATION_CLASS'):
+        getattr(api_settings, name)
+    return len(IPOSerializer().fields)
+
+
+def warm_database():
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+STEPS = (
+    ('resolvers', warm_resolvers),
+    ('templates', warm_templates),
+    ('static', warm_static),
+    ('rest_framework', warm_rest_framework),
+    ('database', warm_database),
+)
+
+
+def warm_up():
+    """Run every warmup step; return {step: (seconds, items warmed)}."""
+    timings = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        result = step()
+        timings[name] = (time.perf_counter() - started, result)
+    return timings